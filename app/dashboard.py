@@ -26,11 +26,38 @@ if page == "Dashboard Overview":
     st.title("Sales Intelligence & Automation Hub")
     st.markdown("### Executive Summary")
     
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Dealers", "124", "+2")
-    col2.metric("Monthly Revenue", "€4.2M", "+12%")
-    col3.metric("Avg Conversion", "3.4%", "-0.2%")
-    col4.metric("Active Leads", "1,240", "+50")
+    try:
+        response = requests.get(f"{API_URL}/kpis/summary")
+        if response.status_code == 200:
+            summary = response.json()
+            metrics = summary['metrics']
+            
+            def change(name, fmt):
+                delta = metrics[name]['change']
+                return fmt(delta) if delta is not None else None
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Total Dealers", f"{metrics['dealers']['value']:,.0f}", change('dealers', lambda d: f"{d:+,.0f}"))
+            col2.metric("Monthly Revenue", f"€{(metrics['revenue_30d']['value'] or 0) / 1e6:.1f}M",
+                        change('revenue_30d', lambda d: f"€{d / 1e6:+.2f}M"))
+            col3.metric("Avg Conversion", f"{(metrics['conversion_rate']['value'] or 0) * 100:.1f}%",
+                        change('conversion_rate', lambda d: f"{d * 100:+.1f}pp"))
+            col4.metric("Active Leads", f"{metrics['leads_30d']['value'] or 0:,.0f}", change('leads_30d', lambda d: f"{d:+,.0f}"))
+            st.caption(f"Trailing {summary['window_days']} days as of {summary['as_of']}; changes vs. the previous {summary['window_days']} days.")
+            
+            if summary['trend']:
+                trend = pd.DataFrame(summary['trend'])
+                fig = px.line(trend, x='date', y='revenue_30d', title="Trailing 30-Day Revenue")
+                st.plotly_chart(fig, use_container_width=True)
+            
+            st.markdown("#### Top Dealers")
+            st.dataframe(pd.DataFrame(summary['top_dealers']))
+        elif response.status_code == 404:
+            st.warning("No KPI snapshots yet. Run `python scripts/run_kpis.py`.")
+        else:
+            st.error(f"Error: {response.text}")
+    except Exception as e:
+        st.error(f"Connection Error: {e}")
     
     st.info("System Status: All ML Services are Online.")
 
@@ -42,13 +69,20 @@ elif page == "Forecasting":
     dealer_id = st.number_input("Enter Dealer ID", min_value=1, value=1)
     
     if st.button("Generate Forecast"):
-        with st.spinner("Running XGBoost Model..."):
+        with st.spinner("Loading Forecast..."):
             try:
                 response = requests.get(f"{API_URL}/forecast/{dealer_id}")
                 if response.status_code == 200:
-                    data = pd.DataFrame(response.json())
+                    result = response.json()
+                    data = pd.DataFrame(result['forecast'])
                     data['date'] = pd.to_datetime(data['date'])
                     
+                    freshness = f"Generated {result['generated_at']} ({result['source']})"
+                    if result['is_stale']:
+                        st.warning(f"Forecast may be outdated. {freshness}")
+                    else:
+                        st.caption(freshness)
+                    
                     fig = px.line(data, x='date', y='forecast', title=f"30-Day Revenue Forecast for Dealer {dealer_id}")
                     st.plotly_chart(fig, use_container_width=True)
                     
@@ -99,8 +133,12 @@ elif page == "Dealer Segments":
                     data = pd.DataFrame(response.json())
                     
                     fig = px.scatter(data, x='dealer_id', y='cluster', color='cluster', 
-                                     title="Dealer Clusters (0: Standard, 1: High Value, 2: At Risk)")
+                                     title="Dealer Clusters (ordered by trailing revenue, 0 = lowest)")
                     st.plotly_chart(fig, use_container_width=True)
+                    st.caption(
+                        f"Model {response.headers.get('X-Model-Version')} · data version "
+                        f"{response.headers.get('X-Data-Fingerprint')} · served from {response.headers.get('X-Segments-Source')}"
+                    )
                 else:
                     st.error("API Error")
             except Exception as e:
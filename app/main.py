@@ -1,10 +1,19 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+import functools
+import asyncio
 import pandas as pd
+import numpy as np
+import json
+import time
 import sys
 import os
 import uvicorn
 import logging
+from datetime import datetime
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -16,27 +25,84 @@ settings = get_settings()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-from ml_services.forecasting import train_forecast_model # In prod, load saved model
+from ml_services.forecasting import train_forecast_model
+from ml_services.forecast_store import ForecastStore
 from ml_services.lead_scoring import LeadScorer
 from ml_services.segmentation import DealerSegmentation
-from ml_services.orchestrator import run_chat
+from ml_services.segment_store import SegmentStore
+from ml_services.model_registry import ModelRegistry, HotModel
+from ml_services.kpi_snapshots import aget_kpi_summary
+from ml_services.orchestrator import arun_chat, query_router, answer_cache, rag_agent, sql_agent
+from database.engine import pool_status, get_async_engine, dispose_async_engine
 
 app = FastAPI(title=settings.APP_NAME, version=settings.APP_VERSION)
 
-# Initialize Services (Load models)
-lead_scorer = LeadScorer()
-segmentor = DealerSegmentation()
+def loaded(model):
+    model.load_model()
+    return model
+
+# Initialize Services. Models are loaded at startup and hot-swapped when a new
+# version is promoted in the registry; handlers take one instance per request.
+model_registry = ModelRegistry()
+lead_scorers = HotModel("lead_scorer", lambda: loaded(LeadScorer()), model_registry)
+segmentors = HotModel("segmentation", lambda: loaded(DealerSegmentation()), model_registry)
+hot_models = {model.name: model for model in (lead_scorers, segmentors)}
+segment_store = SegmentStore(DealerSegmentation())
+segmentors.swap_listeners.append(lambda segmentor: setattr(segment_store, "segmentor", segmentor))
+forecast_store = ForecastStore()
 # rag_agent = InternalSalesAgent() -> Replaced by Orchestrator
 
+# Bounded executors keep CPU-bound work off the event loop, and the agent
+# semaphore caps slow LLM queries, so fast endpoints never queue behind them.
+model_executor = ThreadPoolExecutor(max_workers=settings.MODEL_EXECUTOR_WORKERS, thread_name_prefix="model")
+forecast_executor = ProcessPoolExecutor(
+    max_workers=settings.FORECAST_EXECUTOR_PROCESSES,
+    mp_context=multiprocessing.get_context("spawn")
+)
+agent_semaphore = asyncio.Semaphore(settings.AGENT_MAX_CONCURRENCY)
+
+async def run_blocking(executor, fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args))
+
+def reload_models(force=False):
+    """
+    Swaps in the registry's current version of each model; returns the names that changed.
+    """
+    return [name for name, model in hot_models.items() if model.refresh(force)]
+
+async def watch_models():
+    # Picks up versions promoted by scripts/train_models.py without a restart
+    while True:
+        await asyncio.sleep(settings.MODEL_RELOAD_INTERVAL_SECONDS)
+        try:
+            await run_blocking(model_executor, reload_models)
+        except Exception as e:
+            logger.error(f"Error reloading models: {e}")
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up Sales Intelligence Hub API...")
     try:
-        lead_scorer.load_model()
-        segmentor.load_model()
+        await run_blocking(model_executor, reload_models)
         logger.info("Models loaded successfully.")
     except Exception as e:
         logger.error(f"Error loading models: {e}")
+    if settings.MODEL_RELOAD_INTERVAL_SECONDS > 0:
+        app.state.model_watcher = asyncio.create_task(watch_models())
+    try:
+        await run_blocking(model_executor, forecast_store.ensure_table)
+        await run_blocking(model_executor, segment_store.ensure_table)
+    except Exception as e:
+        logger.error(f"Error preparing forecast/segment stores: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if getattr(app.state, "model_watcher", None) is not None:
+        app.state.model_watcher.cancel()
+    model_executor.shutdown(wait=False)
+    forecast_executor.shutdown(wait=False)
+    await dispose_async_engine()
 
 # Request Models
 class LeadRequest(BaseModel):
@@ -47,47 +113,246 @@ class AgentQuery(BaseModel):
     question: str
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"status": "Sales Intelligence Hub API is running"}
 
+@app.get("/health/db")
+async def db_health():
+    try:
+        return {"sync": pool_status(), "async": pool_status(get_async_engine().sync_engine)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/forecast/{dealer_id}")
-def get_forecast(dealer_id: int):
+async def get_forecast(dealer_id: int):
     try:
-        # For POC, we run the forecast on request. In prod, we'd fetch pre-calculated.
-        forecast, status = train_forecast_model(dealer_id)
+        # Serve precomputed forecasts (scripts/run_forecasts.py); train on demand only as a fallback.
+        stored = await forecast_store.aget(dealer_id)
+        if stored is not None:
+            return stored
+        
+        logger.info(f"No stored forecast for dealer_id={dealer_id}, training on demand.")
+        forecast, status = await run_blocking(forecast_executor, train_forecast_model, dealer_id)
         if forecast is None:
             raise HTTPException(status_code=404, detail=status)
         
-        return forecast.to_dict(orient="records")
+        payload = ForecastStore.build_payload(dealer_id, forecast, "on_demand", datetime.utcnow())
+        forecast_store.put(dealer_id, payload)
+        return ForecastStore.with_age(payload)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def predict_lead(lead):
+    scorer = lead_scorers.get()
+    return scorer, scorer.predict(lead.source, lead.response_time_minutes)
+
 @app.post("/score_lead")
-def score_lead(lead: LeadRequest):
+async def score_lead(lead: LeadRequest, response: Response):
     try:
-        prob = lead_scorer.predict(lead.source, lead.response_time_minutes)
-        return {"conversion_probability": prob, "risk_level": "High" if prob < 0.3 else "Low"}
+        scorer = lead_scorers.instance
+        if scorer is not None and scorer.loaded and scorer.compiled is not None:
+            # Compiled lookup is microseconds, so it runs inline on the event loop
+            prob = scorer.predict(lead.source, lead.response_time_minutes)
+        else:
+            # First load, a failed load or the sklearn fallback would block the loop
+            scorer, prob = await run_blocking(model_executor, predict_lead, lead)
+        response.headers["X-Model-Version"] = scorer.model_version
+        return {"conversion_probability": prob, "risk_level": "High" if prob < 0.3 else "Low", "model_version": scorer.model_version}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+async def read_ndjson(request: Request):
+    """
+    Parses a newline-delimited JSON body incrementally as it streams in.
+    """
+    leads, buffer = [], b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        leads.extend(json.loads(line) for line in lines if line.strip())
+    if buffer.strip():
+        leads.append(json.loads(buffer))
+    return leads
+
+def score_lead_rows(leads, scorer):
+    """
+    Scores raw lead dicts in one vectorized call. Rows that cannot be scored get
+    an error instead of failing the whole batch.
+    """
+    sources, response_times, errors = [], [], [None] * len(leads)
+    for i, lead in enumerate(leads):
+        source, response_time = None, np.nan
+        if isinstance(lead, dict) and "source" in lead and "response_time_minutes" in lead:
+            if isinstance(lead["source"], str):
+                source = lead["source"]
+            else:
+                errors[i] = "source must be a string"
+            try:
+                response_time = float(lead["response_time_minutes"])
+            except (TypeError, ValueError):
+                errors[i] = errors[i] or "Invalid response_time_minutes"
+        else:
+            errors[i] = "Expected an object with source and response_time_minutes"
+        sources.append(source)
+        response_times.append(response_time)
+    
+    start = time.perf_counter()
+    probs = scorer.predict_batch(sources, response_times)
+    model_ms = (time.perf_counter() - start) * 1000
+    
+    results = []
+    for i, prob in enumerate(probs.tolist()):
+        if np.isnan(prob):
+            results.append({
+                "conversion_probability": None,
+                "risk_level": None,
+                "error": errors[i] or f"Unknown source '{sources[i]}'",
+            })
+        else:
+            results.append({"conversion_probability": prob, "risk_level": "High" if prob < 0.3 else "Low", "error": None})
+    return results, model_ms
+
+@app.post("/score_leads")
+async def score_leads(request: Request, response: Response):
+    """
+    Bulk scoring. Accepts a JSON array of leads or an NDJSON stream
+    (Content-Type: application/x-ndjson); NDJSON requests get an NDJSON response.
+    """
+    is_ndjson = request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE)
+    try:
+        leads = await read_ndjson(request) if is_ndjson else await request.json()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid request body: {e}")
+    if not isinstance(leads, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of leads")
+    
+    scorer = lead_scorers.get()
+    if not scorer.loaded:
+        raise HTTPException(status_code=503, detail="Lead scoring model not trained. Please run scripts/train_models.py")
+    try:
+        results, model_ms = await run_blocking(model_executor, score_lead_rows, leads, scorer)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    logger.info(f"Scored {len(results)} leads in {model_ms:.1f}ms model time ({scorer.model_version})")
+    headers = {"X-Model-Time-Ms": f"{model_ms:.1f}", "X-Model-Version": scorer.model_version}
+    if is_ndjson:
+        return StreamingResponse(
+            (json.dumps(result) + "\n" for result in results),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers
+        )
+    response.headers.update(headers)
+    return {
+        "count": len(results),
+        "model_version": scorer.model_version,
+        "scored": sum(1 for result in results if result["error"] is None),
+        "model_ms": round(model_ms, 1),
+        "results": results,
+    }
+
 @app.get("/segments")
-def get_segments():
+async def get_segments(response: Response):
     try:
-        result = segmentor.run_segmentation()
+        result = await run_blocking(model_executor, segment_store.get)
         if result is None:
              raise HTTPException(status_code=404, detail="No dealer data found")
-        return result.to_dict(orient="records")
+        response.headers["X-Model-Version"] = result["model_version"]
+        response.headers["X-Data-Fingerprint"] = result["data_fingerprint"]
+        response.headers["X-Segments-Source"] = result["source"]
+        return result["records"]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def model_status(name):
+    model = hot_models[name]
+    return {
+        "serving": model.instance.model_version if model.instance is not None else None,
+        "current": model_registry.current_version(name),
+        "versions": model_registry.versions(name),
+        "metadata": model_registry.metadata(name),
+    }
+
+@app.get("/models")
+async def list_models():
+    try:
+        return await run_blocking(model_executor, lambda: {name: model_status(name) for name in hot_models})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/models/reload")
+async def reload_models_endpoint(force: bool = False):
+    try:
+        reloaded = await run_blocking(model_executor, reload_models, force)
+        return {"reloaded": reloaded, "serving": {name: model.instance.model_version for name, model in hot_models.items()}}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/models/{name}/promote/{version}")
+async def promote_model(name: str, version: str):
+    # Also used to roll back to an earlier version
+    if name not in hot_models:
+        raise HTTPException(status_code=404, detail=f"Unknown model {name}")
+    try:
+        await run_blocking(model_executor, model_registry.promote, name, version)
+        await run_blocking(model_executor, hot_models[name].refresh)
+        return await run_blocking(model_executor, model_status, name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/kpis/summary")
+async def kpi_summary(top: int = 10):
+    try:
+        summary = await aget_kpi_summary(top=top)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="No KPI snapshots yet. Run scripts/run_kpis.py")
+        return summary
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/agent/query")
-def query_agent(query: AgentQuery):
+async def query_agent(query: AgentQuery):
     try:
         # Agent has already ingested docs from data/docs on startup
-        answer = run_chat(query.question)
+        async with agent_semaphore:
+            answer = await arun_chat(query.question)
         return {"answer": answer}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/agent/router/stats")
+async def router_stats():
+    return query_router.stats()
+
+@app.get("/agent/cache/stats")
+async def answer_cache_stats():
+    return answer_cache.stats()
+
+@app.get("/agent/sql_cache/stats")
+async def sql_cache_stats():
+    return sql_agent.db.cache_stats()
+
+@app.post("/agent/reindex")
+async def reindex_knowledge_base(force: bool = False):
+    try:
+        report = await run_blocking(model_executor, rag_agent.reindex, force)
+        if report is None:
+            raise HTTPException(status_code=404, detail="Docs directory not found")
+        return report
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
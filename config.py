@@ -15,16 +15,77 @@ class Settings(BaseSettings):
     POSTGRES_SERVER: str = "localhost"
     POSTGRES_PORT: int = 5432
     
+    # Connection Pool (per process; size for the uvicorn worker count)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    
     # Backend API (for Dashboard)
     API_SERVER: str = "localhost"
+    MODEL_EXECUTOR_WORKERS: int = 4 # Threads for CPU-bound model work per API process
+    FORECAST_EXECUTOR_PROCESSES: int = 2 # Processes for on-demand forecast fits
+    AGENT_MAX_CONCURRENCY: int = 8 # Concurrent /agent/query requests per API process
     
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
     # ML Service Params
     FORECAST_HORIZON_DAYS: int = 30
+    FORECAST_MODE: str = "global" # global | per_dealer
+    FORECAST_STRATEGY: str = "recursive" # recursive | direct | static
+    FORECAST_HISTORY_DAYS: int = 0 # Training window, 0 = all history
+    FORECAST_WARM_START_ROUNDS: int = 20 # Boosting rounds added per incremental refresh
+    FORECAST_MAX_BOOSTER_ROUNDS: int = 300 # Refit from scratch once a booster grows past this
+    FORECAST_CACHE_TTL_SECONDS: int = 300
+    FORECAST_MAX_AGE_HOURS: int = 24
+    TRAINING_SNAPSHOTS: bool = True # Training and backtests read DATA_DIR/snapshots when present
     LEAD_SCORE_THRESHOLD: float = 0.5
+    SEGMENT_N_CLUSTERS: int = 4 # Used when no trained model exists; training picks k by silhouette
+    SEGMENT_MAX_CLUSTERS: int = 8 # Upper end of the training k sweep
+    SEGMENT_WINDOW_DAYS: int = 365 # Trailing window of the frequency/monetary/margin/conversion features
+    SEGMENT_BATCH_SIZE: int = 4096 # MiniBatchKMeans batch size
+    SEGMENT_SILHOUETTE_SAMPLE: int = 10_000 # Dealers sampled per silhouette score
+    SEGMENT_VERSION_CHECK_SECONDS: float = 5.0 # Max staleness of cached segments after dealer data changes
+    MODEL_REGISTRY_KEEP_VERSIONS: int = 5 # Versions kept per model in MODELS_DIR/registry
+    MODEL_RELOAD_INTERVAL_SECONDS: float = 30.0 # API polls the registry for promoted versions; 0 disables
+    LEAD_SCORER_COMPILED: bool = True
+    LEAD_SCORER_LOOKUP_TABLE: bool = True
+    
+    # Knowledge Base (changing the splitter rebuilds the index from cached embeddings)
+    RAG_CHUNK_SIZE: int = 1000
+    RAG_CHUNK_OVERLAP: int = 100
+    EMBEDDING_BACKEND: str = "openai" # openai | hashing (local, offline)
+    EMBEDDING_HASHING_DIMENSIONS: int = 768
+    EMBEDDING_BATCH_MAX_TOKENS: int = 100_000 # Per request; the API caps at 300k
+    EMBEDDING_BATCH_MAX_SIZE: int = 512 # Texts per request
+    EMBEDDING_MAX_CONCURRENCY: int = 4 # Batches in flight
+    EMBEDDING_MAX_RETRIES: int = 5
+    RAG_INDEX_TYPE: str = "auto" # auto | flat | ivf | hnsw (auto picks by corpus size)
+    RAG_INDEX_MMAP: bool = True # Map the index read-only and read chunks from SQLite on demand
+    RAG_IVF_NPROBE: int = 0 # 0 = value chosen at build time
+    RAG_HNSW_EF_SEARCH: int = 0 # 0 = value chosen at build time
+    
+    # Agent Routing
+    ROUTER_CONFIDENCE_THRESHOLD: float = 0.75 # Below this the LLM router is asked
+    ANSWER_CACHE_MAX_SIZE: int = 1000
+    ANSWER_CACHE_SQL_TTL_SECONDS: int = 300 # Data changes, keep short
+    ANSWER_CACHE_RAG_TTL_SECONDS: int = 86400 # Also invalidated on re-ingestion
+    ANSWER_CACHE_SEMANTIC: bool = False # Embedding-similarity matching (one embedding call per miss)
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    SQL_CACHE_MAX_SIZE: int = 500 # Cached SQL agent query results
+    SQL_CACHE_VERSION_CHECK_SECONDS: float = 5.0 # Max staleness; hits within it skip the database
+    SQL_MAX_ROWS: int = 100 # LIMIT injected into / clamped on generated SQL
+    SQL_STATEMENT_TIMEOUT_MS: int = 5000
+    SQL_MAX_PLAN_COST: float = 1_000_000 # EXPLAIN total cost above which queries are rejected
+    SQL_MAX_RESULT_BYTES: int = 64_000 # Result text handed back to the agent
+    SQL_STREAM_BATCH_ROWS: int = 500
     
     # External APIs
     OPENAI_API_KEY: str
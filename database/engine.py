@@ -0,0 +1,128 @@
+import os
+import sys
+import logging
+from functools import lru_cache
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Explicit read dtypes: categoricals for low-cardinality strings, float32 for scores/durations.
+# Money columns stay float64 since they get summed.
+DEALER_DTYPES = {
+    "dealer_id": "int32",
+    "size": "category",
+    "avg_monthly_volume": "float32",
+    "churn_risk_score": "float32",
+}
+
+TRANSACTION_DTYPES = {
+    "transaction_id": "int64",
+    "dealer_id": "int32",
+    "car_id": "int64",
+    "sale_price": "float64",
+    "margin": "float64",
+    "channel": "category",
+}
+
+LEAD_DTYPES = {
+    "lead_id": "int64",
+    "dealer_id": "int32",
+    "source": "category",
+    "response_time_minutes": "float32",
+    "converted": "bool",
+    "conversion_probability": "float32",
+}
+
+@lru_cache()
+def get_engine():
+    """
+    Process-wide pooled engine shared by all services.
+    """
+    logger.info(
+        f"Creating database engine (pool_size={settings.DB_POOL_SIZE}, max_overflow={settings.DB_MAX_OVERFLOW})"
+    )
+    return create_engine(
+        settings.DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+@lru_cache()
+def get_async_engine():
+    """
+    Process-wide asyncpg engine for the API's async request path.
+    """
+    return create_async_engine(
+        settings.ASYNC_DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+def dispose_engine():
+    """
+    Drops pooled connections, e.g. after forking a worker process.
+    """
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+        get_engine.cache_clear()
+
+async def dispose_async_engine():
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+        get_async_engine.cache_clear()
+
+def pool_status(engine=None):
+    pool = (engine or get_engine()).pool
+    return {
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pid": os.getpid(),
+    }
+
+def apply_dtypes(df, dtypes):
+    if dtypes:
+        present = {col: dtype for col, dtype in dtypes.items() if col in df.columns}
+        if present:
+            df = df.astype(present)
+    return df
+
+def read_frame(query, params=None, dtypes=None, parse_dates=None):
+    """
+    Runs a parameterized query on the shared engine and applies explicit dtypes
+    to the columns that are present in the result.
+    """
+    if isinstance(query, str):
+        query = text(query)
+    with get_engine().connect() as conn:
+        df = pd.read_sql(query, conn, params=params, parse_dates=parse_dates)
+    return apply_dtypes(df, dtypes)
+
+async def read_frame_async(query, params=None, dtypes=None, parse_dates=None):
+    """
+    Async counterpart of read_frame on the asyncpg engine.
+    """
+    if isinstance(query, str):
+        query = text(query)
+    async with get_async_engine().connect() as conn:
+        result = await conn.execute(query, params or {})
+        df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+    for col in parse_dates or []:
+        df[col] = pd.to_datetime(df[col])
+    return apply_dtypes(df, dtypes)
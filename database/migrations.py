@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.schema import Base
+from database.engine import get_engine
+from database.table_versions import install_version_triggers, missing_version_triggers, version_trigger_ddl, versioned_tables
+
+logger = logging.getLogger(__name__)
+
+# Indexes left INVALID by an interrupted CREATE INDEX CONCURRENTLY; IF NOT EXISTS would skip them
+INVALID_INDEXES_QUERY = text("""
+    SELECT c.relname
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE NOT i.indisvalid AND pg_table_is_visible(c.oid)
+""")
+
+def declared_indexes(metadata=Base.metadata):
+    """
+    Secondary indexes declared in the schema, in table dependency order.
+    """
+    return [index for table in metadata.sorted_tables for index in sorted(table.indexes, key=lambda ix: ix.name)]
+
+def index_ddl(index, bind, concurrently=True):
+    # CONCURRENTLY builds without blocking writes, at the cost of running outside a transaction
+    index.dialect_options["postgresql"]["concurrently"] = concurrently
+    try:
+        return str(CreateIndex(index, if_not_exists=True).compile(bind=bind)).strip()
+    finally:
+        index.dialect_options["postgresql"]["concurrently"] = False
+
+def missing_indexes(conn):
+    """
+    Declared indexes on existing tables that are absent or INVALID, as (index, invalid) pairs.
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    invalid = {row[0] for row in conn.execute(INVALID_INDEXES_QUERY)}
+    missing = []
+    for index in declared_indexes():
+        if index.table.name not in existing_tables:
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(index.table.name)}
+        if index.name not in existing or index.name in invalid:
+            missing.append((index, index.name in invalid))
+    return missing
+
+def missing_columns(inspector):
+    """
+    Declared nullable columns absent from existing tables.
+    """
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                logger.warning(f"Skipping NOT NULL column {table.name}.{column.name}: needs a manual backfill")
+                continue
+            missing.append(column)
+    return missing
+
+def migrate(engine=None, concurrently=True, dry_run=False):
+    """
+    Brings an existing database up to database/schema.py without dropping anything:
+    creates missing tables (with their indexes), adds missing nullable columns, then
+    installs the table-version triggers the caches key on, and builds declared
+    indexes that are missing or INVALID on existing tables.
+    Returns one report entry per action.
+    """
+    engine = engine or get_engine()
+    report = []
+
+    inspector = inspect(engine)
+    new_tables = [table for table in Base.metadata.sorted_tables if not inspector.has_table(table.name)]
+    for table in new_tables:
+        report.append({"action": "create_table", "name": table.name, "seconds": None})
+    if new_tables and not dry_run:
+        Base.metadata.create_all(engine, tables=new_tables)
+
+    columns = missing_columns(inspector)
+    with engine.begin() as conn:
+        for column in columns:
+            sql = f'ALTER TABLE "{column.table.name}" ADD COLUMN IF NOT EXISTS "{column.name}" {column.type.compile(dialect=engine.dialect)}'
+            report.append({"action": "add_column", "name": f"{column.table.name}.{column.name}", "sql": sql, "seconds": None})
+            if not dry_run:
+                conn.execute(text(sql))
+
+    with engine.begin() as conn:
+        triggers = missing_version_triggers(conn)
+        if dry_run:
+            # Not created in a dry run, but they would get the trigger too
+            triggers += [table.name for table in new_tables if table.name in versioned_tables()]
+        for name in triggers:
+            report.append({"action": "create_version_trigger", "name": name, "sql": version_trigger_ddl(name), "seconds": None})
+        if triggers and not dry_run:
+            install_version_triggers(conn, triggers)
+
+    with engine.connect() as conn:
+        indexes = missing_indexes(conn)
+    if dry_run:
+        for index, invalid in indexes:
+            report.append({"action": "create_index", "name": index.name, "sql": index_ddl(index, engine, concurrently), "seconds": None})
+        return report
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index, invalid in indexes:
+            if invalid:
+                logger.warning(f"Rebuilding invalid index {index.name}")
+                conn.execute(text(f'DROP INDEX {"CONCURRENTLY " if concurrently else ""}IF EXISTS "{index.name}"'))
+            start = time.perf_counter()
+            conn.execute(text(index_ddl(index, conn, concurrently)))
+            elapsed = time.perf_counter() - start
+            logger.info(f"Created index {index.name} on {index.table.name} in {elapsed:.2f}s")
+            report.append({"action": "create_index", "name": index.name, "seconds": round(elapsed, 2)})
+        if indexes:
+            for table in sorted({index.table.name for index, _ in indexes}):
+                conn.execute(text(f'ANALYZE "{table}"'))
+    return report
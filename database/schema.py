@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Enum
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Boolean, Enum, UniqueConstraint, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import enum
@@ -33,6 +33,7 @@ class Dealer(Base):
     transactions = relationship("Transaction", back_populates="dealer")
     leads = relationship("Lead", back_populates="dealer")
     kpi_snapshots = relationship("KPISnapshot", back_populates="dealer")
+    forecasts = relationship("Forecast", back_populates="dealer")
 
 class Employee(Base):
     __tablename__ = "employees"
@@ -48,6 +49,15 @@ class Employee(Base):
 
 class Inventory(Base):
     __tablename__ = "inventory"
+    __table_args__ = (
+        Index("ix_inventory_dealer_status", "dealer_id", "status"),
+        # Stock queries only ever look at available cars, a small slice once history accumulates
+        Index(
+            "ix_inventory_available_dealer", "dealer_id",
+            postgresql_where=text("status = 'available'"),
+            postgresql_include=["acquisition_price", "days_in_stock"]
+        ),
+    )
     
     car_id = Column(Integer, primary_key=True)
     dealer_id = Column(Integer, ForeignKey("dealers.dealer_id"))
@@ -67,6 +77,11 @@ class Inventory(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Covers per-dealer daily revenue and the forecast watermarks with index-only scans
+        Index("ix_transactions_dealer_date", "dealer_id", "date", postgresql_include=["sale_price", "transaction_id"]),
+        Index("ix_transactions_date", "date"),
+    )
     
     transaction_id = Column(Integer, primary_key=True)
     date = Column(DateTime, default=datetime.utcnow)
@@ -81,6 +96,10 @@ class Transaction(Base):
 
 class Lead(Base):
     __tablename__ = "leads"
+    __table_args__ = (
+        Index("ix_leads_dealer_created", "dealer_id", "created_at"),
+        Index("ix_leads_created_at", "created_at"),
+    )
     
     lead_id = Column(Integer, primary_key=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -98,13 +117,68 @@ class Lead(Base):
 
 class KPISnapshot(Base):
     __tablename__ = "kpi_snapshots"
+    __table_args__ = (
+        Index("ix_kpi_snapshots_dealer_date", "dealer_id", "date"),
+        # One snapshot per dealer-day; date first so the latest day is an index lookup
+        Index("uq_kpi_snapshots_date_dealer", "date", "dealer_id", unique=True),
+    )
     
+    # Rates are over the trailing 30 days ending on `date`
     id = Column(Integer, primary_key=True)
     date = Column(DateTime)
     dealer_id = Column(Integer, ForeignKey("dealers.dealer_id"))
-    conversion_rate = Column(Float)
-    avg_ticket_size = Column(Float)
-    inventory_turnover = Column(Float)
-    forecast_accuracy = Column(Float)
+    conversion_rate = Column(Float) # Conversions / new leads
+    avg_ticket_size = Column(Float) # Revenue / units sold
+    inventory_turnover = Column(Float) # Units sold / stock on hand at day end
+    forecast_accuracy = Column(Float) # 1 - WAPE over days with a stored forecast
+    revenue_30d = Column(Float)
+    units_sold_30d = Column(Integer)
+    leads_30d = Column(Integer)
+    stock_on_hand = Column(Integer)
+    computed_at = Column(DateTime, default=datetime.utcnow)
     
     dealer = relationship("Dealer", back_populates="kpi_snapshots")
+
+class DealerSegment(Base):
+    __tablename__ = "dealer_segments"
+    
+    dealer_id = Column(Integer, ForeignKey("dealers.dealer_id"), primary_key=True)
+    cluster = Column(Integer)
+    model_version = Column(String) # Segmentation model that assigned the cluster
+    data_fingerprint = Column(String) # Version of the source tables it was computed from
+    assigned_at = Column(DateTime, default=datetime.utcnow)
+
+class Forecast(Base):
+    __tablename__ = "forecasts"
+    __table_args__ = (
+        UniqueConstraint("dealer_id", "date", name="uq_forecasts_dealer_date"),
+        Index("ix_forecasts_dealer_generated", "dealer_id", "generated_at"), # Latest run per dealer
+    )
+    
+    id = Column(Integer, primary_key=True)
+    dealer_id = Column(Integer, ForeignKey("dealers.dealer_id"))
+    date = Column(DateTime) # Forecasted day
+    forecast = Column(Float)
+    run_id = Column(String) # Batch run that produced this row
+    generated_at = Column(DateTime, default=datetime.utcnow)
+    
+    dealer = relationship("Dealer", back_populates="forecasts")
+
+class ForecastWatermark(Base):
+    __tablename__ = "forecast_watermarks"
+    
+    dealer_id = Column(Integer, ForeignKey("dealers.dealer_id"), primary_key=True)
+    max_date = Column(DateTime) # Latest transactions.date seen
+    max_transaction_id = Column(Integer)
+    n_transactions = Column(Integer)
+    trained_through = Column(DateTime, nullable=True) # Last day the stored booster was fitted on
+    booster_rounds = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    
+    # Bumped by a statement-level trigger on every write (database/table_versions.py)
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow) # Start of the last writing transaction
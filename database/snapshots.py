@@ -0,0 +1,247 @@
+import os
+import sys
+import json
+import time
+import logging
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import Boolean, DateTime, Enum, Float, Integer, text
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from database.engine import get_engine, apply_dtypes
+from database.schema import Base
+from database.table_versions import read_table_versions
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TABLES = ["dealers", "transactions", "leads"]
+# Rows are only ever inserted, so a refresh appends rows above the primary-key watermark.
+# Other tables are updated in place (leads get converted / conversion_date later) and are
+# re-read in full, but only when their table version moved since the last refresh.
+APPEND_ONLY_TABLES = {"transactions"}
+MANIFEST_FILE = "manifest.json"
+
+def arrow_type(column):
+    # Enum is a String subclass, so check it first; enums are read back as member names
+    if isinstance(column.type, Enum):
+        return pa.string()
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    return pa.string()
+
+def arrow_schema(table):
+    """
+    Fixed Arrow schema from the ORM table, so every chunk (even all-NULL ones) is
+    written with the same column types.
+    """
+    return pa.schema([pa.field(column.name, arrow_type(column)) for column in table.columns])
+
+def primary_key(table):
+    return table.primary_key.columns.values()[0].name
+
+def stream_chunks(engine, table, watermark=None, chunk_rows=100_000):
+    """
+    Yields DataFrames of at most chunk_rows rows through a server-side cursor, so only
+    one chunk is ever held in memory. With a watermark, only rows whose primary key is
+    above it.
+    """
+    key = primary_key(table)
+    query = f"SELECT {', '.join(column.name for column in table.columns)} FROM {table.name}"
+    params = {}
+    if watermark is not None:
+        query += f" WHERE {key} > :watermark"
+        params["watermark"] = watermark
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows)
+        for chunk in pd.read_sql(text(query), conn, params=params, chunksize=chunk_rows):
+            yield chunk
+
+class SnapshotStore:
+    """
+    Local copies of the training tables as uncompressed Arrow IPC files under
+    DATA_DIR/snapshots/<table>/. Reads memory-map the files, so loading is zero-copy
+    and only the selected columns are paged in. The manifest lists the complete parts
+    of each table with its primary-key watermark and table version; refresh() skips
+    tables whose version hasn't moved, appends a part with the new rows of append-only
+    tables and rewrites the others (and append-only ones that were recreated, truncated
+    or had rows deleted).
+    """
+    def __init__(self, root=None):
+        self.root = root or os.path.join(settings.DATA_DIR, "snapshots")
+        self.manifest_path = os.path.join(self.root, MANIFEST_FILE)
+
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def has(self, table_name):
+        return table_name in self.load_manifest()
+
+    def table_version(self, table_name, engine=None):
+        with (engine or get_engine()).connect() as conn:
+            version = read_table_versions(conn, [table_name]).get(table_name)
+        return list(version) if version is not None else None
+
+    def is_stale(self, table_name):
+        """
+        True if the table was written to since its snapshot was taken (or can't tell).
+        """
+        entry = self.load_manifest().get(table_name)
+        if entry is None:
+            return True
+        version = self.table_version(table_name)
+        return version is None or version != entry.get("version")
+
+    def append_conflict(self, table, entry, version, engine=None):
+        """
+        Why the snapshot's rows may no longer be a prefix of the table, or None if
+        appending above the watermark is safe: the table was recreated or truncated
+        (version counter went backwards, or the watermark row is gone) or rows at or
+        below the watermark were deleted.
+        """
+        stored = entry.get("version")
+        if stored is not None and version is not None and version[0] < stored[0]:
+            return f"version went back from {stored[0]} to {version[0]}"
+        key = primary_key(table)
+        query = text(
+            f"SELECT MAX({key}), SUM(CASE WHEN {key} <= :watermark THEN 1 ELSE 0 END) FROM {table.name}"
+        )
+        with (engine or get_engine()).connect() as conn:
+            max_key, covered = conn.execute(query, {"watermark": entry["watermark"]}).one()
+        if max_key is None or max_key < entry["watermark"]:
+            return f"max {key} {max_key} is below the watermark {entry['watermark']}"
+        if (covered or 0) != entry["rows"]:
+            return f"{covered or 0} rows at or below the watermark, snapshot has {entry['rows']}"
+        return None
+
+    def refresh_table(self, table_name, full=False, chunk_rows=100_000, engine=None):
+        manifest = self.load_manifest()
+        entry = manifest.get(table_name)
+        # Read before the rows, so a write in between shows up as stale next time
+        version = self.table_version(table_name, engine)
+        if entry is not None and not full and version is not None and version == entry.get("version"):
+            logger.info(f"Snapshot {table_name}: up to date (version {version[0]})")
+            return {"table": table_name, "rows": 0, "seconds": 0.0, "mode": "unchanged"}
+        table = Base.metadata.tables[table_name]
+        key = primary_key(table)
+        append = entry is not None and not full and table_name in APPEND_ONLY_TABLES
+        if append:
+            reason = self.append_conflict(table, entry, version, engine)
+            if reason is not None:
+                logger.warning(f"Snapshot {table_name}: {reason}, rewriting it in full")
+                append = False
+        watermark = entry["watermark"] if append else None
+
+        schema = arrow_schema(table)
+        table_dir = os.path.join(self.root, table_name)
+        os.makedirs(table_dir, exist_ok=True)
+        part = f"part-{datetime.utcnow():%Y%m%dT%H%M%S%f}.arrow"
+        tmp_path = os.path.join(table_dir, f"{part}.tmp")
+
+        start = time.perf_counter()
+        rows, max_key = 0, watermark
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for chunk in stream_chunks(engine or get_engine(), table, watermark, chunk_rows):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                rows += len(chunk)
+                chunk_max = int(chunk[key].max())
+                max_key = chunk_max if max_key is None else max(max_key, chunk_max)
+        elapsed = time.perf_counter() - start
+
+        if append and rows == 0:
+            os.remove(tmp_path)
+            entry["version"] = version
+            self.save_manifest(manifest)
+            logger.info(f"Snapshot {table_name}: up to date ({key} {watermark})")
+            return {"table": table_name, "rows": 0, "seconds": round(elapsed, 2), "mode": "append"}
+
+        os.replace(tmp_path, os.path.join(table_dir, part))
+        stale = [] if append else (entry or {}).get("parts", [])
+        manifest[table_name] = {
+            "parts": (entry["parts"] if append else []) + [part],
+            "watermark": max_key,
+            "rows": (entry["rows"] if append else 0) + rows,
+            "version": version,
+            "refreshed_at": datetime.utcnow().isoformat(),
+        }
+        # Readers only open parts listed in the manifest, so replaced parts go after it is saved
+        self.save_manifest(manifest)
+        for name in stale:
+            path = os.path.join(table_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+        mode = "append" if append else "full"
+        logger.info(f"Snapshot {table_name}: {rows:,} rows ({mode}) in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+        return {"table": table_name, "rows": rows, "seconds": round(elapsed, 2), "mode": mode}
+
+    def refresh(self, tables=None, full=False, chunk_rows=100_000):
+        return [self.refresh_table(table_name, full, chunk_rows) for table_name in tables or SNAPSHOT_TABLES]
+
+    def read_table(self, table_name, columns=None, filter=None):
+        """
+        Memory-mapped Arrow table over all parts, optionally projected and filtered
+        with a pyarrow.compute expression.
+        """
+        entry = self.load_manifest()[table_name]
+        parts = []
+        for name in entry["parts"]:
+            # The mapping stays alive for as long as buffers of the table reference it
+            source = pa.memory_map(os.path.join(self.root, table_name, name), "r")
+            part = pa.ipc.open_file(source).read_all()
+            parts.append(part.select(columns) if columns else part)
+        table = pa.concat_tables(parts)
+        if filter is not None:
+            table = table.filter(filter)
+        return table
+
+    def read(self, table_name, columns=None, filter=None, dtypes=None):
+        """
+        read_table as a DataFrame with read_frame's dtypes, timestamps as datetime64[ns].
+        """
+        table = self.read_table(table_name, columns, filter)
+        df = table.to_pandas(split_blocks=True, coerce_temporal_nanoseconds=True)
+        return apply_dtypes(df, dtypes)
+
+@lru_cache()
+def get_snapshot_store():
+    return SnapshotStore()
+
+def use_snapshot(table_name, snapshot=None):
+    """
+    Whether a training read of table_name should come from the snapshot store.
+    snapshot=None follows TRAINING_SNAPSHOTS; without a snapshot, reads fall back to Postgres.
+    Snapshots are only as current as the last scripts/refresh_snapshots.py run, so refresh
+    them before training; a snapshot behind the database is used but logged as stale.
+    """
+    snapshot = settings.TRAINING_SNAPSHOTS if snapshot is None else snapshot
+    if not snapshot:
+        return False
+    store = get_snapshot_store()
+    if not store.has(table_name):
+        logger.warning(f"No snapshot of {table_name}, reading from Postgres (run scripts/refresh_snapshots.py)")
+        return False
+    if store.is_stale(table_name):
+        logger.warning(f"Snapshot of {table_name} is behind the database (run scripts/refresh_snapshots.py before training)")
+    return True
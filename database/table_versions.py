@@ -0,0 +1,94 @@
+import os
+import sys
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import ProgrammingError
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.schema import Base, TableVersion
+
+logger = logging.getLogger(__name__)
+
+VERSION_TRIGGER = "bump_table_version"
+
+# Runs in the writing transaction, so a version moves exactly when the write commits and
+# never otherwise (pg_stat_user_tables counters are flushed lazily and can be reset).
+# Statement-level: one upsert per INSERT/UPDATE/DELETE/TRUNCATE/COPY, not per row.
+# updated_at is the transaction start, which keeps versions distinct when a table is
+# dropped and recreated and its counter starts over.
+VERSION_FUNCTION_DDL = text(f"""
+CREATE OR REPLACE FUNCTION {VERSION_TRIGGER}() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version, updated_at)
+    VALUES (TG_TABLE_NAME, 1, now())
+    ON CONFLICT (table_name) DO UPDATE
+    SET version = table_versions.version + 1, updated_at = now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+INSTALLED_TRIGGERS_QUERY = text("""
+    SELECT c.relname
+    FROM pg_trigger t
+    JOIN pg_class c ON c.oid = t.tgrelid
+    WHERE t.tgname = :trigger AND pg_table_is_visible(c.oid)
+""")
+
+TABLE_VERSIONS_QUERY = text("""
+    SELECT table_name, version, updated_at
+    FROM table_versions
+    WHERE table_name = ANY(:tables)
+""")
+
+def versioned_tables(metadata=Base.metadata):
+    return [table.name for table in metadata.sorted_tables if table.name != TableVersion.__tablename__]
+
+def version_trigger_ddl(table_name):
+    return (
+        f'CREATE TRIGGER {VERSION_TRIGGER} AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "{table_name}" '
+        f'FOR EACH STATEMENT EXECUTE FUNCTION {VERSION_TRIGGER}()'
+    )
+
+def missing_version_triggers(conn):
+    """
+    Existing versioned tables without the trigger.
+    """
+    existing_tables = set(inspect(conn).get_table_names())
+    installed = {row[0] for row in conn.execute(INSTALLED_TRIGGERS_QUERY, {"trigger": VERSION_TRIGGER})}
+    return [name for name in versioned_tables() if name in existing_tables and name not in installed]
+
+def install_version_triggers(conn, tables=None):
+    """
+    Creates table_versions if needed and (re)installs the trigger on `tables`
+    (default: all existing versioned tables). Idempotent.
+    """
+    TableVersion.__table__.create(conn, checkfirst=True)
+    conn.execute(VERSION_FUNCTION_DDL)
+    existing_tables = set(inspect(conn).get_table_names())
+    tables = [name for name in (tables or versioned_tables()) if name in existing_tables]
+    for name in tables:
+        conn.execute(text(f'DROP TRIGGER IF EXISTS {VERSION_TRIGGER} ON "{name}"'))
+        conn.execute(text(version_trigger_ddl(name)))
+        # A row from the start, so "no row" reliably means "not versioned"
+        conn.execute(text("""
+            INSERT INTO table_versions (table_name, version, updated_at)
+            VALUES (:name, 0, now())
+            ON CONFLICT (table_name) DO NOTHING
+        """), {"name": name})
+    return tables
+
+def read_table_versions(conn, tables):
+    """
+    {table: (version, updated_at)} for the given tables. Tables without the trigger are
+    missing from the result; callers must treat them as unversioned and not cache.
+    """
+    try:
+        rows = conn.execute(TABLE_VERSIONS_QUERY, {"tables": list(tables)}).fetchall()
+    except ProgrammingError:
+        conn.rollback()
+        logger.warning("table_versions is missing, caching is disabled (run scripts/migrate.py)")
+        return {}
+    return {row[0]: (int(row[1]), row[2].isoformat()) for row in rows}
@@ -0,0 +1,206 @@
+import os
+import re
+import sys
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+def normalize_question(question):
+    """
+    Lowercases, drops punctuation and collapses whitespace so trivially different
+    phrasings of the same question share a key.
+    """
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+class AnswerCache:
+    """
+    Bounded LRU cache of agent answers keyed on the normalized question, with a TTL
+    per route (short for SQL, long for RAG) and optional embedding-similarity matching.
+    RAG answers are also dropped when the knowledge base is re-ingested.
+    """
+    def __init__(self, max_size=None, ttl_by_route=None, embed_fn=None, aembed_fn=None, similarity_threshold=None):
+        self.max_size = max_size or settings.ANSWER_CACHE_MAX_SIZE
+        self.ttl_by_route = ttl_by_route or {
+            "sql": settings.ANSWER_CACHE_SQL_TTL_SECONDS,
+            "rag": settings.ANSWER_CACHE_RAG_TTL_SECONDS,
+        }
+        self.embed_fn = embed_fn
+        self.aembed_fn = aembed_fn
+        self.similarity_threshold = settings.ANSWER_CACHE_SIMILARITY_THRESHOLD if similarity_threshold is None else similarity_threshold
+        self.kb_version = 0
+        self._entries = OrderedDict()
+        # Embeddings computed by a missed get(), reused by the put() that follows it
+        self._miss_embeddings = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "saved_seconds": 0.0, "evictions": 0}
+
+    @property
+    def semantic(self):
+        return self.embed_fn is not None
+
+    def _is_valid(self, entry, now):
+        return entry["expires_at"] > now and (entry["route"] != "rag" or entry["kb_version"] == self.kb_version)
+
+    def _lookup(self, key, embedding, count_miss=True):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._is_valid(entry, now):
+                del self._entries[key]
+                entry = None
+            
+            semantic_hit = False
+            if entry is None and embedding is not None:
+                best_key, best_score = None, self.similarity_threshold
+                for other_key, other in self._entries.items():
+                    if other["embedding"] is None or not self._is_valid(other, now):
+                        continue
+                    score = float(np.dot(embedding, other["embedding"]))
+                    if score >= best_score:
+                        best_key, best_score = other_key, score
+                if best_key is not None:
+                    entry, key, semantic_hit = self._entries[best_key], best_key, True
+            
+            if entry is None:
+                self._stats["misses"] += int(count_miss)
+                return None
+            
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            self._stats["semantic_hits"] += int(semantic_hit)
+            self._stats["saved_seconds"] += entry["latency"]
+            return entry["answer"]
+
+    def _store(self, key, answer, route, latency, embedding):
+        ttl = self.ttl_by_route.get(route)
+        if not ttl:
+            return
+        with self._lock:
+            self._entries[key] = {
+                "answer": answer,
+                "route": route,
+                "expires_at": time.monotonic() + ttl,
+                "kb_version": self.kb_version,
+                "latency": latency,
+                "embedding": embedding,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _embed(self, question):
+        if not self.semantic:
+            return None
+        try:
+            return self._unit(self.embed_fn(question))
+        except Exception as e:
+            logger.warning(f"Answer cache embedding failed: {e}")
+            return None
+
+    def _remember_embedding(self, key, embedding):
+        if embedding is None:
+            return
+        with self._lock:
+            self._miss_embeddings[key] = embedding
+            self._miss_embeddings.move_to_end(key)
+            # Questions that miss but are never answered (errors, no TTL) don't accumulate
+            while len(self._miss_embeddings) > self.max_size:
+                self._miss_embeddings.popitem(last=False)
+
+    def _take_embedding(self, key):
+        with self._lock:
+            return self._miss_embeddings.pop(key, None)
+
+    async def _aembed(self, question):
+        if self.aembed_fn is None:
+            return self._embed(question)
+        try:
+            return self._unit(await self.aembed_fn(question))
+        except Exception as e:
+            logger.warning(f"Answer cache embedding failed: {e}")
+            return None
+
+    def get(self, question):
+        """
+        Returns the cached answer or None. The question embedding is only computed on an
+        exact-key miss, and is kept for the put() of the same question.
+        """
+        key = normalize_question(question)
+        answer = self._lookup(key, None, count_miss=not self.semantic)
+        if answer is not None or not self.semantic:
+            return answer
+        embedding = self._embed(question)
+        answer = self._lookup(key, embedding)
+        if answer is None:
+            self._remember_embedding(key, embedding)
+        return answer
+
+    async def aget(self, question):
+        key = normalize_question(question)
+        answer = self._lookup(key, None, count_miss=not self.semantic)
+        if answer is not None or not self.semantic:
+            return answer
+        embedding = await self._aembed(question)
+        answer = self._lookup(key, embedding)
+        if answer is None:
+            self._remember_embedding(key, embedding)
+        return answer
+
+    def put(self, question, answer, route, latency):
+        key = normalize_question(question)
+        embedding = self._take_embedding(key) if self.semantic else None
+        if embedding is None:
+            embedding = self._embed(question)
+        self._store(key, answer, route, latency, embedding)
+
+    async def aput(self, question, answer, route, latency):
+        key = normalize_question(question)
+        embedding = self._take_embedding(key) if self.semantic else None
+        if embedding is None and self.semantic:
+            embedding = await self._aembed(question)
+        self._store(key, answer, route, latency, embedding)
+
+    def invalidate_knowledge_base(self):
+        """
+        Called after re-ingestion: every cached RAG answer becomes invalid.
+        """
+        with self._lock:
+            self.kb_version += 1
+            stale = [key for key, entry in self._entries.items() if entry["route"] == "rag"]
+            for key in stale:
+                del self._entries[key]
+        logger.info(f"Answer cache: dropped {len(stale)} RAG answers after re-ingestion")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._miss_embeddings.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        stats["max_size"] = self.max_size
+        stats["semantic"] = self.semantic
+        return stats
@@ -0,0 +1,134 @@
+import os
+import sys
+import logging
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logger = logging.getLogger(__name__)
+
+class CompiledForest:
+    """
+    Flat array representation of a fitted RandomForestClassifier.
+    
+    All trees are concatenated into node-indexed feature/threshold/child/value arrays
+    and evaluated with a branch-free NumPy traversal. Leaves point to themselves, so
+    every row can be stepped max_depth times regardless of where it lands.
+    The arithmetic mirrors sklearn (float32 inputs, per-tree normalized leaf values
+    accumulated in estimator order, then divided by n_estimators), so results are
+    bit-for-bit identical to forest.predict_proba when the forest runs with n_jobs=1.
+    """
+    def __init__(self, forest):
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        node_counts = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+        node_offsets = np.repeat(offsets, node_counts)
+        node_ids = np.arange(node_counts.sum())
+        
+        left = np.concatenate([tree.children_left for tree in trees])
+        right = np.concatenate([tree.children_right for tree in trees])
+        is_leaf = left == -1
+        
+        self.left = np.where(is_leaf, node_ids, left + node_offsets).astype(np.intp)
+        self.right = np.where(is_leaf, node_ids, right + node_offsets).astype(np.intp)
+        self.feature = np.where(is_leaf, 0, np.concatenate([tree.feature for tree in trees])).astype(np.intp)
+        self.threshold = np.concatenate([tree.threshold for tree in trees]).astype(np.float64)
+        
+        # Per-node class probabilities, normalized exactly as DecisionTreeClassifier.predict_proba
+        values = np.concatenate([tree.value[:, 0, :] for tree in trees]).astype(np.float64)
+        normalizer = values.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        self.value = values / normalizer
+        
+        self.roots = offsets.astype(np.intp)
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self.n_features = forest.n_features_in_
+        self.classes_ = forest.classes_
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """
+        Leaf node index per (tree, row), shape (n_estimators, n_rows).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[np.newaxis, :]
+        nodes = np.repeat(self.roots[:, np.newaxis], X.shape[0], axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        leaf_values = self.value[self.apply(X)]
+        proba = np.zeros(leaf_values.shape[1:], dtype=np.float64)
+        for tree_values in leaf_values:
+            proba += tree_values
+        proba /= self.n_estimators
+        return proba
+
+    def verify(self, forest, X):
+        """
+        True if predictions match forest.predict_proba bit-for-bit on X.
+        """
+        return np.array_equal(self.predict_proba(X), forest.predict_proba(X))
+
+class ProbabilityLookup:
+    """
+    Precomputed P(class) table over an integer-valued feature crossed with a small
+    categorical code, e.g. (source_encoded, response_time_minutes).
+    
+    Integer values below floor(min threshold) or above floor(max threshold) + 1 take
+    the same path through every tree as the nearest edge, so clamping to that range
+    is exact. Non-integer values fall back to the compiled traversal.
+    """
+    def __init__(self, compiled, n_codes, code_feature=0, value_feature=1, class_index=1):
+        self.compiled = compiled
+        self.code_feature = code_feature
+        self.value_feature = value_feature
+        self.class_index = class_index
+        
+        split_thresholds = compiled.threshold[(compiled.left != compiled.right) & (compiled.feature == value_feature)]
+        if len(split_thresholds):
+            self.low = int(np.floor(split_thresholds.min()))
+            self.high = int(np.floor(split_thresholds.max())) + 1
+        else:
+            self.low = self.high = 0
+        
+        codes, values = np.meshgrid(np.arange(n_codes), np.arange(self.low, self.high + 1), indexing='ij')
+        grid = self._rows(codes.reshape(-1), values.reshape(-1))
+        self.grid = grid
+        self.table = compiled.predict_proba(grid)[:, class_index].reshape(n_codes, -1)
+
+    def _rows(self, codes, values):
+        X = np.zeros((len(codes), self.compiled.n_features), dtype=np.float64)
+        X[:, self.code_feature] = codes
+        X[:, self.value_feature] = values
+        return X
+
+    def predict(self, codes, values):
+        """
+        Probabilities for encoded rows; codes must be valid category codes.
+        """
+        codes = np.asarray(codes, dtype=np.intp)
+        values = np.asarray(values, dtype=np.float64)
+        out = np.empty(len(codes), dtype=np.float64)
+        
+        integral = values == np.floor(values)
+        clamped = np.clip(values[integral], self.low, self.high).astype(np.intp) - self.low
+        out[integral] = self.table[codes[integral], clamped]
+        
+        if not integral.all():
+            rest = ~integral
+            out[rest] = self.compiled.predict_proba(self._rows(codes[rest], values[rest]))[:, self.class_index]
+        return out
+
+    def predict_one(self, code, value):
+        if value == int(value):
+            column = min(max(int(value), self.low), self.high) - self.low
+            return float(self.table[code, column])
+        return float(self.predict([code], [value])[0])
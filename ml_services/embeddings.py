@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from langchain_core.embeddings import Embeddings
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 30.0
+
+def approximate_tokens(text):
+    # ~4 characters per token for English prose
+    return len(text) // 4 + 1
+
+def openai_token_counter(model):
+    import tiktoken
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+def token_batches(texts, count_tokens, max_tokens, max_size):
+    """
+    Splits texts into consecutive batches of at most max_size texts and max_tokens tokens.
+    A single text over the budget gets a batch of its own.
+    """
+    batches, current, current_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        n_tokens = count_tokens(text)
+        if current and (current_tokens + n_tokens > max_tokens or len(current) >= max_size):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += n_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+class HashingEmbeddings(Embeddings):
+    """
+    Local, deterministic embeddings from hashed word uni/bigrams (L2-normalized).
+    No network or model download, so ingestion runs offline and in CI; retrieval
+    quality is lexical rather than semantic.
+    """
+    def __init__(self, dimensions=None):
+        self.dimensions = dimensions or settings.EMBEDDING_HASHING_DIMENSIONS
+        self.model = f"hashing-{self.dimensions}"
+        self.namespace = f"hashing:{self.model}" # Identifies the vector space for caches and index manifests
+        self.vectorizer = HashingVectorizer(
+            n_features=self.dimensions,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm="l2",
+            dtype=np.float32
+        )
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return self.vectorizer.transform(texts).toarray().tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings backend: documents are sent in token-budgeted batches, up to
+    max_concurrency at a time, and failed batches are retried with exponential backoff.
+    """
+    def __init__(self, embeddings, count_tokens=approximate_tokens, max_batch_tokens=None,
+                 max_batch_size=None, max_concurrency=None, max_retries=None):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+        self.namespace = getattr(embeddings, "namespace", self.model)
+        self.count_tokens = count_tokens
+        self.max_batch_tokens = max_batch_tokens or settings.EMBEDDING_BATCH_MAX_TOKENS
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
+        self.max_concurrency = max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY
+        self.max_retries = settings.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+
+    def backoff(self, attempt):
+        return min(MAX_BACKOFF_SECONDS, 2 ** attempt) * (0.5 + random.random() / 2)
+
+    def embed_batch(self, texts):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"Embedding batch of {len(texts)} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    async def aembed_batch(self, texts, semaphore):
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await self.embeddings.aembed_documents(texts)
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self.backoff(attempt)
+                    logger.warning(f"Embedding batch of {len(texts)} failed ({e}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+    def embed_documents(self, texts):
+        batches = token_batches(texts, self.count_tokens, self.max_batch_tokens, self.max_batch_size)
+        batch_texts = [[texts[i] for i in batch] for batch in batches]
+        if len(batches) <= 1 or self.max_concurrency == 1:
+            results = [self.embed_batch(batch) for batch in batch_texts]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                results = list(executor.map(self.embed_batch, batch_texts))
+
+        vectors = [None] * len(texts)
+        for batch, batch_vectors in zip(batches, results):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+        return vectors
+
+    async def aembed_documents(self, texts):
+        batches = token_batches(texts, self.count_tokens, self.max_batch_tokens, self.max_batch_size)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*[
+            self.aembed_batch([texts[i] for i in batch], semaphore) for batch in batches
+        ])
+
+        vectors = [None] * len(texts)
+        for batch, batch_vectors in zip(batches, results):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text):
+        return await self.embeddings.aembed_query(text)
+
+def get_embeddings(backend=None):
+    """
+    Builds the embeddings backend selected by EMBEDDING_BACKEND ("openai" or "hashing").
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "hashing":
+        return HashingEmbeddings()
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        # Batching happens here, so the client sends each of our batches as one request
+        embeddings = OpenAIEmbeddings(chunk_size=settings.EMBEDDING_BATCH_MAX_SIZE)
+        batched = BatchedEmbeddings(embeddings, count_tokens=openai_token_counter(embeddings.model))
+        batched.namespace = f"openai:{embeddings.model}"
+        return batched
+    raise ValueError(f"Unknown embedding backend: {backend}")
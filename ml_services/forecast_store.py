@@ -0,0 +1,191 @@
+import os
+import sys
+import time
+import threading
+import logging
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from database.schema import Forecast, ForecastWatermark
+from database.engine import get_engine, read_frame, read_frame_async
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+LATEST_RUN_QUERY = text("""
+SELECT date, forecast, run_id, generated_at
+FROM forecasts
+WHERE dealer_id = :dealer_id
+  AND run_id = (
+    SELECT run_id FROM forecasts
+    WHERE dealer_id = :dealer_id
+    ORDER BY generated_at DESC
+    LIMIT 1
+  )
+ORDER BY date
+""")
+
+class ForecastStore:
+    """
+    Read/write access to precomputed forecasts, with an in-process TTL cache
+    in front of the forecasts table.
+    """
+    def __init__(self, ttl_seconds=None):
+        self.ttl_seconds = settings.FORECAST_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._table_checked = False
+
+    def ensure_table(self):
+        if not self._table_checked:
+            Forecast.__table__.create(get_engine(), checkfirst=True)
+            ForecastWatermark.__table__.create(get_engine(), checkfirst=True)
+            self._table_checked = True
+
+    def upsert(self, df, run_id, generated_at):
+        """
+        Bulk-upserts a frame with dealer_id, date and forecast columns.
+        """
+        rows = [
+            {
+                "dealer_id": int(r.dealer_id),
+                "date": pd.Timestamp(r.date).to_pydatetime(),
+                "forecast": float(r.forecast),
+                "run_id": run_id,
+                "generated_at": generated_at,
+            }
+            for r in df.itertuples(index=False)
+        ]
+        if not rows:
+            return 0
+        
+        stmt = insert(Forecast.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dealer_id", "date"],
+            set_={
+                "forecast": stmt.excluded.forecast,
+                "run_id": stmt.excluded.run_id,
+                "generated_at": stmt.excluded.generated_at,
+            }
+        )
+        self.ensure_table()
+        with get_engine().begin() as conn:
+            conn.execute(stmt, rows)
+        
+        self.invalidate()
+        logger.info(f"Upserted {len(rows)} forecast rows for run {run_id}")
+        return len(rows)
+
+    def load_watermarks(self):
+        """
+        Per-dealer high-water marks from the last refresh, keyed by dealer_id.
+        """
+        self.ensure_table()
+        df = read_frame("SELECT * FROM forecast_watermarks")
+        return {int(row['dealer_id']): row for row in df.to_dict(orient="records")}
+
+    def save_watermarks(self, rows):
+        if not rows:
+            return 0
+        
+        stmt = insert(ForecastWatermark.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dealer_id"],
+            set_={col: stmt.excluded[col] for col in rows[0] if col != "dealer_id"}
+        )
+        self.ensure_table()
+        with get_engine().begin() as conn:
+            conn.execute(stmt, rows)
+        return len(rows)
+
+    def load(self, dealer_id):
+        """
+        Reads the latest stored run for a dealer straight from the database.
+        """
+        self.ensure_table()
+        df = read_frame(LATEST_RUN_QUERY, params={"dealer_id": dealer_id})
+        return self.payload_from_frame(dealer_id, df)
+
+    async def aload(self, dealer_id):
+        df = await read_frame_async(LATEST_RUN_QUERY, params={"dealer_id": dealer_id})
+        return self.payload_from_frame(dealer_id, df)
+
+    def get(self, dealer_id):
+        """
+        Cache-first lookup. Returns None when the dealer has no stored forecast.
+        """
+        cached = self.cached(dealer_id)
+        if cached is not None:
+            return cached
+        
+        payload = self.load(dealer_id)
+        if payload is not None:
+            self.put(dealer_id, payload)
+            return self.with_age(payload)
+        return None
+
+    async def aget(self, dealer_id):
+        """
+        Async cache-first lookup for the API request path.
+        """
+        cached = self.cached(dealer_id)
+        if cached is not None:
+            return cached
+        
+        payload = await self.aload(dealer_id)
+        if payload is not None:
+            self.put(dealer_id, payload)
+            return self.with_age(payload)
+        return None
+
+    def cached(self, dealer_id):
+        with self._lock:
+            entry = self._cache.get(dealer_id)
+            if entry is not None and entry[0] > time.monotonic():
+                return self.with_age(entry[1])
+        return None
+
+    def payload_from_frame(self, dealer_id, df):
+        if df.empty:
+            return None
+        generated_at = pd.Timestamp(df['generated_at'].iloc[0]).to_pydatetime()
+        return self.build_payload(dealer_id, df[['date', 'forecast']], "store", generated_at, df['run_id'].iloc[0])
+
+    def put(self, dealer_id, payload):
+        with self._lock:
+            self._cache[dealer_id] = (time.monotonic() + self.ttl_seconds, payload)
+
+    def invalidate(self, dealer_id=None):
+        with self._lock:
+            if dealer_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(dealer_id, None)
+
+    @staticmethod
+    def build_payload(dealer_id, forecast_df, source, generated_at, run_id=None):
+        return {
+            "dealer_id": dealer_id,
+            "source": source,
+            "run_id": run_id,
+            "generated_at": generated_at,
+            "forecast": forecast_df.to_dict(orient="records"),
+        }
+
+    @staticmethod
+    def with_age(payload):
+        """
+        Adds the staleness fields, computed at read time so cached entries age correctly.
+        """
+        age_seconds = (datetime.utcnow() - payload["generated_at"]).total_seconds()
+        return {
+            **payload,
+            "age_seconds": round(age_seconds, 1),
+            "is_stale": age_seconds > settings.FORECAST_MAX_AGE_HOURS * 3600,
+        }
@@ -1,30 +1,132 @@
 import pandas as pd
 import numpy as np
 from xgboost import XGBRegressor
-from sqlalchemy import create_engine
 import os
 import sys
-from datetime import timedelta
+import json
+import time
+from datetime import datetime, timedelta
 import logging
+import pyarrow as pa
+import pyarrow.compute as pc
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import get_settings
+from database.engine import read_frame, apply_dtypes, TRANSACTION_DTYPES, DEALER_DTYPES
+from database.snapshots import get_snapshot_store, use_snapshot
+from ml_services.model_registry import ModelRegistry
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-def get_sales_data(dealer_id=None):
-    engine = create_engine(settings.DATABASE_URL)
-    query = """
-    SELECT date, sale_price 
-    FROM transactions 
+FEATURES = ['day_of_week', 'month', 'year', 'day_of_year', 'lag_1', 'lag_7', 'lag_30']
+STATIC_FEATURES = ['size_code', 'n_brands', 'churn_risk_score']
+GLOBAL_FEATURES = FEATURES + ['level_30'] + STATIC_FEATURES
+LAGS = [1, 7, 30]
+MAX_LAG = max(LAGS)
+SIZE_CODES = {"SMALL": 0, "MEDIUM": 1, "LARGE": 2}
+BOOSTER_DIR = os.path.join(settings.MODELS_DIR, "forecasts", "boosters")
+
+def get_daily_sales(dealer_id=None, start_date=None, end_date=None, fill_gaps=True, snapshot=False):
+    """
+    Daily revenue per dealer aggregated in the database, so only one row per
+    dealer-day is transferred. With fill_gaps, each dealer's series is zero-filled
+    between its first and last sale day via generate_series.
+    With snapshot (None follows TRAINING_SNAPSHOTS), the same frame is built from the
+    local transactions snapshot instead (see daily_sales_from_snapshot).
+    Returns dealer_id, date, sale_price ordered by dealer and date.
     """
-    if dealer_id:
-        query += f" WHERE dealer_id = {dealer_id}"
+    if use_snapshot("transactions", snapshot):
+        return daily_sales_from_snapshot(dealer_id, start_date, end_date, fill_gaps)
     
-    df = pd.read_sql(query, engine)
-    return df
+    filters, params = [], {}
+    if dealer_id is not None:
+        filters.append("dealer_id = :dealer_id")
+        params["dealer_id"] = int(dealer_id)
+    if start_date is not None:
+        filters.append("date >= :start_date")
+        params["start_date"] = start_date
+    if end_date is not None:
+        filters.append("date < :end_date")
+        params["end_date"] = end_date
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    
+    daily = f"""
+    SELECT dealer_id, date_trunc('day', date) AS day, SUM(sale_price) AS sale_price
+    FROM transactions
+    {where}
+    GROUP BY dealer_id, date_trunc('day', date)
+    """
+    if fill_gaps:
+        query = f"""
+        WITH daily AS ({daily}),
+        bounds AS (
+            SELECT dealer_id, MIN(day) AS first_day, MAX(day) AS last_day
+            FROM daily
+            GROUP BY dealer_id
+        )
+        SELECT b.dealer_id, g.day::date AS date, COALESCE(d.sale_price, 0) AS sale_price
+        FROM bounds b
+        CROSS JOIN LATERAL generate_series(b.first_day, b.last_day, interval '1 day') AS g(day)
+        LEFT JOIN daily d ON d.dealer_id = b.dealer_id AND d.day = g.day
+        ORDER BY b.dealer_id, g.day
+        """
+    else:
+        query = f"""
+        SELECT dealer_id, day::date AS date, sale_price
+        FROM ({daily}) daily
+        ORDER BY dealer_id, day
+        """
+    
+    return read_frame(query, params=params, dtypes=TRANSACTION_DTYPES, parse_dates=['date'])
+
+def daily_sales_from_snapshot(dealer_id=None, start_date=None, end_date=None, fill_gaps=True):
+    """
+    get_daily_sales over the memory-mapped transactions snapshot: filtered and
+    aggregated in Arrow, so only the daily rows are converted to pandas.
+    """
+    filters = []
+    if dealer_id is not None:
+        filters.append(pc.field("dealer_id") == int(dealer_id))
+    if start_date is not None:
+        filters.append(pc.field("date") >= pa.scalar(pd.Timestamp(start_date).to_pydatetime(), pa.timestamp("us")))
+    if end_date is not None:
+        filters.append(pc.field("date") < pa.scalar(pd.Timestamp(end_date).to_pydatetime(), pa.timestamp("us")))
+    expression = None
+    for f in filters:
+        expression = f if expression is None else expression & f
+    
+    table = get_snapshot_store().read_table("transactions", ["dealer_id", "date", "sale_price"], expression)
+    daily = pa.table({
+        "dealer_id": table["dealer_id"],
+        "date": pc.floor_temporal(table["date"], unit="day"),
+        "sale_price": table["sale_price"],
+    }).group_by(["dealer_id", "date"]).aggregate([("sale_price", "sum")])
+    df = daily.to_pandas(coerce_temporal_nanoseconds=True).rename(columns={"sale_price_sum": "sale_price"})
+    df = df.dropna(subset=["dealer_id", "date"])
+    
+    if fill_gaps and not df.empty:
+        # Every day between each dealer's first and last sale, zero where nothing was sold
+        bounds = df.groupby("dealer_id")["date"].agg(["min", "max"])
+        lengths = ((bounds["max"] - bounds["min"]).dt.days + 1).to_numpy()
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        grid = pd.DataFrame({
+            "dealer_id": np.repeat(bounds.index.to_numpy(), lengths),
+            "date": np.repeat(bounds["min"].to_numpy(), lengths) + offsets.astype("timedelta64[D]"),
+        })
+        df = grid.merge(df, on=["dealer_id", "date"], how="left").fillna({"sale_price": 0.0})
+    
+    df = df.sort_values(["dealer_id", "date"], ignore_index=True)[["dealer_id", "date", "sale_price"]]
+    return apply_dtypes(df, TRANSACTION_DTYPES)
+
+def history_start():
+    """
+    Start of the training window (FORECAST_HISTORY_DAYS, 0 = all history).
+    """
+    if settings.FORECAST_HISTORY_DAYS <= 0:
+        return None
+    return datetime.utcnow() - timedelta(days=settings.FORECAST_HISTORY_DAYS)
 
 def create_features(df):
     """
@@ -37,55 +139,569 @@ def create_features(df):
     df['day_of_year'] = df['date'].dt.dayofyear
     
     # Lag features
-    for lag in [1, 7, 30]:
+    for lag in LAGS:
         df[f'lag_{lag}'] = df['sale_price'].shift(lag)
         
     return df
 
-def train_forecast_model(dealer_id=None):
-    logger.info(f"Training XGBoost forecast model for dealer_id={dealer_id}...")
-    df = get_sales_data(dealer_id)
+def fit_series_forecast(df, horizon, strategy="recursive", init_model=None, since=None):
+    """
+    Fits the per-dealer XGBoost model on a daily series (date, sale_price) and
+    forecasts the next `horizon` days.
+    strategy='recursive' feeds predictions back into the lags; 'static' is the
+    original method that holds future lags at the last observed values.
+    With init_model (a saved booster) and since, only days after `since` are used
+    to continue boosting from the existing model instead of refitting.
+    """
+    # Feature Engineering
+    df_features = create_features(df)
+    df_features = df_features.dropna() # Drop rows with NaNs from lags
+    if since is not None:
+        df_features = df_features[df_features['date'] > since]
+    
+    if df_features.empty:
+        return None, None, "Not enough history"
+    
+    X = df_features[FEATURES]
+    y = df_features['sale_price']
+    
+    if init_model is not None:
+        model = XGBRegressor(n_estimators=settings.FORECAST_WARM_START_ROUNDS, learning_rate=0.05)
+        model.fit(X, y, xgb_model=init_model)
+    else:
+        model = XGBRegressor(n_estimators=100, learning_rate=0.05)
+        model.fit(X, y)
+    
+    # Forecast next `horizon` days
+    last_date = df['date'].max()
+    future_dates = [last_date + timedelta(days=x) for x in range(1, horizon + 1)]
+    
+    if strategy == "static":
+        future_df = pd.DataFrame({'date': future_dates})
+        future_features = create_features(pd.concat([df.tail(30), future_df])).tail(horizon)
+        future_features = future_features.ffill().fillna(0)
+        predictions = model.predict(future_features[FEATURES])
+    else:
+        panel = df['sale_price'].to_numpy(dtype=np.float64)[None, :]
+        static = np.zeros((1, len(STATIC_FEATURES)), dtype=np.float32)
+        predictions = forecast_recursive(model, panel, calendar_features(future_dates), static)[0]
+    
+    result = pd.DataFrame({'date': future_dates, 'forecast': predictions})
+    return result, model, "Success"
+
+def fit_forecast_model(dealer_id=None, horizon=None, strategy="recursive", snapshot=False):
+    """
+    Fits the XGBoost model for one dealer and forecasts the next `horizon` days.
+    Returns (forecast_df, model, status); forecast_df and model are None on failure.
+    """
+    horizon = horizon or settings.FORECAST_HORIZON_DAYS
+    if strategy == "direct":
+        logger.warning("Direct multi-horizon forecasting needs the global model; using recursive.")
+        strategy = "recursive"
+    
+    logger.info(f"Training XGBoost forecast model for dealer_id={dealer_id} ({strategy})...")
+    df = get_daily_sales(dealer_id, start_date=history_start(), snapshot=snapshot)
     
     if df.empty:
         logger.warning(f"No data found for dealer_id={dealer_id}")
-        return None, "No data found"
-        
-    # Aggregate by day
-    df['date'] = pd.to_datetime(df['date']).dt.date
-    df = df.groupby('date')['sale_price'].sum().reset_index()
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.sort_values('date')
+        return None, None, "No data found"
     
-    # Fill missing dates with 0
-    full_idx = pd.date_range(start=df['date'].min(), end=df['date'].max())
-    df = df.set_index('date').reindex(full_idx, fill_value=0).rename_axis('date').reset_index()
+    result, model, status = fit_series_forecast(df[['date', 'sale_price']], horizon, strategy)
+    if result is None:
+        logger.warning(f"{status} to train dealer_id={dealer_id}")
+    return result, model, status
+
+def train_forecast_model(dealer_id=None, snapshot=False):
+    result, _, status = fit_forecast_model(dealer_id, snapshot=snapshot)
+    return result, status
+
+def get_dealer_features(snapshot=False):
+    """
+    Static dealer-level features for the global model, indexed by dealer_id.
+    """
+    if use_snapshot("dealers", snapshot):
+        df = get_snapshot_store().read("dealers", ["dealer_id", "size", "brands", "churn_risk_score"], dtypes=DEALER_DTYPES)
+    else:
+        df = read_frame("SELECT dealer_id, size, brands, churn_risk_score FROM dealers", dtypes=DEALER_DTYPES)
+    features = pd.DataFrame({
+        'size_code': df['size'].astype(str).str.upper().map(SIZE_CODES).fillna(0),
+        'n_brands': df['brands'].fillna("").str.count(",") + 1,
+        'churn_risk_score': df['churn_risk_score'].fillna(0),
+    })
+    features.index = df['dealer_id'].to_numpy()
+    return features[STATIC_FEATURES].astype(np.float32)
+
+def build_revenue_panel(df):
+    """
+    Builds a dense dealer x day revenue matrix (zero-filled) in one bincount pass
+    from daily rows (dealer_id, date, sale_price).
+    Returns (dealer_ids, dates, panel, first_day) where first_day is each dealer's
+    first day index with sales.
+    """
+    days = df['date'].to_numpy().astype('datetime64[D]')
+    start, end = days.min(), days.max()
+    n_days = int((end - start).astype(np.int64)) + 1
     
-    # Feature Engineering
-    df_features = create_features(df)
-    df_features = df_features.dropna() # Drop rows with NaNs from lags
+    dealer_ids, dealer_idx = np.unique(df['dealer_id'].to_numpy(), return_inverse=True)
+    day_idx = (days - start).astype(np.int64)
+    flat = np.bincount(
+        dealer_idx * n_days + day_idx,
+        weights=df['sale_price'].to_numpy(dtype=np.float64),
+        minlength=len(dealer_ids) * n_days
+    )
+    panel = flat.reshape(len(dealer_ids), n_days)
+    dates = start + np.arange(n_days)
+    first_day = (panel != 0).argmax(axis=1)
+    return dealer_ids, dates, panel, first_day
+
+def calendar_features(dates):
+    idx = pd.DatetimeIndex(dates)
+    return np.column_stack([idx.dayofweek, idx.month, idx.year, idx.dayofyear]).astype(np.float32)
+
+def stack_panel_features(lags, level, calendar, static):
+    """
+    Assembles a (n_dealers * n_steps, n_features) matrix in GLOBAL_FEATURES order.
+    lags maps lag -> (n_dealers, n_steps), level is (n_dealers, n_steps),
+    calendar is (n_steps, 4) and static is (n_dealers, len(STATIC_FEATURES)).
+    """
+    n_dealers, n_steps = level.shape
+    out = np.empty((n_dealers, n_steps, len(GLOBAL_FEATURES)), dtype=np.float32)
+    out[:, :, 0:4] = calendar[None, :, :]
+    for j, lag in enumerate(LAGS):
+        out[:, :, 4 + j] = lags[lag]
+    out[:, :, 7] = level
+    out[:, :, len(GLOBAL_FEATURES) - len(STATIC_FEATURES):] = static[:, None, :]
+    return out.reshape(-1, len(GLOBAL_FEATURES))
+
+def build_training_matrix(panel, first_day, calendar, static):
+    """
+    Computes lag/level/calendar features for every dealer-day in a single vectorized pass.
+    Rows before a dealer has MAX_LAG days of its own history are masked out.
+    """
+    n_dealers, n_days = panel.shape
+    t_idx = np.arange(MAX_LAG, n_days)
     
-    X = df_features[['day_of_week', 'month', 'year', 'day_of_year', 'lag_1', 'lag_7', 'lag_30']]
-    y = df_features['sale_price']
+    lags = {lag: panel[:, t_idx - lag] for lag in LAGS}
+    cumsum = np.concatenate([np.zeros((n_dealers, 1)), np.cumsum(panel, axis=1)], axis=1)
+    level = (cumsum[:, t_idx] - cumsum[:, t_idx - MAX_LAG]) / MAX_LAG
+    
+    X = stack_panel_features(lags, level, calendar[t_idx], static)
+    y = panel[:, t_idx].reshape(-1)
+    mask = (t_idx[None, :] >= first_day[:, None] + MAX_LAG).reshape(-1)
+    return X[mask], y[mask]
+
+def build_direct_training_matrix(panel, first_day, calendar, static, horizon):
+    """
+    Training rows for the direct multi-horizon model: features as seen at an origin
+    day plus the target day's calendar and the horizon h, target y[origin + h].
+    """
+    n_dealers, n_days = panel.shape
+    cumsum = np.concatenate([np.zeros((n_dealers, 1)), np.cumsum(panel, axis=1)], axis=1)
+    blocks, targets, masks = [], [], []
+    
+    for h in range(1, horizon + 1):
+        origins = np.arange(MAX_LAG - 1, n_days - h)
+        if len(origins) == 0:
+            continue
+        lags = {lag: panel[:, origins + 1 - lag] for lag in LAGS}
+        level = (cumsum[:, origins + 1] - cumsum[:, origins + 1 - MAX_LAG]) / MAX_LAG
+        X = stack_panel_features(lags, level, calendar[origins + h], static)
+        blocks.append(np.column_stack([X, np.full(len(X), h, dtype=np.float32)]))
+        targets.append(panel[:, origins + h].reshape(-1))
+        masks.append((origins[None, :] + 1 - MAX_LAG >= first_day[:, None]).reshape(-1))
+    
+    mask = np.concatenate(masks)
+    return np.concatenate(blocks)[mask], np.concatenate(targets)[mask]
+
+def predict_features(model, X):
+    """
+    Predicts on a feature matrix, trimmed to the columns the model was trained on
+    (the per-dealer model uses the FEATURES prefix of GLOBAL_FEATURES).
+    """
+    X = X[:, :model.n_features_in_]
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None:
+        X = pd.DataFrame(X, columns=names)
+    return model.predict(X)
+
+def forecast_recursive(model, panel, calendar, static):
+    """
+    True recursive multi-step forecast: each day's predictions are written back into
+    the history so lag_1/lag_7/lag_30 and the trailing level use them on later steps.
+    Every step is a single predict call over all dealers. Returns (n_dealers, horizon).
+    """
+    n_dealers, n_days = panel.shape
+    horizon = len(calendar)
+    history = np.zeros((n_dealers, MAX_LAG + horizon))
+    seen = min(n_days, MAX_LAG)
+    history[:, MAX_LAG - seen:MAX_LAG] = panel[:, n_days - seen:]
+    
+    for step in range(horizon):
+        pos = MAX_LAG + step
+        lags = {lag: history[:, pos - lag, None] for lag in LAGS}
+        level = history[:, pos - MAX_LAG:pos].mean(axis=1, keepdims=True)
+        X = stack_panel_features(lags, level, calendar[step:step + 1], static)
+        history[:, pos] = np.maximum(predict_features(model, X), 0)
     
-    model = XGBRegressor(n_estimators=100, learning_rate=0.05)
+    return history[:, MAX_LAG:]
+
+def forecast_static(model, panel, calendar, static):
+    """
+    The original method: lags that fall in the future are held at the last observed value.
+    """
+    n_dealers, n_days = panel.shape
+    horizon = len(calendar)
+    last = n_days - 1
+    steps = np.arange(1, horizon + 1)
+    lags = {lag: panel[:, last + np.minimum(steps - lag, 0)] for lag in LAGS}
+    level = np.repeat(panel[:, -MAX_LAG:].mean(axis=1, keepdims=True), horizon, axis=1)
+    X = stack_panel_features(lags, level, calendar, static)
+    return predict_features(model, X).reshape(n_dealers, horizon)
+
+def forecast_direct(model, panel, calendar, static):
+    """
+    Direct multi-horizon forecast: all horizons for all dealers in one predict call.
+    """
+    n_dealers, n_days = panel.shape
+    horizon = len(calendar)
+    lags = {lag: np.repeat(panel[:, n_days - lag, None], horizon, axis=1) for lag in LAGS}
+    level = np.repeat(panel[:, -MAX_LAG:].mean(axis=1, keepdims=True), horizon, axis=1)
+    X = stack_panel_features(lags, level, calendar, static)
+    X = np.column_stack([X, np.tile(np.arange(1, horizon + 1, dtype=np.float32), n_dealers)])
+    return model.predict(X).reshape(n_dealers, horizon)
+
+def fit_panel_forecast(panel, dates, first_day, static, horizon, strategy="recursive", rows=None):
+    """
+    Fits the global model on a revenue panel and forecasts `horizon` days past its
+    last date. rows optionally restricts which dealers are forecast.
+    Returns (predictions of shape (n_rows, horizon), future_dates, model).
+    """
+    n_days = panel.shape[1]
+    future_dates = dates[-1] + np.arange(1, horizon + 1)
+    calendar = calendar_features(np.concatenate([dates, future_dates]))
+    model = XGBRegressor(n_estimators=300, learning_rate=0.05, max_depth=6, tree_method="hist")
+    
+    if strategy == "direct":
+        X, y = build_direct_training_matrix(panel, first_day, calendar[:n_days], static, horizon)
+    else:
+        X, y = build_training_matrix(panel, first_day, calendar[:n_days], static)
     model.fit(X, y)
     
-    # Forecast next 30 days
-    last_date = df['date'].max()
-    future_dates = [last_date + timedelta(days=x) for x in range(1, 31)]
-    future_df = pd.DataFrame({'date': future_dates})
+    if rows is not None:
+        panel, static = panel[rows], static[rows]
+    
+    forecast_fn = {"recursive": forecast_recursive, "static": forecast_static, "direct": forecast_direct}[strategy]
+    predictions = forecast_fn(model, panel, calendar[n_days:], static)
+    return predictions, future_dates, model
+
+def fit_global_forecast_model(dealer_ids=None, horizon=None, strategy=None):
+    """
+    Trains one XGBoost model over the whole dealer x day panel and forecasts every
+    dealer's horizon with batched predict calls (see fit_panel_forecast).
+    Returns (forecast_df, model, status) where forecast_df has dealer_id, date, forecast.
+    """
+    horizon = horizon or settings.FORECAST_HORIZON_DAYS
+    strategy = strategy or settings.FORECAST_STRATEGY
+    logger.info(f"Training global XGBoost forecast model ({strategy})...")
+    df = get_daily_sales(start_date=history_start(), fill_gaps=False)
     
-    # Recursive forecasting (simplified: using last known values for lags)
-    # In production, we'd update lags iteratively. For POC, we use static recent history.
-    future_features = create_features(pd.concat([df.tail(30), future_df])).tail(30)
-    # Fill lags with mean/recent values for simplicity in POC
-    future_features = future_features.fillna(method='ffill').fillna(0) 
+    if df.empty:
+        logger.warning("No transactions found for global forecast")
+        return None, None, "No data found"
     
-    X_future = future_features[['day_of_week', 'month', 'year', 'day_of_year', 'lag_1', 'lag_7', 'lag_30']]
-    predictions = model.predict(X_future)
+    panel_ids, dates, panel, first_day = build_revenue_panel(df)
+    static = get_dealer_features().reindex(panel_ids).fillna(0).to_numpy(dtype=np.float32)
     
-    result = pd.DataFrame({'date': future_dates, 'forecast': predictions})
-    return result, "Success"
+    if panel.shape[1] <= MAX_LAG:
+        return None, None, "Not enough history"
+    
+    rows = None
+    if dealer_ids is not None:
+        rows = np.isin(panel_ids, dealer_ids)
+        panel_ids = panel_ids[rows]
+    
+    predictions, future_dates, model = fit_panel_forecast(panel, dates, first_day, static, horizon, strategy, rows)
+    
+    result = pd.DataFrame({
+        'dealer_id': np.repeat(panel_ids, horizon),
+        'date': np.tile(future_dates, len(panel_ids)).astype('datetime64[ns]'),
+        'forecast': predictions.reshape(-1),
+    })
+    return result, model, "Success"
+
+def backtest_forecasts(horizon=None, methods=None, snapshot=None):
+    """
+    Holds out the last `horizon` days of the panel and scores each (mode, strategy)
+    on the same data. Returns a DataFrame with MAE, RMSE, WAPE and wall time per method.
+    Reads the local snapshots unless snapshot=False or TRAINING_SNAPSHOTS is off.
+    """
+    horizon = horizon or settings.FORECAST_HORIZON_DAYS
+    methods = methods or [
+        ("per_dealer", "static"),
+        ("per_dealer", "recursive"),
+        ("global", "static"),
+        ("global", "recursive"),
+        ("global", "direct"),
+    ]
+    
+    df = get_daily_sales(start_date=history_start(), fill_gaps=False, snapshot=snapshot)
+    if df.empty:
+        return None
+    
+    panel_ids, dates, panel, first_day = build_revenue_panel(df)
+    static = get_dealer_features(snapshot).reindex(panel_ids).fillna(0).to_numpy(dtype=np.float32)
+    n_train = panel.shape[1] - horizon
+    
+    # Only dealers every method can train on
+    eligible = n_train - first_day > MAX_LAG
+    panel, first_day, static = panel[eligible], first_day[eligible], static[eligible]
+    train, actual = panel[:, :n_train], panel[:, n_train:]
+    train_dates = dates[:n_train]
+    logger.info(f"Backtesting {len(methods)} methods on {eligible.sum()} dealers, {horizon}-day holdout...")
+    
+    report = []
+    for mode, strategy in methods:
+        start = time.perf_counter()
+        if mode == "global":
+            predictions, _, _ = fit_panel_forecast(train, train_dates, first_day, static, horizon, strategy)
+        else:
+            predictions = np.zeros_like(actual)
+            for row in range(len(train)):
+                series = pd.DataFrame({
+                    'date': pd.DatetimeIndex(train_dates[first_day[row]:]),
+                    'sale_price': train[row, first_day[row]:],
+                })
+                forecast, _, _ = fit_series_forecast(series, horizon, strategy)
+                predictions[row] = forecast['forecast'].to_numpy()
+        elapsed = time.perf_counter() - start
+        
+        errors = predictions - actual
+        report.append({
+            "mode": mode,
+            "strategy": strategy,
+            "mae": float(np.abs(errors).mean()),
+            "rmse": float(np.sqrt((errors ** 2).mean())),
+            "wape": float(np.abs(errors).sum() / max(np.abs(actual).sum(), 1e-9)),
+            "seconds": round(elapsed, 3),
+        })
+        logger.info(f"{mode}/{strategy}: MAE={report[-1]['mae']:.1f} in {elapsed:.2f}s")
+    
+    return pd.DataFrame(report)
+
+def get_dealer_ids():
+    df = read_frame("SELECT dealer_id FROM dealers ORDER BY dealer_id")
+    return df['dealer_id'].tolist()
+
+def get_transaction_watermarks():
+    """
+    Current per-dealer high-water marks of the transactions table.
+    """
+    query = """
+    SELECT dealer_id, MAX(date) AS max_date, MAX(transaction_id) AS max_transaction_id,
+           COUNT(*) AS n_transactions
+    FROM transactions
+    GROUP BY dealer_id
+    """
+    df = read_frame(query, parse_dates=['max_date'])
+    return {int(row['dealer_id']): row for row in df.to_dict(orient="records")}
+
+def watermark_changed(current, stored):
+    if current is None:
+        return False
+    if stored is None:
+        return True
+    return (
+        int(current['max_transaction_id']) != stored['max_transaction_id']
+        or int(current['n_transactions']) != stored['n_transactions']
+    )
+
+def dealer_booster_path(dealer_id):
+    return os.path.join(BOOSTER_DIR, f"dealer_{dealer_id}.json")
+
+def refresh_dealer_forecast(dealer_id, horizon, strategy, stored=None, warm_start=False):
+    """
+    Forecasts one dealer, continuing its saved booster on the new days when
+    warm_start is set and possible, otherwise refitting from scratch.
+    Returns (forecast_df, model, status, action, trained_through).
+    """
+    df = get_daily_sales(dealer_id, start_date=history_start())
+    if df.empty:
+        return None, None, "No data found", "full", None
+    
+    series = df[['date', 'sale_price']]
+    last_day = series['date'].max()
+    booster_path = dealer_booster_path(dealer_id)
+    
+    can_continue = (
+        warm_start
+        and stored is not None
+        and pd.notna(stored.get('trained_through'))
+        and pd.notna(stored.get('booster_rounds'))
+        and stored['booster_rounds'] < settings.FORECAST_MAX_BOOSTER_ROUNDS
+        and os.path.exists(booster_path)
+    )
+    if can_continue:
+        trained_through = pd.Timestamp(stored['trained_through'])
+        if last_day > trained_through:
+            result, model, status = fit_series_forecast(
+                series, horizon, strategy, init_model=booster_path, since=trained_through
+            )
+            if result is not None:
+                return result, model, status, "incremental", last_day
+    
+    result, model, status = fit_series_forecast(series, horizon, strategy)
+    return result, model, status, "full", last_day
+
+def _run_per_dealer(dealer_ids, run_dir, strategy, stored_watermarks, warm_start):
+    frames, records = [], []
+    horizon = settings.FORECAST_HORIZON_DAYS
+    os.makedirs(BOOSTER_DIR, exist_ok=True)
+    
+    for dealer_id in dealer_ids:
+        start = time.perf_counter()
+        trained_through = None
+        try:
+            forecast, model, status, action, trained_through = refresh_dealer_forecast(
+                dealer_id, horizon, strategy, stored_watermarks.get(dealer_id), warm_start
+            )
+        except Exception as e:
+            logger.error(f"Forecast failed for dealer_id={dealer_id}: {e}")
+            forecast, model, status, action = None, None, f"Error: {e}", "failed"
+        
+        record = {"dealer_id": dealer_id, "status": status, "action": action if forecast is not None else "failed"}
+        if forecast is not None:
+            model.save_model(os.path.join(run_dir, f"dealer_{dealer_id}.json"))
+            model.save_model(dealer_booster_path(dealer_id))
+            forecast['dealer_id'] = dealer_id
+            frames.append(forecast)
+            record["trained_through"] = trained_through
+            record["booster_rounds"] = model.get_booster().num_boosted_rounds()
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        records.append(record)
+    
+    return frames, records
+
+def _run_global(dealer_ids, run_dir, strategy):
+    start = time.perf_counter()
+    forecast, model, status = fit_global_forecast_model(dealer_ids, strategy=strategy)
+    seconds = round(time.perf_counter() - start, 3)
+    if forecast is None or forecast.empty:
+        # No requested dealer has history in the panel: nothing to store, save or register
+        status = status if forecast is None else "No data found"
+        return [], [{"dealer_id": dealer_id, "status": status, "action": "failed"} for dealer_id in dealer_ids]
+    
+    model.save_model(os.path.join(run_dir, "global.json"))
+    # Not served yet, but versioned with its schema so a batch's model can be found again
+    ModelRegistry().publish("forecast_global", {"model": model}, {
+        "strategy": strategy,
+        "feature_schema": {"columns": GLOBAL_FEATURES + (["horizon"] if strategy == "direct" else [])},
+        "training_data": {"transactions": {"through": str(forecast['date'].min() - pd.Timedelta(days=1))}},
+        "metrics": {"fit_seconds": seconds, "dealers": int(forecast['dealer_id'].nunique())},
+        "run_dir": run_dir,
+    })
+    covered = set(forecast['dealer_id'].unique().tolist())
+    records = [
+        {"dealer_id": dealer_id, "status": "Success", "action": "full", "seconds": seconds}
+        if dealer_id in covered else
+        {"dealer_id": dealer_id, "status": "No data found", "action": "failed"}
+        for dealer_id in dealer_ids
+    ]
+    return [forecast], records
+
+def run_batch_forecast(dealer_ids=None, store=None, mode=None, strategy=None, incremental=False, warm_start=False):
+    """
+    Batch job: forecasts every dealer, writes the run's model artifacts under
+    MODELS_DIR/forecasts/<run_id>/ and bulk-upserts the results into the forecasts table.
+    mode is 'global' (one model over all dealers) or 'per_dealer' (one model each);
+    strategy is 'recursive', 'direct' (global only) or 'static'.
+    With incremental, dealers whose transactions watermark is unchanged since the last
+    run are skipped; with warm_start (per-dealer mode), changed dealers continue their
+    saved booster on the new days instead of refitting.
+    """
+    from ml_services.forecast_store import ForecastStore
+    
+    mode = mode or settings.FORECAST_MODE
+    strategy = strategy or settings.FORECAST_STRATEGY
+    if mode not in ("global", "per_dealer"):
+        raise ValueError(f"Unknown forecast mode: {mode}")
+    
+    store = store or ForecastStore()
+    if dealer_ids is None:
+        dealer_ids = get_dealer_ids()
+    
+    generated_at = datetime.utcnow()
+    run_id = generated_at.strftime("%Y%m%dT%H%M%S")
+    run_dir = os.path.join(settings.MODELS_DIR, "forecasts", run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    start = time.perf_counter()
+    
+    current_watermarks = get_transaction_watermarks()
+    stored_watermarks = store.load_watermarks() if incremental or warm_start else {}
+    if incremental:
+        changed = [d for d in dealer_ids if watermark_changed(current_watermarks.get(d), stored_watermarks.get(d))]
+    else:
+        changed = list(dealer_ids)
+    changed_set = set(changed)
+    skipped = [d for d in dealer_ids if d not in changed_set]
+    
+    logger.info(f"Starting {mode}/{strategy} batch forecast run {run_id}: {len(changed)} to refresh, {len(skipped)} unchanged...")
+    
+    frames, records = [], []
+    if changed and mode == "global":
+        frames, records = _run_global(changed, run_dir, strategy)
+    elif changed:
+        frames, records = _run_per_dealer(changed, run_dir, strategy, stored_watermarks, warm_start)
+    records += [{"dealer_id": d, "status": "Unchanged", "action": "skipped"} for d in skipped]
+    fit_seconds = time.perf_counter() - start
+    
+    rows = 0
+    if frames:
+        rows = store.upsert(pd.concat(frames, ignore_index=True), run_id, generated_at)
+    
+    # Advance watermarks only for dealers that were refreshed successfully
+    watermark_rows = []
+    for record in records:
+        current = current_watermarks.get(record["dealer_id"])
+        if record["action"] in ("full", "incremental") and current is not None:
+            trained_through = record.get("trained_through")
+            watermark_rows.append({
+                "dealer_id": record["dealer_id"],
+                "max_date": pd.Timestamp(current['max_date']).to_pydatetime(),
+                "max_transaction_id": int(current['max_transaction_id']),
+                "n_transactions": int(current['n_transactions']),
+                "trained_through": pd.Timestamp(trained_through).to_pydatetime() if trained_through is not None else None,
+                "booster_rounds": record.get("booster_rounds"),
+                "updated_at": generated_at,
+            })
+    store.save_watermarks(watermark_rows)
+    
+    elapsed = time.perf_counter() - start
+    summary = {action: sum(1 for r in records if r["action"] == action) for action in ("skipped", "incremental", "full", "failed")}
+    manifest = {
+        "run_id": run_id,
+        "mode": mode,
+        "strategy": strategy,
+        "incremental": incremental,
+        "warm_start": warm_start,
+        "generated_at": generated_at.isoformat(),
+        "horizon_days": settings.FORECAST_HORIZON_DAYS,
+        "summary": summary,
+        "dealers": {
+            str(r["dealer_id"]): {"status": r["status"], "action": r["action"], "seconds": r.get("seconds")}
+            for r in records
+        },
+        "rows_written": rows,
+        "fit_seconds": round(fit_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+    }
+    with open(os.path.join(run_dir, "manifest.json"), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    logger.info(
+        f"Batch forecast run {run_id} finished in {elapsed:.1f}s: {summary['skipped']} skipped, "
+        f"{summary['incremental']} incremental, {summary['full']} full, {summary['failed']} failed, {rows} rows"
+    )
+    return manifest
 
 if __name__ == "__main__":
     forecast, status = train_forecast_model(dealer_id=1)
@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+import logging
+from datetime import date, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from database.engine import get_engine, read_frame, read_frame_async
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 30
+
+# Pass 1: one row per dealer-day over the window history, each source table
+# aggregated once by day and joined onto the dense dealer x day grid
+DAILY_FACTS_QUERY = text("""
+CREATE TEMP TABLE kpi_daily ON COMMIT DROP AS
+WITH days AS (
+    SELECT generate_series(CAST(:history_start AS date), CAST(:through AS date), interval '1 day')::date AS day
+),
+sales AS (
+    SELECT dealer_id, date::date AS day, COUNT(*) AS units, SUM(sale_price) AS revenue
+    FROM transactions
+    WHERE date >= :history_start AND date < CAST(:through AS date) + 1
+    GROUP BY 1, 2
+),
+new_leads AS (
+    SELECT dealer_id, created_at::date AS day, COUNT(*) AS n
+    FROM leads
+    WHERE created_at >= :history_start AND created_at < CAST(:through AS date) + 1
+    GROUP BY 1, 2
+),
+conversions AS (
+    SELECT dealer_id, conversion_date::date AS day, COUNT(*) AS n
+    FROM leads
+    WHERE converted AND conversion_date >= :history_start AND conversion_date < CAST(:through AS date) + 1
+    GROUP BY 1, 2
+),
+acquired AS (
+    SELECT dealer_id, ingredients_date::date AS day, COUNT(*) AS n
+    FROM inventory
+    WHERE ingredients_date >= :history_start AND ingredients_date < CAST(:through AS date) + 1
+    GROUP BY 1, 2
+),
+forecasted AS (
+    SELECT dealer_id, date::date AS day, SUM(forecast) AS forecast
+    FROM forecasts
+    WHERE date >= :history_start AND date < CAST(:through AS date) + 1
+    GROUP BY 1, 2
+)
+SELECT d.dealer_id, days.day,
+       COALESCE(s.units, 0) AS units,
+       COALESCE(s.revenue, 0) AS revenue,
+       COALESCE(l.n, 0) AS leads,
+       COALESCE(c.n, 0) AS conversions,
+       COALESCE(a.n, 0) AS acquired,
+       f.forecast
+FROM dealers d
+CROSS JOIN days
+LEFT JOIN sales s ON s.dealer_id = d.dealer_id AND s.day = days.day
+LEFT JOIN new_leads l ON l.dealer_id = d.dealer_id AND l.day = days.day
+LEFT JOIN conversions c ON c.dealer_id = d.dealer_id AND c.day = days.day
+LEFT JOIN acquired a ON a.dealer_id = d.dealer_id AND a.day = days.day
+LEFT JOIN forecasted f ON f.dealer_id = d.dealer_id AND f.day = days.day
+""")
+
+# Pass 2: trailing-window metrics with window functions, inserted for the new days only.
+# Stock on hand = cars acquired before the history start and not yet sold by it,
+# plus the running sum of acquisitions minus sales.
+INSERT_SNAPSHOTS_QUERY = text(f"""
+INSERT INTO kpi_snapshots (
+    date, dealer_id, conversion_rate, avg_ticket_size, inventory_turnover, forecast_accuracy,
+    revenue_30d, units_sold_30d, leads_30d, stock_on_hand, computed_at
+)
+WITH stock_baseline AS (
+    SELECT i.dealer_id, COUNT(*) AS n
+    FROM inventory i
+    LEFT JOIN transactions t ON t.car_id = i.car_id
+    WHERE i.ingredients_date < :history_start AND (t.date IS NULL OR t.date >= :history_start)
+    GROUP BY i.dealer_id
+),
+windowed AS (
+    SELECT k.dealer_id, k.day,
+           SUM(k.leads) OVER w AS leads_30d,
+           SUM(k.conversions) OVER w AS conversions_30d,
+           SUM(k.units) OVER w AS units_30d,
+           SUM(k.revenue) OVER w AS revenue_30d,
+           SUM(ABS(k.revenue - k.forecast)) OVER w AS forecast_abs_error,
+           SUM(k.revenue) FILTER (WHERE k.forecast IS NOT NULL) OVER w AS forecast_actual,
+           COALESCE(b.n, 0) + SUM(k.acquired - k.units) OVER (
+               PARTITION BY k.dealer_id ORDER BY k.day ROWS UNBOUNDED PRECEDING
+           ) AS stock_on_hand
+    FROM kpi_daily k
+    LEFT JOIN stock_baseline b ON b.dealer_id = k.dealer_id
+    WINDOW w AS (PARTITION BY k.dealer_id ORDER BY k.day ROWS BETWEEN {WINDOW_DAYS - 1} PRECEDING AND CURRENT ROW)
+)
+SELECT day, dealer_id,
+       conversions_30d::float / NULLIF(leads_30d, 0),
+       revenue_30d / NULLIF(units_30d, 0),
+       units_30d::float / NULLIF(stock_on_hand, 0),
+       GREATEST(0, 1 - forecast_abs_error / NULLIF(forecast_actual, 0)),
+       revenue_30d, units_30d, leads_30d, stock_on_hand, now()
+FROM windowed
+WHERE day >= :start
+ON CONFLICT (date, dealer_id) DO UPDATE SET
+    conversion_rate = EXCLUDED.conversion_rate,
+    avg_ticket_size = EXCLUDED.avg_ticket_size,
+    inventory_turnover = EXCLUDED.inventory_turnover,
+    forecast_accuracy = EXCLUDED.forecast_accuracy,
+    revenue_30d = EXCLUDED.revenue_30d,
+    units_sold_30d = EXCLUDED.units_sold_30d,
+    leads_30d = EXCLUDED.leads_30d,
+    stock_on_hand = EXCLUDED.stock_on_hand,
+    computed_at = EXCLUDED.computed_at
+""")
+
+DATA_START_QUERY = text("""
+SELECT LEAST(
+    (SELECT MIN(date) FROM transactions),
+    (SELECT MIN(created_at) FROM leads)
+)::date
+""")
+
+SUMMARY_QUERY = text(f"""
+WITH latest AS (
+    SELECT date FROM kpi_snapshots ORDER BY date DESC LIMIT 1
+)
+SELECT k.date,
+       COUNT(*) AS dealers,
+       SUM(k.revenue_30d) AS revenue_30d,
+       SUM(k.units_sold_30d) AS units_sold_30d,
+       SUM(k.leads_30d) AS leads_30d,
+       SUM(k.conversion_rate * k.leads_30d) / NULLIF(SUM(k.leads_30d), 0) AS conversion_rate,
+       SUM(k.revenue_30d) / NULLIF(SUM(k.units_sold_30d), 0) AS avg_ticket_size,
+       SUM(k.units_sold_30d)::float / NULLIF(SUM(k.stock_on_hand), 0) AS inventory_turnover,
+       AVG(k.forecast_accuracy) AS forecast_accuracy
+FROM kpi_snapshots k, latest
+WHERE k.date IN (latest.date, latest.date - interval '{WINDOW_DAYS} days')
+GROUP BY k.date
+ORDER BY k.date DESC
+""")
+
+TOP_DEALERS_QUERY = text("""
+SELECT k.dealer_id, d.name, k.revenue_30d, k.units_sold_30d, k.conversion_rate,
+       k.avg_ticket_size, k.inventory_turnover, k.forecast_accuracy
+FROM kpi_snapshots k
+JOIN dealers d ON d.dealer_id = k.dealer_id
+WHERE k.date = (SELECT date FROM kpi_snapshots ORDER BY date DESC LIMIT 1)
+ORDER BY k.revenue_30d DESC
+LIMIT :limit
+""")
+
+TREND_QUERY = text("""
+SELECT date, SUM(revenue_30d) AS revenue_30d, SUM(leads_30d) AS leads_30d
+FROM kpi_snapshots
+WHERE date > (SELECT date FROM kpi_snapshots ORDER BY date DESC LIMIT 1) - interval '90 days'
+GROUP BY date
+ORDER BY date
+""")
+
+def kpi_watermark(conn):
+    """
+    Last day with snapshots, or None.
+    """
+    latest = conn.execute(text("SELECT date FROM kpi_snapshots ORDER BY date DESC LIMIT 1")).scalar()
+    return latest.date() if latest is not None else None
+
+def run_kpi_snapshots(full=False, through=None):
+    """
+    Computes per-dealer daily KPI snapshots for every complete day after the last
+    stored one (or all history with full) in two set-based passes.
+    """
+    through = through or date.today() - timedelta(days=1)
+    start_time = time.perf_counter()
+    with get_engine().begin() as conn:
+        if full:
+            conn.execute(text("DELETE FROM kpi_snapshots"))
+            watermark = None
+        else:
+            watermark = kpi_watermark(conn)
+        start = watermark + timedelta(days=1) if watermark else conn.execute(DATA_START_QUERY).scalar()
+        if start is None or start > through:
+            logger.info(f"KPI snapshots up to date (last day: {watermark})")
+            return {"start": None, "through": str(through), "rows": 0, "seconds": round(time.perf_counter() - start_time, 3)}
+
+        params = {"history_start": start - timedelta(days=WINDOW_DAYS - 1), "through": through, "start": start}
+        conn.execute(DAILY_FACTS_QUERY, params)
+        rows = conn.execute(INSERT_SNAPSHOTS_QUERY, params).rowcount
+
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"KPI snapshots: {rows} rows for {start}..{through} in {elapsed:.2f}s")
+    return {"start": str(start), "through": str(through), "rows": rows, "seconds": round(elapsed, 3)}
+
+def json_records(df):
+    # NaN isn't valid JSON
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+def build_summary(totals, top_dealers, trend):
+    """
+    Latest totals with the change against the snapshot one window earlier.
+    """
+    if totals.empty:
+        return None
+    current = totals.iloc[0]
+    previous = totals.iloc[1] if len(totals) > 1 else None
+    metrics = {}
+    for column in ["dealers", "revenue_30d", "units_sold_30d", "leads_30d", "conversion_rate",
+                   "avg_ticket_size", "inventory_turnover", "forecast_accuracy"]:
+        value = current[column]
+        prior = previous[column] if previous is not None else None
+        metrics[column] = {
+            "value": float(value) if pd.notna(value) else None,
+            "change": float(value - prior) if pd.notna(value) and pd.notna(prior) else None,
+        }
+    trend = trend.assign(date=trend["date"].dt.strftime("%Y-%m-%d"))
+    return {
+        "as_of": current["date"].strftime("%Y-%m-%d"),
+        "window_days": WINDOW_DAYS,
+        "metrics": metrics,
+        "top_dealers": json_records(top_dealers),
+        "trend": json_records(trend),
+    }
+
+def get_kpi_summary(top=10):
+    totals = read_frame(SUMMARY_QUERY, parse_dates=["date"])
+    top_dealers = read_frame(TOP_DEALERS_QUERY, params={"limit": top})
+    trend = read_frame(TREND_QUERY, parse_dates=["date"])
+    return build_summary(totals, top_dealers, trend)
+
+async def aget_kpi_summary(top=10):
+    totals = await read_frame_async(SUMMARY_QUERY, parse_dates=["date"])
+    top_dealers = await read_frame_async(TOP_DEALERS_QUERY, params={"limit": top})
+    trend = await read_frame_async(TREND_QUERY, parse_dates=["date"])
+    return build_summary(totals, top_dealers, trend)
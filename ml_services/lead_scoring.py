@@ -1,8 +1,8 @@
 import pandas as pd
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
-from sqlalchemy import create_engine
 import pickle
 import os
 import sys
@@ -11,38 +11,72 @@ import logging
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import get_settings
+from database.engine import read_frame, LEAD_DTYPES
+from database.snapshots import get_snapshot_store, use_snapshot
+from ml_services.compiled_forest import CompiledForest, ProbabilityLookup
+from ml_services.model_registry import ModelRegistry
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+FEATURE_COLUMNS = ['source_encoded', 'response_time_minutes']
+
 class LeadScorer:
     def __init__(self):
         self.model = RandomForestClassifier(n_estimators=100, random_state=42)
         self.encoder = LabelEncoder()
         self.loaded = False
+        self.compiled = None
+        self.lookup = None
+        self.source_codes = {}
+        self.model_version = "untrained" # Registry version once loaded
         
-    def load_model(self):
+    def load_model(self, version=None):
+        """
+        Loads the current (or the given) registered version, falling back to the
+        legacy lead_scorer.pkl. Registered versions carry the compiled forest and
+        lookup table verified at training time, so they aren't rebuilt here.
+        """
+        artifacts, metadata = ModelRegistry().load("lead_scorer", version)
+        if artifacts is not None:
+            self.model, self.encoder = artifacts["model"], artifacts["encoder"]
+            self.source_codes = {source: code for code, source in enumerate(self.encoder.classes_)}
+            self.compiled = artifacts.get("compiled") if settings.LEAD_SCORER_COMPILED else None
+            self.lookup = artifacts.get("lookup") if self.compiled is not None and settings.LEAD_SCORER_LOOKUP_TABLE else None
+            if settings.LEAD_SCORER_COMPILED and self.compiled is None:
+                self.compile()
+            self.model_version = metadata["version"]
+            self.loaded = True
+            logger.info(f"Lead Scorer {self.model_version} loaded from the registry.")
+            return
         try:
             model_path = os.path.join(settings.MODELS_DIR, "lead_scorer.pkl")
             with open(model_path, 'rb') as f:
                 self.model, self.encoder = pickle.load(f)
             self.loaded = True
+            self.model_version = "legacy"
+            self.compile()
             logger.info("Lead Scorer model loaded successfully.")
         except FileNotFoundError:
             logger.warning("Lead Scorer model not found. Please run training script.")
         
-    def get_training_data(self):
-        engine = create_engine(settings.DATABASE_URL)
+    def get_training_data(self, snapshot=None):
+        # Conversion labels change after a lead is created; the leads snapshot has to be
+        # refreshed (scripts/refresh_snapshots.py) before training or the labels lag behind
+        if use_snapshot("leads", snapshot):
+            return get_snapshot_store().read(
+                "leads", columns=["source", "response_time_minutes", "converted"], dtypes=LEAD_DTYPES
+            )
         query = """
         SELECT source, response_time_minutes, converted
         FROM leads
         """
-        df = pd.read_sql(query, engine)
+        df = read_frame(query, dtypes=LEAD_DTYPES)
         return df
 
-    def train(self):
+    def train(self, snapshot=None):
         logger.info("Training Lead Scoring Model...")
-        df = self.get_training_data()
+        df = self.get_training_data(snapshot)
         
         if df.empty:
             logger.warning("No training data found")
@@ -51,22 +85,66 @@ class LeadScorer:
         # Preprocessing
         df['source_encoded'] = self.encoder.fit_transform(df['source'])
         
-        X = df[['source_encoded', 'response_time_minutes']]
+        X = df[FEATURE_COLUMNS]
         y = df['converted']
         
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2)
         
         self.model.fit(X_train, y_train)
+        self.loaded = True
         score = self.model.score(X_test, y_test)
         logger.info(f"Model Accuracy: {score:.2f}")
+        self.compile()
         
         return score
 
+    def compile(self):
+        """
+        Builds the flat-array forest and the (source, response time) lookup table used
+        for inference, and only enables them if they match predict_proba bit-for-bit.
+        """
+        self.compiled, self.lookup = None, None
+        self.source_codes = {source: code for code, source in enumerate(self.encoder.classes_)}
+        if not settings.LEAD_SCORER_COMPILED or not hasattr(self.model, 'estimators_'):
+            return
+        
+        compiled = CompiledForest(self.model)
+        lookup = ProbabilityLookup(compiled, n_codes=len(self.encoder.classes_))
+        if not compiled.verify(self.model, pd.DataFrame(lookup.grid, columns=FEATURE_COLUMNS)):
+            logger.error("Compiled lead scorer does not match predict_proba, using sklearn inference.")
+            return
+        
+        self.compiled = compiled
+        if settings.LEAD_SCORER_LOOKUP_TABLE:
+            self.lookup = lookup
+        logger.info(f"Lead Scorer compiled: {compiled.n_estimators} trees, max depth {compiled.max_depth}, lookup={self.lookup is not None}")
+
+    def score_encoded(self, codes, response_times):
+        """
+        P(converted) for already-encoded rows through the fastest available path.
+        """
+        if self.lookup is not None:
+            return self.lookup.predict(codes, response_times)
+        if self.compiled is not None:
+            return self.compiled.predict_proba(np.column_stack([codes, response_times]))[:, 1]
+        
+        # Features are low-cardinality, so score each distinct (source, response time) once
+        X = np.column_stack([codes, response_times])
+        unique_rows, inverse = np.unique(X, axis=0, return_inverse=True)
+        unique_X = pd.DataFrame(unique_rows, columns=FEATURE_COLUMNS)
+        return self.model.predict_proba(unique_X)[:, 1][inverse.reshape(-1)]
+
     def predict(self, source, response_time):
         if not self.loaded:
             self.load_model()
             
         try:
+            if self.lookup is not None:
+                return self.lookup.predict_one(self.source_codes[source], response_time)
+            if self.compiled is not None:
+                code = self.source_codes[source]
+                return float(self.compiled.predict_proba([[code, response_time]])[0, 1])
+            
             if not hasattr(self.model, 'predict_proba'):
                  return 0.5 # Fallback
                  
@@ -78,6 +156,36 @@ class LeadScorer:
             logger.error(f"Prediction error: {e}")
             return 0.0
 
+    def encode_sources(self, sources):
+        """
+        Vectorized label encoding; unknown or non-string sources get -1 instead of raising.
+        """
+        sources = [source if isinstance(source, str) else None for source in sources]
+        return pd.Index(self.encoder.classes_).get_indexer(sources).astype(np.int64)
+
+    def predict_batch(self, sources, response_times):
+        """
+        Scores a whole batch with one vectorized call.
+        Returns an array of probabilities with NaN for rows that cannot be scored
+        (unknown source or missing response time).
+        """
+        if not self.loaded:
+            self.load_model()
+        
+        response_times = np.asarray(response_times, dtype=np.float64)
+        probs = np.full(len(response_times), np.nan)
+        # Without a trained model the encoder has no classes, so nothing can be scored
+        if not self.loaded or len(probs) == 0:
+            return probs
+        
+        codes = self.encode_sources(sources)
+        known = (codes >= 0) & np.isfinite(response_times)
+        if not known.any():
+            return probs
+        
+        probs[known] = self.score_encoded(codes[known], response_times[known])
+        return probs
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     scorer = LeadScorer()
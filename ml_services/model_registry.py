@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import threading
+import logging
+from datetime import datetime
+
+import joblib
+import xgboost
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_FILE = "artifacts.joblib"
+METADATA_FILE = "metadata.json"
+CURRENT_FILE = "CURRENT"
+
+def is_xgboost_model(obj):
+    return hasattr(obj, "save_model") and hasattr(obj, "get_booster")
+
+class ModelRegistry:
+    """
+    Versioned model artifacts under MODELS_DIR/registry/<name>/<version>/:
+    artifacts.joblib holds the Python objects (NumPy arrays are stored raw, so they
+    load memory-mapped), XGBoost models are saved next to it in the native UBJ format,
+    and metadata.json records the training data watermark, metrics and feature schema.
+    <name>/CURRENT names the version that is served. Versions are written to a temporary
+    directory and renamed into place, and CURRENT is replaced atomically, so readers
+    never see a partial version.
+    """
+    def __init__(self, root=None):
+        self.root = root or os.path.join(settings.MODELS_DIR, "registry")
+
+    def model_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def current_version(self, name):
+        try:
+            with open(os.path.join(self.model_dir(name), CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def promote(self, name, version):
+        if not os.path.isdir(os.path.join(self.model_dir(name), version)):
+            raise ValueError(f"Unknown version {version} of {name}")
+        path = os.path.join(self.model_dir(name), CURRENT_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, path)
+        logger.info(f"Promoted {name} {version}")
+
+    def publish(self, name, artifacts, metadata=None, promote=True):
+        """
+        Saves a new version of `name` from a dict of artifacts and returns its version id.
+        """
+        os.makedirs(self.model_dir(name), exist_ok=True)
+        created_at = datetime.utcnow()
+        tmp_dir = os.path.join(self.model_dir(name), f".tmp-{created_at:%Y%m%dT%H%M%S%f}")
+        os.makedirs(tmp_dir)
+        try:
+            python_artifacts, files = {}, {}
+            for key, obj in artifacts.items():
+                if is_xgboost_model(obj):
+                    files[key] = f"{key}.ubj"
+                    obj.save_model(os.path.join(tmp_dir, files[key]))
+                else:
+                    python_artifacts[key] = obj
+            joblib.dump(python_artifacts, os.path.join(tmp_dir, ARTIFACTS_FILE))
+
+            digest = hashlib.sha256()
+            for file_name in sorted(os.listdir(tmp_dir)):
+                with open(os.path.join(tmp_dir, file_name), 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(block)
+            # Microseconds keep names in publish order, which prune() relies on
+            version = f"{created_at:%Y%m%dT%H%M%S%f}-{digest.hexdigest()[:8]}"
+
+            metadata = dict(metadata or {})
+            metadata.update({
+                "name": name,
+                "version": version,
+                "created_at": created_at.isoformat(),
+                "xgboost_artifacts": {key: {"file": file_name, "class": type(artifacts[key]).__name__} for key, file_name in files.items()},
+            })
+            with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+                json.dump(metadata, f, indent=2, default=str)
+            os.replace(tmp_dir, os.path.join(self.model_dir(name), version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Registered {name} {version}")
+        if promote:
+            self.promote(name, version)
+        self.prune(name)
+        return version
+
+    def metadata(self, name, version=None):
+        version = version or self.current_version(name)
+        if version is None:
+            return None
+        with open(os.path.join(self.model_dir(name), version, METADATA_FILE)) as f:
+            return json.load(f)
+
+    def versions(self, name):
+        model_dir = self.model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(entry for entry in os.listdir(model_dir)
+                      if not entry.startswith(".") and os.path.isdir(os.path.join(model_dir, entry)))
+
+    def load(self, name, version=None, mmap=True):
+        """
+        Returns (artifacts, metadata) of a version, the current one by default, or
+        (None, None) if nothing is registered.
+        """
+        version = version or self.current_version(name)
+        if version is None:
+            return None, None
+        version_dir = os.path.join(self.model_dir(name), version)
+        metadata = self.metadata(name, version)
+        artifacts = joblib.load(os.path.join(version_dir, ARTIFACTS_FILE), mmap_mode="r" if mmap else None)
+        for key, entry in metadata.get("xgboost_artifacts", {}).items():
+            model = getattr(xgboost, entry["class"])()
+            model.load_model(os.path.join(version_dir, entry["file"]))
+            artifacts[key] = model
+        return artifacts, metadata
+
+    def prune(self, name, keep=None):
+        """
+        Removes all but the newest `keep` versions, never the current one.
+        """
+        keep = settings.MODEL_REGISTRY_KEEP_VERSIONS if keep is None else keep
+        current = self.current_version(name)
+        for version in self.versions(name)[:-keep] if keep > 0 else []:
+            if version != current:
+                shutil.rmtree(os.path.join(self.model_dir(name), version), ignore_errors=True)
+
+class HotModel:
+    """
+    The serving instance of one registered model. refresh() builds a new instance
+    with `factory` when the registry's current version changed and then swaps the
+    reference, so requests that already took the old instance finish with it.
+    Handlers should call get() once per request and use that instance throughout.
+    """
+    def __init__(self, name, factory, registry=None):
+        self.name = name
+        self.factory = factory
+        self.registry = registry or ModelRegistry()
+        self.instance = None
+        self.swap_listeners = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.instance is None:
+            self.refresh()
+        return self.instance
+
+    def refresh(self, force=False):
+        """
+        Returns True if a new instance was swapped in.
+        """
+        with self._lock:
+            version = self.registry.current_version(self.name)
+            # Nothing registered (legacy files) counts as unchanged
+            if not force and self.instance is not None and version in (None, self.instance.model_version):
+                return False
+            instance = self.factory()
+            previous = self.instance.model_version if self.instance is not None else None
+            self.instance = instance
+        logger.info(f"Serving {self.name} {instance.model_version} (was {previous})")
+        for listener in self.swap_listeners:
+            listener(instance)
+        return True
@@ -1,10 +1,12 @@
 import os
 import sys
+import time
 import logging
 from typing import TypedDict, Literal
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 
 # Add parent directory to path
@@ -12,6 +14,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import get_settings
 from ml_services.rag_agent import InternalSalesAgent
 from ml_services.sql_agent import SecureSQLAgent
+from ml_services.query_router import LocalQueryRouter
+from ml_services.answer_cache import AnswerCache
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -25,36 +29,49 @@ class AgentState(TypedDict):
     next_step: str
     final_answer: str
 
+ROUTER_SYSTEM_PROMPT = (
+    "You are a routing assistant. "
+    "Your task is to classify the user's question into one of two categories:\n"
+    "1. 'sql' -> For questions about data, numbers, sales, dealers, inventory, revenue, or 'how many'.\n"
+    "2. 'rag' -> For questions about policies, text documents, rules, incentives, compliance, or warranty.\n"
+    "Return ONLY the keyword 'sql' or 'rag'."
+)
+
+def get_question(state: AgentState):
+    last_message = state["messages"][-1]
+    return last_message.content if hasattr(last_message, "content") else str(last_message)
+
+def parse_route(content):
+    # Fallback/Safety
+    return "sql" if "sql" in content.strip().lower() else "rag"
+
+router_llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo")
+
+def llm_route(question):
+    response = router_llm.invoke([
+        SystemMessage(content=ROUTER_SYSTEM_PROMPT),
+        HumanMessage(content=question)
+    ])
+    return parse_route(response.content)
+
+async def allm_route(question):
+    response = await router_llm.ainvoke([
+        SystemMessage(content=ROUTER_SYSTEM_PROMPT),
+        HumanMessage(content=question)
+    ])
+    return parse_route(response.content)
+
+query_router = LocalQueryRouter(llm_fallback=llm_route, allm_fallback=allm_route)
+
 def router_node(state: AgentState):
     """
     Decides whether to route to SQL or RAG based on the user's question.
+    The local classifier answers confident cases; the LLM is only asked below the threshold.
     """
-    messages = state["messages"]
-    last_message = messages[-1]
-    question = last_message.content if hasattr(last_message, "content") else str(last_message)
+    return {"next_step": query_router.route(get_question(state))}
 
-    llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo")
-    
-    system_prompt = (
-        "You are a routing assistant. "
-        "Your task is to classify the user's question into one of two categories:\n"
-        "1. 'sql' -> For questions about data, numbers, sales, dealers, inventory, revenue, or 'how many'.\n"
-        "2. 'rag' -> For questions about policies, text documents, rules, incentives, compliance, or warranty.\n"
-        "Return ONLY the keyword 'sql' or 'rag'."
-    )
-    
-    response = llm.invoke([
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=question)
-    ])
-    
-    choice = response.content.strip().lower()
-    
-    # Fallback/Safety
-    if "sql" in choice:
-        return {"next_step": "sql"}
-    else:
-        return {"next_step": "rag"}
+async def arouter_node(state: AgentState):
+    return {"next_step": await query_router.aroute(get_question(state))}
 
 def sql_node(state: AgentState):
     messages = state["messages"]
@@ -68,6 +85,17 @@ def sql_node(state: AgentState):
         
     return {"final_answer": response}
 
+async def asql_node(state: AgentState):
+    question = state["messages"][-1].content
+    
+    logger.info(f"Routing to SQL Agent: {question}")
+    try:
+        response = await sql_agent.arun_query(question)
+    except Exception as e:
+        response = f"SQL Agent Error: {str(e)}"
+        
+    return {"final_answer": response}
+
 def rag_node(state: AgentState):
     messages = state["messages"]
     question = messages[-1].content
@@ -80,12 +108,24 @@ def rag_node(state: AgentState):
         
     return {"final_answer": response}
 
-# Build Graph
+async def arag_node(state: AgentState):
+    question = state["messages"][-1].content
+    
+    logger.info(f"Routing to RAG Agent: {question}")
+    try:
+        response = await rag_agent.aquery(question)
+    except Exception as e:
+        response = f"RAG Agent Error: {str(e)}"
+        
+    return {"final_answer": response}
+
+# Build Graph (each node has a sync and an async implementation, so both
+# invoke and ainvoke work on the same compiled graph)
 workflow = StateGraph(AgentState)
 
-workflow.add_node("router", router_node)
-workflow.add_node("sql_agent", sql_node)
-workflow.add_node("rag_agent", rag_node)
+workflow.add_node("router", RunnableLambda(router_node, afunc=arouter_node))
+workflow.add_node("sql_agent", RunnableLambda(sql_node, afunc=asql_node))
+workflow.add_node("rag_agent", RunnableLambda(rag_node, afunc=arag_node))
 
 workflow.set_entry_point("router")
 
@@ -106,14 +146,58 @@ workflow.add_edge("rag_agent", END)
 
 app_graph = workflow.compile()
 
+# Answer cache in front of the graph; RAG answers are dropped when the knowledge base is rebuilt
+answer_cache = AnswerCache(
+    embed_fn=rag_agent.embeddings.embed_query if settings.ANSWER_CACHE_SEMANTIC else None,
+    aembed_fn=rag_agent.embeddings.aembed_query if settings.ANSWER_CACHE_SEMANTIC else None,
+)
+rag_agent.reindex_listeners.append(answer_cache.invalidate_knowledge_base)
+
+# Agent answers that report a failure are never cached
+UNCACHEABLE_PREFIXES = (
+    "System Error", "SQL Agent Error", "RAG Agent Error",
+    "I encountered an error", "Knowledge base is likely empty",
+)
+
+def cacheable(answer):
+    return not answer.startswith(UNCACHEABLE_PREFIXES)
+
 def run_chat(user_input: str) -> str:
     """
     Main entry point for the API.
     """
+    cached = answer_cache.get(user_input)
+    if cached is not None:
+        return cached
+    
     try:
+        start = time.perf_counter()
         inputs = {"messages": [HumanMessage(content=user_input)]}
         result = app_graph.invoke(inputs)
-        return result.get("final_answer", "No answer generated.")
+        answer = result.get("final_answer", "No answer generated.")
+        if cacheable(answer):
+            answer_cache.put(user_input, answer, result.get("next_step"), time.perf_counter() - start)
+        return answer
+    except Exception as e:
+        logger.error(f"Orchestrator Error: {e}", exc_info=True)
+        return f"System Error: {str(e)}"
+
+async def arun_chat(user_input: str) -> str:
+    """
+    Async entry point for the API: LLM calls are awaited instead of blocking a thread.
+    """
+    cached = await answer_cache.aget(user_input)
+    if cached is not None:
+        return cached
+    
+    try:
+        start = time.perf_counter()
+        inputs = {"messages": [HumanMessage(content=user_input)]}
+        result = await app_graph.ainvoke(inputs)
+        answer = result.get("final_answer", "No answer generated.")
+        if cacheable(answer):
+            await answer_cache.aput(user_input, answer, result.get("next_step"), time.perf_counter() - start)
+        return answer
     except Exception as e:
         logger.error(f"Orchestrator Error: {e}", exc_info=True)
         return f"System Error: {str(e)}"
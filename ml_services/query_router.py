@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import threading
+import logging
+from collections import Counter
+from datetime import datetime
+
+from sklearn.pipeline import make_pipeline
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import cross_val_score
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Labelled seed questions; extended by DATA_DIR/router_training.jsonl ({"question": ..., "route": "sql"|"rag"})
+SEED_QUESTIONS = [
+    ("How many dealers do we have?", "sql"),
+    ("How many dealers are in the North region?", "sql"),
+    ("What are the total sales for the last 3 months?", "sql"),
+    ("What was our revenue last month?", "sql"),
+    ("Show me the top 5 dealers by revenue", "sql"),
+    ("Which dealer sold the most cars this year?", "sql"),
+    ("How many cars are currently available in inventory?", "sql"),
+    ("What is the average sale price per transaction?", "sql"),
+    ("List dealers with a churn risk above 0.8", "sql"),
+    ("What is the average margin on auction sales?", "sql"),
+    ("How many leads converted last week?", "sql"),
+    ("Which lead source has the highest conversion rate?", "sql"),
+    ("What is the average response time to leads?", "sql"),
+    ("How many transactions happened in March?", "sql"),
+    ("Count the BMW cars in stock", "sql"),
+    ("What is the total inventory value per dealer?", "sql"),
+    ("Which sales rep has the most assigned leads?", "sql"),
+    ("Show monthly revenue for dealer 3", "sql"),
+    ("How many large dealers are there?", "sql"),
+    ("What percentage of cars were sold through wholesale?", "sql"),
+    ("What is the return policy?", "rag"),
+    ("Explain the warranty coverage for used cars", "rag"),
+    ("What are the rules for dealer incentives?", "rag"),
+    ("What is our compliance policy for data protection?", "rag"),
+    ("How does the bonus scheme for sales reps work?", "rag"),
+    ("What documents are required to onboard a new dealer?", "rag"),
+    ("Can a customer cancel a purchase after delivery?", "rag"),
+    ("What is the policy on discounts for aged inventory?", "rag"),
+    ("Summarize the code of conduct for sales staff", "rag"),
+    ("What are the guidelines for handling customer complaints?", "rag"),
+    ("Which warranty applies to cars older than five years?", "rag"),
+    ("What are the terms of the dealer partnership agreement?", "rag"),
+    ("How should reps follow up on a new lead according to the playbook?", "rag"),
+    ("What is the escalation process for a disputed sale?", "rag"),
+    ("Are dealers allowed to advertise our brand on their website?", "rag"),
+    ("What is the refund procedure?", "rag"),
+    ("Explain the incentive tiers for high volume dealers", "rag"),
+    ("What does the policy say about test drives?", "rag"),
+    ("What are the compliance rules for financing offers?", "rag"),
+    ("How do we handle GDPR requests from customers?", "rag"),
+]
+
+class LocalQueryRouter:
+    """
+    In-process sql/rag classifier (TF-IDF + logistic regression over labelled questions).
+    Only questions classified below the confidence threshold go to the LLM fallback.
+    Every decision is logged to LOGS_DIR/routing_decisions.jsonl.
+    """
+    def __init__(self, llm_fallback=None, allm_fallback=None, threshold=None):
+        self.llm_fallback = llm_fallback
+        self.allm_fallback = allm_fallback
+        self.threshold = settings.ROUTER_CONFIDENCE_THRESHOLD if threshold is None else threshold
+        self.training_path = os.path.join(settings.DATA_DIR, "router_training.jsonl")
+        self.log_path = os.path.join(settings.LOGS_DIR, "routing_decisions.jsonl")
+        self.pipeline = None
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self.fit()
+
+    def load_examples(self):
+        examples = list(SEED_QUESTIONS)
+        if os.path.exists(self.training_path):
+            with open(self.training_path) as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        examples.append((row["question"], row["route"]))
+        return examples
+
+    def fit(self):
+        examples = self.load_examples()
+        questions = [question for question, _ in examples]
+        routes = [route for _, route in examples]
+        
+        self.pipeline = make_pipeline(
+            TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, lowercase=True),
+            LogisticRegression(C=10.0, max_iter=1000)
+        )
+        cv_accuracy = cross_val_score(self.pipeline, questions, routes, cv=5).mean()
+        self.pipeline.fit(questions, routes)
+        logger.info(f"Local router trained on {len(examples)} questions (cv accuracy {cv_accuracy:.2f}, threshold {self.threshold})")
+
+    def classify(self, question):
+        """
+        Returns (route, confidence) from the local model.
+        """
+        probs = self.pipeline.predict_proba([question])[0]
+        best = probs.argmax()
+        return self.pipeline.classes_[best], float(probs[best])
+
+    def route(self, question):
+        start = time.perf_counter()
+        local_route, confidence = self.classify(question)
+        if confidence >= self.threshold or self.llm_fallback is None:
+            return self.record(question, local_route, confidence, local_route, "local", start)
+        return self.record(question, local_route, confidence, self.llm_fallback(question), "llm", start)
+
+    async def aroute(self, question):
+        start = time.perf_counter()
+        local_route, confidence = self.classify(question)
+        if confidence >= self.threshold or self.allm_fallback is None:
+            return self.record(question, local_route, confidence, local_route, "local", start)
+        return self.record(question, local_route, confidence, await self.allm_fallback(question), "llm", start)
+
+    def record(self, question, local_route, confidence, route, path, start):
+        latency_ms = (time.perf_counter() - start) * 1000
+        entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "question": question,
+            "local_route": local_route,
+            "confidence": round(confidence, 4),
+            "route": route,
+            "path": path,
+            "latency_ms": round(latency_ms, 2),
+        }
+        with self._lock:
+            self.counts[path] += 1
+            if path == "llm":
+                self.counts["llm_agreed" if local_route == route else "llm_disagreed"] += 1
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+        
+        logger.info(f"Routed to {route} via {path} (local={local_route}, confidence={confidence:.2f}, {latency_ms:.1f}ms)")
+        return route
+
+    def stats(self):
+        """
+        LLM-call reduction and, for fallback decisions, how often the local model agreed with the LLM.
+        """
+        with self._lock:
+            counts = dict(self.counts)
+        total = counts.get("local", 0) + counts.get("llm", 0)
+        llm_calls = counts.get("llm", 0)
+        return {
+            "decisions": total,
+            "local": counts.get("local", 0),
+            "llm": llm_calls,
+            "llm_call_reduction": round(1 - llm_calls / total, 4) if total else None,
+            "llm_agreement": round(counts.get("llm_agreed", 0) / llm_calls, 4) if llm_calls else None,
+            "threshold": self.threshold,
+        }
@@ -1,8 +1,13 @@
 import os
 import sys
+import json
+import time
+import hashlib
 import logging
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+import threading
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from langchain_openai import ChatOpenAI
 from langchain_text_splitters import CharacterTextSplitter
 from langchain_community.document_loaders import DirectoryLoader, TextLoader
 from langchain.chains import RetrievalQA
@@ -10,6 +15,8 @@ from langchain.chains import RetrievalQA
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import get_settings
+from ml_services.embeddings import get_embeddings
+from ml_services.vector_index import DOCSTORE_FILE, build_store, save_store, load_store, supports_removal
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -17,61 +24,244 @@ logger = logging.getLogger(__name__)
 # Use API Key from settings
 os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY
 
+MANIFEST_FILE = "manifest.json"
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def chunk_id(source, text):
+    # Includes the file so identical boilerplate in two documents stays two chunks
+    return content_hash(f"{source}\0{text}")
+
 class InternalSalesAgent:
-    def __init__(self):
+    def __init__(self, ingest=True):
         self.vector_store = None
         self.qa_chain = None
+        self.docs_dir = os.path.join(settings.DATA_DIR, "docs")
         self.index_path = os.path.join(settings.DATA_DIR, "faiss_index")
+        self.manifest_path = os.path.join(self.index_path, MANIFEST_FILE)
+        self.reindex_listeners = [] # Callbacks run after the index is rebuilt
+        self.reindex_lock = threading.RLock()
         
-        # Initialize Embeddings
-        self.embeddings = OpenAIEmbeddings()
+        # Initialize Embeddings; document embeddings are cached on disk by chunk content
+        base_embeddings = get_embeddings()
+        self.embedding_namespace = base_embeddings.namespace
+        self.embeddings = CacheBackedEmbeddings.from_bytes_store(
+            base_embeddings,
+            LocalFileStore(os.path.join(settings.DATA_DIR, "embedding_cache")),
+            namespace=self.embedding_namespace
+        )
         
         # Load or Create Index
-        self.ingest_docs()
+        if ingest:
+            self.ingest_docs()
 
     def ingest_docs(self):
-        docs_dir = os.path.join(settings.DATA_DIR, "docs")
-        if not os.path.exists(docs_dir):
-            logger.warning(f"Docs directory not found: {docs_dir}")
-            return
+        try:
+            self.reindex()
+        except Exception as e:
+            logger.error(f"Error ingesting docs: {e}", exc_info=True)
 
-        # Check if index exists (simple caching)
-        if os.path.exists(self.index_path):
-            try:
-                logger.info("Loading existing FAISS index...")
-                self.vector_store = FAISS.load_local(self.index_path, self.embeddings, allow_dangerous_deserialization=True)
-                self.setup_chain()
-                return
-            except Exception as e:
-                logger.warning(f"Failed to load index: {e}. Rebuilding...")
+    def splitter_config(self):
+        return {"chunk_size": settings.RAG_CHUNK_SIZE, "chunk_overlap": settings.RAG_CHUNK_OVERLAP}
+
+    def index_config(self):
+        # Anything that changes which vectors a chunk maps to forces a rebuild
+        return {
+            "splitter": self.splitter_config(),
+            "embeddings": self.embedding_namespace,
+            "index_type": settings.RAG_INDEX_TYPE,
+        }
 
-        logger.info(f"Loading documents from {docs_dir}...")
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return None
         try:
-            # Load Docs
-            loader = DirectoryLoader(docs_dir, glob="**/*.md", loader_cls=TextLoader)
-            documents = loader.load()
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read index manifest: {e}")
+            return None
+
+    def save_manifest(self, manifest):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def load_documents(self):
+        """
+        Reads every markdown file under data/docs, keyed by path relative to it.
+        """
+        loader = DirectoryLoader(self.docs_dir, glob="**/*.md", loader_cls=TextLoader)
+        documents = {}
+        for doc in loader.load():
+            source = os.path.relpath(doc.metadata["source"], self.docs_dir)
+            doc.metadata["source"] = source
+            documents[source] = doc
+        return documents
+
+    def load_index(self, manifest, mmap=False):
+        """
+        Loads the saved FAISS index if it matches the manifest, otherwise returns None.
+        """
+        if manifest is None or not os.path.exists(os.path.join(self.index_path, DOCSTORE_FILE)):
+            return None
+        try:
+            logger.info(f"Loading existing FAISS index ({manifest['index']['type']}, mmap={mmap})...")
+            store = load_store(self.index_path, self.embeddings, manifest["index"], mmap=mmap)
+        except Exception as e:
+            logger.warning(f"Failed to load index: {e}. Rebuilding...")
+            return None
+        
+        expected = {cid for entry in manifest["files"].values() for cid in entry["chunks"]}
+        if set(store.index_to_docstore_id.values()) != expected:
+            logger.warning("FAISS index is out of sync with its manifest. Rebuilding...")
+            return None
+        return store
+
+    def diff_documents(self, documents, old_files, splitter):
+        """
+        Compares documents with the manifest's file entries by content hash.
+        """
+        diff = {"files": {}, "added": [], "changed": [], "unchanged": 0, "chunks": [], "ids": [], "remove_ids": []}
+        for source, doc in documents.items():
+            file_hash = content_hash(doc.page_content)
+            previous = old_files.get(source)
+            if previous is not None and previous["hash"] == file_hash:
+                diff["files"][source] = previous
+                diff["unchanged"] += 1
+                continue
             
-            if not documents:
-                logger.warning("No documents found.")
-                return
+            diff["changed" if previous is not None else "added"].append(source)
+            chunk_ids = []
+            for chunk in splitter.split_documents([doc]):
+                cid = chunk_id(source, chunk.page_content)
+                if cid in chunk_ids:
+                    continue
+                chunk_ids.append(cid)
+                if previous is None or cid not in previous["chunks"]:
+                    diff["chunks"].append(chunk)
+                    diff["ids"].append(cid)
+            if previous is not None:
+                diff["remove_ids"].extend(set(previous["chunks"]) - set(chunk_ids))
+            diff["files"][source] = {"hash": file_hash, "chunks": chunk_ids}
+        
+        diff["deleted"] = sorted(set(old_files) - set(documents))
+        for source in diff["deleted"]:
+            diff["remove_ids"].extend(old_files[source]["chunks"])
+        return diff
 
-            # Split Docs
-            splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-            docs_chunks = splitter.split_documents(documents)
+    def reindex(self, force=False):
+        """
+        Brings the FAISS index in line with data/docs.
+        Files are compared by content hash against the manifest stored next to the index;
+        only chunks of new or changed files that aren't already indexed get embedded, and
+        chunks of changed or deleted files that no longer exist are removed.
+        A changed splitter config, embedding backend or index type (or force) rebuilds the
+        index, reusing cached embeddings. So do removals from IVF/HNSW indexes and a corpus
+        that has doubled since the index parameters were chosen.
+        """
+        with self.reindex_lock:
+            start = time.perf_counter()
+            if not os.path.exists(self.docs_dir):
+                logger.warning(f"Docs directory not found: {self.docs_dir}")
+                return None
             
-            logger.info(f"Ingested {len(documents)} files, split into {len(docs_chunks)} chunks.")
+            splitter = CharacterTextSplitter(**self.splitter_config())
+            manifest = self.load_manifest()
+            full_rebuild = (
+                force or manifest is None or "index" not in manifest
+                or any(manifest.get(key) != value for key, value in self.index_config().items())
+            )
             
-            # Create Index
-            self.vector_store = FAISS.from_documents(docs_chunks, self.embeddings)
-            self.vector_store.save_local(self.index_path)
+            logger.info(f"Scanning documents in {self.docs_dir}...")
+            documents = self.load_documents()
+            diff = self.diff_documents(documents, {} if full_rebuild else manifest["files"], splitter)
             
-            self.setup_chain()
+            store = None
+            if not full_rebuild and (diff["ids"] or diff["remove_ids"]):
+                n_chunks = sum(len(entry["chunks"]) for entry in diff["files"].values())
+                if diff["remove_ids"] and not supports_removal(manifest["index"]):
+                    full_rebuild = True
+                elif manifest["index"]["type"] != "flat" and n_chunks > 2 * manifest["index"]["n_vectors"]:
+                    full_rebuild = True
+                else:
+                    store = self.load_index(manifest)
+                    full_rebuild = store is None
+                if full_rebuild:
+                    diff = self.diff_documents(documents, {}, splitter)
             
-        except Exception as e:
-            logger.error(f"Error ingesting docs: {e}", exc_info=True)
+            texts = [chunk.page_content for chunk in diff["chunks"]]
+            cache_misses = sum(1 for vector in self.embeddings.document_embedding_store.mget(texts) if vector is None)
+            
+            params = None if full_rebuild else manifest["index"]
+            if full_rebuild:
+                if diff["chunks"]:
+                    store, params = build_store(self.embeddings, diff["chunks"], diff["ids"])
+            elif store is not None:
+                if diff["remove_ids"]:
+                    store.delete(diff["remove_ids"])
+                if diff["chunks"]:
+                    store.add_documents(diff["chunks"], ids=diff["ids"])
+            
+            modified = full_rebuild or bool(diff["ids"] or diff["remove_ids"])
+            manifest = {**self.index_config(), "index": params, "files": diff["files"]}
+            if modified:
+                if store is not None:
+                    save_store(store, self.index_path)
+                    self.save_manifest(manifest)
+                elif os.path.exists(self.manifest_path):
+                    os.remove(self.manifest_path)
+            
+            if modified or self.vector_store is None:
+                # Serve from the saved files so every worker maps the same pages
+                serving = self.load_index(manifest, mmap=settings.RAG_INDEX_MMAP) if params else None
+                if params and serving is None and not force:
+                    logger.warning("Saved index unusable, rebuilding from scratch...")
+                    return self.reindex(force=True)
+                self.vector_store = serving
+                self.setup_chain()
+            
+            total = len(self.vector_store.index_to_docstore_id) if self.vector_store is not None else 0
+            report = {
+                "full_rebuild": full_rebuild,
+                "index": params,
+                "files": {
+                    "added": sorted(diff["added"]),
+                    "changed": sorted(diff["changed"]),
+                    "deleted": diff["deleted"],
+                    "unchanged": diff["unchanged"],
+                },
+                "chunks": {
+                    "added": len(diff["ids"]),
+                    "removed": len(diff["remove_ids"]),
+                    "embedded": cache_misses,
+                    "from_cache": len(diff["ids"]) - cache_misses,
+                    "total": total,
+                },
+                "elapsed_seconds": round(time.perf_counter() - start, 3),
+            }
+            logger.info(
+                f"Reindex: {len(diff['added'])} added, {len(diff['changed'])} changed, {len(diff['deleted'])} deleted files; "
+                f"{len(diff['ids'])} chunks added ({cache_misses} embedded), {len(diff['remove_ids'])} removed "
+                f"in {report['elapsed_seconds']}s"
+            )
+        
+        if modified:
+            self.notify_reindex()
+        return report
+
+    def notify_reindex(self):
+        for listener in self.reindex_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Reindex listener failed: {e}")
 
     def setup_chain(self):
         if not self.vector_store:
+            self.qa_chain = None
             return
             
         llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo")
@@ -96,6 +286,21 @@ class InternalSalesAgent:
             logger.error(f"RAG Error: {e}")
             return f"I encountered an error retrieving that information: {e}"
 
+    async def aquery(self, question):
+        """
+        Async RAG query; the LLM and embedding calls don't hold a worker thread.
+        """
+        if not self.qa_chain:
+            return "Knowledge base is likely empty or failed to load. Please check data/docs."
+            
+        logger.info(f"RAG Query (async): {question}")
+        try:
+            response = await self.qa_chain.ainvoke({"query": question})
+            return response["result"]
+        except Exception as e:
+            logger.error(f"RAG Error: {e}")
+            return f"I encountered an error retrieving that information: {e}"
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     agent = InternalSalesAgent()
@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+import logging
+from datetime import datetime
+
+from sqlalchemy import text
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from database.schema import DealerSegment
+from database.engine import get_engine, read_frame
+from database.table_versions import read_table_versions
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+STORED_SEGMENTS_QUERY = text("""
+SELECT dealer_id, cluster
+FROM dealer_segments
+WHERE model_version = :model_version AND data_fingerprint = :data_fingerprint
+ORDER BY dealer_id
+""")
+
+class SegmentStore:
+    """
+    Dealer segment assignments persisted in dealer_segments together with the model
+    version and a fingerprint of the as-of date and the versions of the tables the features are read from. Requests are
+    served from memory; the fingerprint is re-read at most every
+    SEGMENT_VERSION_CHECK_SECONDS, and assignments are only recomputed when it or the
+    model version changed. After a restart they are reloaded from the table.
+    """
+    def __init__(self, segmentor, version_check_seconds=None):
+        self.segmentor = segmentor
+        self.version_check_seconds = (
+            settings.SEGMENT_VERSION_CHECK_SECONDS if version_check_seconds is None else version_check_seconds
+        )
+        self._current = None
+        self._fingerprint = None
+        self._as_of = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._table_checked = False
+
+    def ensure_table(self):
+        if not self._table_checked:
+            DealerSegment.__table__.create(get_engine(), checkfirst=True)
+            self._table_checked = True
+
+    def data_fingerprint(self):
+        """
+        Hash of the source tables' trigger-maintained versions (database/table_versions.py)
+        and the as-of date, or None if any of them isn't versioned. The RFM features are
+        relative to now, so assignments are recomputed at least once a day.
+        """
+        now = time.monotonic()
+        as_of = datetime.now().date().isoformat()
+        if self._fingerprint is not None and self._as_of == as_of and now - self._checked_at < self.version_check_seconds:
+            return self._fingerprint
+        tables = sorted(self.segmentor.source_tables)
+        with get_engine().connect() as conn:
+            versions = read_table_versions(conn, tables)
+        if any(table not in versions for table in tables):
+            return None
+        payload = json.dumps([as_of] + [[table, *versions[table]] for table in tables])
+        self._fingerprint = hashlib.sha256(payload.encode()).hexdigest()[:16]
+        self._as_of = as_of
+        self._checked_at = now
+        return self._fingerprint
+
+    def load(self, model_version, fingerprint):
+        return read_frame(STORED_SEGMENTS_QUERY, params={"model_version": model_version, "data_fingerprint": fingerprint})
+
+    def save(self, df, model_version, fingerprint):
+        assigned_at = datetime.utcnow()
+        rows = [
+            {
+                "dealer_id": int(r.dealer_id),
+                "cluster": int(r.cluster),
+                "model_version": model_version,
+                "data_fingerprint": fingerprint,
+                "assigned_at": assigned_at,
+            }
+            for r in df.itertuples(index=False)
+        ]
+        # Replaced in one transaction, so readers see either the old or the new assignments
+        with get_engine().begin() as conn:
+            conn.execute(text("DELETE FROM dealer_segments"))
+            if rows:
+                conn.execute(DealerSegment.__table__.insert(), rows)
+
+    def get(self):
+        """
+        Current assignments as {"records", "model_version", "data_fingerprint", "source"},
+        or None without dealer data.
+        """
+        with self._lock:
+            self.ensure_table()
+            # The serving segmentor can be swapped by a model reload; use one throughout
+            segmentor = self.segmentor
+            model_version = segmentor.model_version
+            # Read before the features, so a change in between triggers another recompute
+            fingerprint = self.data_fingerprint()
+            current = self._current
+            if fingerprint is not None and current and current["model_version"] == model_version \
+                    and current["data_fingerprint"] == fingerprint:
+                return dict(current, source="memory")
+
+            source = "table"
+            # Unversioned source tables: nothing can be reused, so always recompute
+            df = self.load(model_version, fingerprint) if fingerprint is not None else None
+            if df is None or df.empty:
+                start = time.perf_counter()
+                df = segmentor.run_segmentation()
+                if df is None:
+                    return None
+                model_version = segmentor.model_version
+                if fingerprint is not None:
+                    self.save(df, model_version, fingerprint)
+                source = "computed"
+                logger.info(f"Segments recomputed for {len(df)} dealers in {time.perf_counter() - start:.2f}s "
+                            f"(model {model_version}, data {fingerprint})")
+
+            self._current = {
+                "records": df[["dealer_id", "cluster"]].astype(int).to_dict(orient="records"),
+                "model_version": model_version,
+                "data_fingerprint": fingerprint or "unversioned",
+            }
+            return dict(self._current, source=source)
+
+    def invalidate(self):
+        with self._lock:
+            self._current = None
+            self._fingerprint = None
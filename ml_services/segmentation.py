@@ -1,67 +1,228 @@
+import hashlib
+import time
+import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
+import pyarrow as pa
+import pyarrow.compute as pc
+from joblib import Parallel, delayed
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
 from sklearn.preprocessing import StandardScaler
-from sqlalchemy import create_engine
 import os
 import sys
 import pickle
 import logging
+from datetime import datetime, timedelta
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import get_settings
+from database.engine import read_frame
+from database.snapshots import get_snapshot_store, use_snapshot
+from ml_services.model_registry import ModelRegistry
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+FEATURE_COLUMNS = ['recency_days', 'frequency', 'monetary', 'margin_rate', 'conversion_rate']
+# Heavy-tailed with dealer size; log1p before scaling so large dealers don't dominate the distances
+LOG_COLUMNS = ['frequency', 'monetary']
+
+# One pass over transactions and leads, aggregated per dealer and joined onto every dealer.
+# Over the trailing window: frequency = sales per 30 days, monetary = revenue,
+# margin_rate = margin / revenue, conversion_rate = converted / new leads.
+# recency_days = days since the last sale ever, capped at the window.
+FEATURE_QUERY = """
+WITH sales AS (
+    SELECT dealer_id,
+           MAX(date) AS last_sale,
+           COUNT(*) FILTER (WHERE date >= :cutoff) AS units,
+           SUM(sale_price) FILTER (WHERE date >= :cutoff) AS revenue,
+           SUM(margin) FILTER (WHERE date >= :cutoff) AS margin
+    FROM transactions
+    GROUP BY dealer_id
+),
+lead_stats AS (
+    SELECT dealer_id, COUNT(*) AS leads, COUNT(*) FILTER (WHERE converted) AS conversions
+    FROM leads
+    WHERE created_at >= :cutoff
+    GROUP BY dealer_id
+)
+SELECT d.dealer_id,
+       LEAST(COALESCE(EXTRACT(EPOCH FROM (CAST(:as_of AS timestamp) - s.last_sale)) / 86400, :window_days), :window_days) AS recency_days,
+       COALESCE(s.units, 0) * 30.0 / :window_days AS frequency,
+       COALESCE(s.revenue, 0) AS monetary,
+       COALESCE(s.margin / NULLIF(s.revenue, 0), 0) AS margin_rate,
+       COALESCE(l.conversions::float / NULLIF(l.leads, 0), 0) AS conversion_rate
+FROM dealers d
+LEFT JOIN sales s ON s.dealer_id = d.dealer_id
+LEFT JOIN lead_stats l ON l.dealer_id = d.dealer_id
+ORDER BY d.dealer_id
+"""
+
+def make_kmeans(n_clusters):
+    # Mini-batches keep each iteration's cost fixed regardless of the dealer count
+    return MiniBatchKMeans(
+        n_clusters=n_clusters, batch_size=settings.SEGMENT_BATCH_SIZE, n_init=3, random_state=42
+    )
+
+def transform_features(df):
+    X = df[FEATURE_COLUMNS].astype(np.float64)
+    X[LOG_COLUMNS] = np.log1p(X[LOG_COLUMNS].clip(lower=0))
+    return X
+
+def evaluate_k(X, n_clusters, sample_size):
+    """
+    Fits one candidate k and scores it: inertia on all rows, silhouette on a fixed
+    sample so the cost doesn't grow quadratically with the dealer count.
+    """
+    start = time.perf_counter()
+    model = make_kmeans(n_clusters).fit(X)
+    silhouette = silhouette_score(X, model.labels_, sample_size=min(sample_size, len(X)), random_state=42)
+    return {
+        "k": n_clusters,
+        "inertia": float(model.inertia_),
+        "silhouette": float(silhouette),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
 class DealerSegmentation:
+    # Tables the features are read from; their data version keys cached assignments
+    source_tables = ("dealers", "transactions", "leads")
+
     def __init__(self):
-        self.kmeans = KMeans(n_clusters=3, random_state=42) # Low, Med, High Value
+        self.kmeans = make_kmeans(settings.SEGMENT_N_CLUSTERS)
         self.scaler = StandardScaler()
         self.loaded = False
-        
-    def load_model(self):
+        self.load_attempted = False # A failed load isn't retried; new versions arrive via HotModel
+        self.model_version = "adhoc" # Registry version (or legacy content hash) once loaded
+
+    def load_model(self, version=None):
+        """
+        Loads the current (or the given) registered version, falling back to the
+        legacy segmentation.pkl keyed on its content hash.
+        """
+        self.load_attempted = True
+        artifacts, metadata = ModelRegistry().load("segmentation", version)
+        if artifacts is not None:
+            if metadata.get("feature_schema", {}).get("columns") != FEATURE_COLUMNS:
+                logger.warning(f"Segmentation {metadata['version']} was trained on other features. Please run training script.")
+                return
+            self.kmeans, self.scaler = artifacts["kmeans"], artifacts["scaler"]
+            self.model_version = metadata["version"]
+            self.loaded = True
+            logger.info(f"Segmentation model {self.model_version} loaded from the registry.")
+            return
         try:
             model_path = os.path.join(settings.MODELS_DIR, "segmentation.pkl")
             with open(model_path, 'rb') as f:
-                self.kmeans, self.scaler = pickle.load(f)
+                payload = f.read()
+            kmeans, scaler = pickle.loads(payload)
+            if getattr(scaler, 'n_features_in_', None) != len(FEATURE_COLUMNS):
+                logger.warning("Segmentation model was trained on other features. Please run training script.")
+                return
+            self.kmeans, self.scaler = kmeans, scaler
+            self.model_version = hashlib.sha256(payload).hexdigest()[:12]
             self.loaded = True
             logger.info("Segmentation model loaded successfully.")
         except FileNotFoundError:
              logger.warning("Segmentation model not found. Running fresh segmentation.")
 
-    def get_dealer_data(self):
-        engine = create_engine(settings.DATABASE_URL)
-        query = """
-        SELECT dealer_id, avg_monthly_volume, churn_risk_score
-        FROM dealers
+    def get_dealer_data(self, snapshot=False, as_of=None):
+        """
+        One row of FEATURE_COLUMNS per dealer as of `as_of` (default now).
+        Serving reads live data; training passes snapshot=None to follow TRAINING_SNAPSHOTS.
+        """
+        as_of = as_of or datetime.now()
+        window_days = settings.SEGMENT_WINDOW_DAYS
+        if all(use_snapshot(table, snapshot) for table in self.source_tables):
+            return self.features_from_snapshot(as_of, window_days)
+        params = {"as_of": as_of, "cutoff": as_of - timedelta(days=window_days), "window_days": window_days}
+        return read_frame(FEATURE_QUERY, params=params, dtypes={"dealer_id": "int32"})
+
+    def features_from_snapshot(self, as_of, window_days):
         """
-        df = pd.read_sql(query, engine)
-        return df
+        FEATURE_QUERY over the memory-mapped snapshots, aggregated in Arrow.
+        """
+        store = get_snapshot_store()
+        cutoff = pa.scalar(as_of - timedelta(days=window_days), pa.timestamp("us"))
+        transactions = store.read_table("transactions", ["dealer_id", "date", "sale_price", "margin"])
+        last_sale = transactions.group_by("dealer_id").aggregate([("date", "max")])
+        sales = transactions.filter(pc.field("date") >= cutoff).group_by("dealer_id").aggregate(
+            [("sale_price", "count"), ("sale_price", "sum"), ("margin", "sum")]
+        )
+        leads = store.read_table("leads", ["dealer_id", "created_at", "converted"]).filter(pc.field("created_at") >= cutoff)
+        lead_stats = pa.table({
+            "dealer_id": leads["dealer_id"],
+            "converted": pc.cast(pc.fill_null(leads["converted"], False), pa.int64()),
+        }).group_by("dealer_id").aggregate([("converted", "count"), ("converted", "sum")])
+
+        df = store.read("dealers", ["dealer_id"])
+        for stats in (last_sale, sales, lead_stats):
+            df = df.merge(stats.to_pandas(coerce_temporal_nanoseconds=True), on="dealer_id", how="left")
+        revenue = df["sale_price_sum"].fillna(0)
+        recency = (pd.Timestamp(as_of) - df["date_max"]).dt.total_seconds() / 86400
+        features = pd.DataFrame({
+            "dealer_id": df["dealer_id"].astype("int32"),
+            "recency_days": recency.fillna(window_days).clip(upper=window_days),
+            "frequency": df["sale_price_count"].fillna(0) * 30.0 / window_days,
+            "monetary": revenue,
+            "margin_rate": (df["margin_sum"] / revenue.where(revenue != 0)).fillna(0),
+            "conversion_rate": (df["converted_sum"] / df["converted_count"].where(df["converted_count"] != 0)).fillna(0),
+        })
+        return features.sort_values("dealer_id", ignore_index=True)
+
+    def fit(self, df, n_clusters=None):
+        """
+        Fits scaler and MiniBatchKMeans on the dealer features and returns the labels.
+        Clusters are renumbered by ascending monetary centroid (0 = lowest revenue), so
+        labels keep their meaning across refits.
+        """
+        n_clusters = n_clusters or settings.SEGMENT_N_CLUSTERS
+        start = time.perf_counter()
+        X = self.scaler.fit_transform(transform_features(df))
+        self.kmeans = make_kmeans(min(n_clusters, len(X))).fit(X)
+        order = np.argsort(self.kmeans.cluster_centers_[:, FEATURE_COLUMNS.index('monetary')])
+        self.kmeans.cluster_centers_ = self.kmeans.cluster_centers_[order]
+        labels = self.kmeans.predict(X)
+        logger.info(f"Segmentation fitted on {len(X)} dealers, k={self.kmeans.n_clusters} in {time.perf_counter() - start:.2f}s")
+        return labels
+
+    def choose_k(self, df, max_clusters=None, n_jobs=-1):
+        """
+        Fits k = 2..max_clusters in parallel and returns (report, best k by silhouette).
+        """
+        max_clusters = max_clusters or settings.SEGMENT_MAX_CLUSTERS
+        X = StandardScaler().fit_transform(transform_features(df))
+        ks = range(2, min(max_clusters, len(X) - 1) + 1)
+        if not ks:
+            return None, min(settings.SEGMENT_N_CLUSTERS, len(X))
+        rows = Parallel(n_jobs=n_jobs)(
+            delayed(evaluate_k)(X, k, settings.SEGMENT_SILHOUETTE_SAMPLE) for k in ks
+        )
+        report = pd.DataFrame(rows)
+        best = int(report.loc[report["silhouette"].idxmax(), "k"])
+        return report, best
 
     def run_segmentation(self):
         logger.info("Running Dealer Segmentation...")
-        
-        # Try to load model first
-        if not self.loaded:
+
+        # Try to load model first, once
+        if not self.loaded and not self.load_attempted:
             self.load_model()
-            
+
         df = self.get_dealer_data()
-        
+
         if df.empty:
             return None
-            
-        # Features
-        X = df[['avg_monthly_volume', 'churn_risk_score']]
-        
-        # If loaded, predict. If not, fit_predict (and ideally save, but checking mainly logic here)
+
+        # If loaded, predict. Otherwise fit on the current data with SEGMENT_N_CLUSTERS
         if self.loaded:
-            X_scaled = self.scaler.transform(X)
-            df['cluster'] = self.kmeans.predict(X_scaled)
+            df['cluster'] = self.kmeans.predict(self.scaler.transform(transform_features(df)))
         else:
-            X_scaled = self.scaler.fit_transform(X)
-            df['cluster'] = self.kmeans.fit_predict(X_scaled)
-        
+            logger.info(f"No trained segmentation model, fitting k={settings.SEGMENT_N_CLUSTERS} on the current data")
+            df['cluster'] = self.fit(df)
+
         result = df[['dealer_id', 'cluster']]
         return result
 
@@ -2,8 +2,6 @@ import os
 import re
 import sys
 import logging
-from sqlalchemy import create_engine, text
-from langchain_community.utilities import SQLDatabase
 from langchain_community.agent_toolkits.sql.base import create_sql_agent
 from langchain_community.agent_toolkits import SQLDatabaseToolkit
 from langchain.agents import AgentType
@@ -13,6 +11,8 @@ from langchain.schema import AgentAction, AgentFinish
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import get_settings
+from database.engine import get_engine
+from ml_services.sql_guard import GuardedSQLDatabase
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -24,9 +24,10 @@ class SecureSQLAgent:
     def __init__(self):
         # 1. READ-ONLY Connection
         # In production, use a specific read-only DB user. 
-        # For POC, we rely on prompt engineering + regex guardrails.
-        self.engine = create_engine(settings.DATABASE_URL)
-        self.db = SQLDatabase(self.engine)
+        # Generated SQL is parsed, row-capped and run in a read-only transaction with
+        # a timeout and plan-cost limit (see sql_guard); results are cached.
+        self.engine = get_engine()
+        self.db = GuardedSQLDatabase(self.engine)
         
         self.llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo")
         self.toolkit = SQLDatabaseToolkit(db=self.db, llm=self.llm)
@@ -58,6 +59,15 @@ class SecureSQLAgent:
         
         return True, ""
 
+    def build_prompt(self, natural_language_query):
+        return (
+            "You are a READ-ONLY data analyst. "
+            "You must NOT modify data. "
+            "If the user asks for more than 10 rows, you MUST add 'LIMIT 10' to the SQL. "
+            "Do not query credentials or passwords. "
+            f"Query: {natural_language_query}"
+        )
+
     def run_query(self, natural_language_query):
         """
         Executes a natural language query with guardrails.
@@ -68,27 +78,34 @@ class SecureSQLAgent:
         is_safe, message = self.validate_query(natural_language_query)
         if not is_safe:
              return message
-
-        query_prefix = (
-            "You are a READ-ONLY data analyst. "
-            "You must NOT modify data. "
-            "If the user asks for more than 10 rows, you MUST add 'LIMIT 10' to the SQL. "
-            "Do not query credentials or passwords. "
-            f"Query: {natural_language_query}"
-        )
         
         try:
-            # We can't easily hook into the generated SQL *before* execution in the standard agent 
-            # without custom callbacks, but the Agent Prompt is the first line of defense.
-            # A robust production system would use a custom LLMChain or SQLDatabase wrapper to parse the SQL before execution.
-            
-            result = self.agent_executor.run(query_prefix)
+            # The prompt is the first line of defense; the generated SQL itself is
+            # checked by GuardedSQLDatabase before it reaches Postgres.
+            result = self.agent_executor.run(self.build_prompt(natural_language_query))
             return result
             
         except Exception as e:
             logger.error(f"Agent Error: {e}")
             return f"I encountered an error processing your request: {str(e)}"
 
+    async def arun_query(self, natural_language_query):
+        """
+        Async variant: LLM calls are awaited, SQL tool calls run in the default executor.
+        """
+        logger.info(f"Received Query (async): {natural_language_query}")
+        
+        is_safe, message = self.validate_query(natural_language_query)
+        if not is_safe:
+             return message
+        
+        try:
+            result = await self.agent_executor.ainvoke({"input": self.build_prompt(natural_language_query)})
+            return result["output"]
+        except Exception as e:
+            logger.error(f"Agent Error: {e}")
+            return f"I encountered an error processing your request: {str(e)}"
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     agent = SecureSQLAgent()
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from sqlglot.optimizer.normalize_identifiers import normalize_identifiers
+from langchain_community.utilities import SQLDatabase
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from database.table_versions import read_table_versions
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Results larger than this are returned but not cached
+MAX_CACHED_RESULT_CHARS = 100_000
+
+# Results depend on when or how often the statement runs, not only on the table data
+VOLATILE_EXPRESSIONS = tuple(
+    getattr(exp, name) for name in (
+        "CurrentDate", "CurrentTime", "CurrentTimestamp", "CurrentDatetime",
+        "Localtime", "Localtimestamp", "Rand", "Uuid",
+    ) if hasattr(exp, name)
+)
+VOLATILE_FUNCTIONS = {
+    "now", "clock_timestamp", "statement_timestamp", "transaction_timestamp", "timeofday",
+    "random", "random_normal", "setseed", "gen_random_uuid", "uuid_generate_v4",
+    "nextval", "currval", "setval", "txid_current",
+}
+# Special date/time input strings, e.g. 'now'::timestamp
+TIME_LITERALS = {"now", "today", "tomorrow", "yesterday"}
+
+def is_volatile(expression):
+    if expression.find(*VOLATILE_EXPRESSIONS) is not None:
+        return True
+    if any(func.name.lower() in VOLATILE_FUNCTIONS for func in expression.find_all(exp.Anonymous)):
+        return True
+    return any(
+        isinstance(cast.this, exp.Literal) and cast.this.is_string and cast.this.name.strip().lower() in TIME_LITERALS
+        for cast in expression.find_all(exp.Cast)
+    )
+
+def normalize_select(sql):
+    """
+    Parses a single SELECT (or set operation) and returns its canonical Postgres text
+    and the tables it reads, or (None, None) if it isn't a cacheable read (including
+    reads whose result depends on the clock or on random values).
+    """
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read="postgres") if statement is not None]
+    except SqlglotError:
+        return None, None
+    if len(statements) != 1 or not isinstance(statements[0], (exp.Select, exp.Union, exp.Intersect, exp.Except)):
+        return None, None
+
+    if is_volatile(statements[0]):
+        return None, None
+
+    expression = normalize_identifiers(statements[0], dialect="postgres")
+    cte_names = {cte.alias_or_name for cte in expression.find_all(exp.CTE)}
+    tables = {table.name for table in expression.find_all(exp.Table)} - cte_names
+    return expression.sql(dialect="postgres"), frozenset(tables)
+
+class CachedSQLDatabase(SQLDatabase):
+    """
+    SQLDatabase whose run() serves repeated SELECTs from a bounded LRU cache keyed on
+    the normalized SQL. An entry stays valid while the data version of every table it
+    reads is unchanged; versions are re-read at most every SQL_CACHE_VERSION_CHECK_SECONDS,
+    so hits inside that window don't touch the database at all.
+    """
+    def __init__(self, engine, max_size=None, version_check_seconds=None, **kwargs):
+        super().__init__(engine, **kwargs)
+        self.max_size = max_size or settings.SQL_CACHE_MAX_SIZE
+        self.version_check_seconds = (
+            settings.SQL_CACHE_VERSION_CHECK_SECONDS if version_check_seconds is None else version_check_seconds
+        )
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._versions_checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "uncacheable": 0, "evictions": 0, "db_seconds": 0.0, "saved_seconds": 0.0}
+
+    def table_versions(self, tables):
+        """
+        Current data version per table from table_versions, which a trigger bumps in
+        every writing transaction; at most SQL_CACHE_VERSION_CHECK_SECONDS old.
+        """
+        now = time.monotonic()
+        with self._lock:
+            fresh = now - self._versions_checked_at < self.version_check_seconds
+            if fresh and all(table in self._versions for table in tables):
+                return {table: self._versions[table] for table in tables}
+
+        with self._engine.connect() as conn:
+            versions = read_table_versions(conn, tables)
+        with self._lock:
+            if not fresh:
+                self._versions = {}
+                self._versions_checked_at = now
+            self._versions.update(versions)
+        # Tables without the trigger (views, catalogs, unmigrated databases) disable caching
+        return {table: versions.get(table) for table in tables}
+
+    def run(self, command, fetch="all", include_columns=False, **kwargs):
+        if fetch == "cursor" or not isinstance(command, str):
+            return super().run(command, fetch=fetch, include_columns=include_columns, **kwargs)
+
+        normalized, tables = normalize_select(command)
+        versions = self.table_versions(tables) if tables else None
+        if normalized is None or not versions or None in versions.values():
+            with self._lock:
+                self._stats["uncacheable"] += 1
+            return super().run(command, fetch=fetch, include_columns=include_columns, **kwargs)
+
+        key = (normalized, fetch, include_columns, json.dumps(kwargs, sort_keys=True, default=str))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["versions"] == versions:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                self._stats["saved_seconds"] += entry["db_seconds"]
+                return entry["result"]
+            self._stats["misses"] += 1
+
+        start = time.perf_counter()
+        result = super().run(command, fetch=fetch, include_columns=include_columns, **kwargs)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats["db_seconds"] += elapsed
+            if len(str(result)) <= MAX_CACHED_RESULT_CHARS:
+                self._entries[key] = {"result": result, "versions": versions, "db_seconds": elapsed}
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return result
+
+    def clear_cache(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions = {}
+
+    def cache_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+        stats["db_seconds"] = round(stats["db_seconds"], 3)
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        stats["max_size"] = self.max_size
+        return stats
@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import threading
+import logging
+from datetime import datetime
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from ml_services.sql_cache import CachedSQLDatabase
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+QUERY_TYPES = (exp.Select, exp.Union, exp.Intersect, exp.Except)
+WRITE_NODES = (exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter, exp.Command)
+
+# Functions with side effects or server/file access
+DENIED_FUNCTIONS = {
+    "pg_sleep", "pg_read_file", "pg_read_binary_file", "pg_ls_dir", "pg_stat_file",
+    "lo_import", "lo_export", "dblink", "dblink_exec", "set_config",
+    "pg_terminate_backend", "pg_cancel_backend", "pg_reload_conf", "pg_advisory_lock",
+}
+DENIED_TABLES = {"pg_authid", "pg_shadow", "pg_user_mappings"}
+
+QUERY_CANCELED = "57014" # SQLSTATE raised when statement_timeout fires
+
+class SQLGuardError(Exception):
+    """Generated SQL rejected before or during execution."""
+
+def clamp_limit(expression, max_rows):
+    """
+    Adds LIMIT max_rows, or lowers an existing LIMIT / FETCH FIRST above it.
+    """
+    limit = expression.args.get("limit")
+    current = None
+    if limit is not None:
+        value = limit.args.get("expression") or limit.args.get("count")
+        if isinstance(value, exp.Literal) and value.is_int:
+            current = int(value.name)
+    if current is None or current > max_rows:
+        expression.set("limit", exp.Limit(expression=exp.Literal.number(max_rows)))
+    return expression
+
+def guard_sql(sql, max_rows=None):
+    """
+    Parses generated SQL and returns it rewritten with a row cap. Raises SQLGuardError
+    unless it is a single read-only SELECT (or set operation).
+    """
+    max_rows = max_rows or settings.SQL_MAX_ROWS
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read="postgres") if statement is not None]
+    except SqlglotError as e:
+        raise SQLGuardError(f"Could not parse SQL: {e}")
+    if len(statements) != 1:
+        raise SQLGuardError(f"Exactly one statement is allowed, got {len(statements)}")
+
+    expression = statements[0]
+    if not isinstance(expression, QUERY_TYPES):
+        raise SQLGuardError(f"Only SELECT statements are allowed, got {expression.key.upper()}")
+    if expression.find(*WRITE_NODES) is not None:
+        raise SQLGuardError("Data-modifying statements are not allowed inside a SELECT")
+    if expression.args.get("into") is not None:
+        raise SQLGuardError("SELECT INTO is not allowed")
+    if expression.args.get("locks"):
+        raise SQLGuardError("Row locking clauses are not allowed")
+    for func in expression.find_all(exp.Anonymous):
+        if func.name.lower() in DENIED_FUNCTIONS:
+            raise SQLGuardError(f"Function {func.name} is not allowed")
+    for table in expression.find_all(exp.Table):
+        if table.name.lower() in DENIED_TABLES:
+            raise SQLGuardError(f"Table {table.name} is not allowed")
+
+    return clamp_limit(expression, max_rows).sql(dialect="postgres")
+
+class GuardedSQLDatabase(CachedSQLDatabase):
+    """
+    Execution layer for agent-generated SQL: queries are parsed and row-capped by
+    guard_sql, run in a read-only transaction under statement_timeout, rejected when
+    EXPLAIN's total cost is above SQL_MAX_PLAN_COST, and read through a server-side
+    cursor that stops at SQL_MAX_RESULT_BYTES. Rejections and timeouts are logged to
+    LOGS_DIR/sql_guard_events.jsonl with the offending SQL.
+    """
+    def __init__(self, engine, **kwargs):
+        super().__init__(engine, **kwargs)
+        self.log_path = os.path.join(settings.LOGS_DIR, "sql_guard_events.jsonl")
+        self._log_lock = threading.Lock()
+
+    def record(self, event, sql, reason):
+        logger.warning(f"SQL guard {event}: {reason} | SQL: {sql}")
+        entry = {"timestamp": datetime.utcnow().isoformat(), "event": event, "reason": reason, "sql": sql}
+        with self._log_lock:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def run(self, command, fetch="all", include_columns=False, **kwargs):
+        if isinstance(command, str):
+            try:
+                command = guard_sql(command)
+            except SQLGuardError as e:
+                self.record("rejected", command, str(e))
+                raise
+        return super().run(command, fetch=fetch, include_columns=include_columns, **kwargs)
+
+    def run_no_throw(self, command, fetch="all", include_columns=False, **kwargs):
+        # Return guard errors to the agent like database errors, so it can rewrite the query
+        try:
+            return super().run_no_throw(command, fetch=fetch, include_columns=include_columns, **kwargs)
+        except SQLGuardError as e:
+            return f"Error: {e}"
+
+    def _execute(self, command, fetch="all", *, parameters=None, execution_options=None):
+        sql = str(command)
+        with self._engine.begin() as connection:
+            connection.execute(text("SET TRANSACTION READ ONLY"))
+            connection.execute(
+                text("SELECT set_config('statement_timeout', :timeout, true)"),
+                {"timeout": str(settings.SQL_STATEMENT_TIMEOUT_MS)}
+            )
+            try:
+                plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), parameters or {}).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                cost = plan[0]["Plan"]["Total Cost"]
+                if cost > settings.SQL_MAX_PLAN_COST:
+                    reason = f"Estimated plan cost {cost:,.0f} exceeds {settings.SQL_MAX_PLAN_COST:,.0f}; add filters or aggregate"
+                    self.record("rejected", sql, reason)
+                    raise SQLGuardError(reason)
+
+                result = connection.execution_options(
+                    stream_results=True, **(execution_options or {})
+                ).execute(text(sql), parameters or {})
+                if not result.returns_rows:
+                    return []
+                if fetch == "one":
+                    row = result.first()
+                    return [row._asdict()] if row is not None else []
+                return self._read_capped(result, sql)
+            except DBAPIError as e:
+                if getattr(e.orig, "pgcode", None) == QUERY_CANCELED:
+                    self.record("timeout", sql, f"statement_timeout of {settings.SQL_STATEMENT_TIMEOUT_MS}ms exceeded")
+                raise
+
+    def _read_capped(self, result, sql):
+        rows, size = [], 0
+        for partition in result.partitions(settings.SQL_STREAM_BATCH_ROWS):
+            for row in partition:
+                size += len(repr(tuple(row)))
+                if size > settings.SQL_MAX_RESULT_BYTES:
+                    result.close()
+                    self.record("truncated", sql, f"result exceeded {settings.SQL_MAX_RESULT_BYTES} bytes after {len(rows)} rows")
+                    rows.append({"note": f"Result truncated after {len(rows)} rows; aggregate or filter further."})
+                    return rows
+                rows.append(row._asdict())
+        return rows
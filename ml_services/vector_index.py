@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+import logging
+
+import numpy as np
+import pandas as pd
+import faiss
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+
+# "auto" picks exact search for small corpora, HNSW up to the point its graph gets
+# expensive to hold in RAM, and IVF (whose lists mmap well) beyond that
+FLAT_MAX_VECTORS = 10_000
+HNSW_MAX_VECTORS = 500_000
+
+def index_params(n_vectors, index_type=None):
+    """
+    Build/search parameters for a corpus of n_vectors.
+    """
+    index_type = index_type or settings.RAG_INDEX_TYPE
+    if index_type == "auto":
+        if n_vectors < FLAT_MAX_VECTORS:
+            index_type = "flat"
+        elif n_vectors < HNSW_MAX_VECTORS:
+            index_type = "hnsw"
+        else:
+            index_type = "ivf"
+
+    params = {"type": index_type, "n_vectors": n_vectors}
+    if index_type == "ivf":
+        # ~4*sqrt(n) lists, but at least 39 training points per centroid
+        nlist = max(1, min(int(4 * np.sqrt(n_vectors)), n_vectors // 39))
+        params.update(nlist=nlist, nprobe=min(nlist, max(8, nlist // 16)))
+    elif index_type == "hnsw":
+        params.update(m=32, ef_construction=200, ef_search=64 if n_vectors < 100_000 else 128)
+    elif index_type != "flat":
+        raise ValueError(f"Unknown index type: {index_type}")
+    return params
+
+def apply_search_params(index, params):
+    if params["type"] == "ivf":
+        faiss.extract_index_ivf(index).nprobe = settings.RAG_IVF_NPROBE or params["nprobe"]
+    elif params["type"] == "hnsw":
+        index.hnsw.efSearch = settings.RAG_HNSW_EF_SEARCH or params["ef_search"]
+
+def build_index(vectors, params):
+    dim = vectors.shape[1]
+    if params["type"] == "ivf":
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, params["nlist"])
+        index.train(vectors)
+    elif params["type"] == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+    else:
+        index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    apply_search_params(index, params)
+    return index
+
+def supports_removal(params):
+    # LangChain's FAISS.delete assumes remove_ids compacts positions, which only holds for flat indexes
+    return params["type"] == "flat"
+
+def build_store(embeddings, chunks, ids, index_type=None):
+    """
+    Embeds the chunks and builds a FAISS vector store on the index type suited to their count.
+    """
+    vectors = np.asarray(embeddings.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+    params = index_params(len(vectors), index_type)
+    start = time.perf_counter()
+    index = build_index(vectors, params)
+    logger.info(f"Built {params['type']} index over {len(vectors)} vectors in {time.perf_counter() - start:.2f}s")
+    store = FAISS(embeddings, index, InMemoryDocstore(dict(zip(ids, chunks))), dict(enumerate(ids)))
+    return store, params
+
+class SQLiteDocstore(Docstore):
+    """
+    Read-only docstore backed by SQLite, so serving processes look up only the
+    chunks a search returns instead of unpickling the whole corpus.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def search(self, search):
+        row = self._connection().execute(
+            "SELECT page_content, metadata FROM documents WHERE id = ?", (search,)
+        ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def position_map(self):
+        return dict(self._connection().execute("SELECT position, id FROM documents ORDER BY position"))
+
+    def documents(self):
+        return {
+            doc_id: Document(page_content=content, metadata=json.loads(metadata))
+            for doc_id, content, metadata in self._connection().execute("SELECT id, page_content, metadata FROM documents")
+        }
+
+def save_store(store, path):
+    """
+    Writes the FAISS index and a SQLite docstore, each via a temp file and an atomic
+    rename so processes that have the previous files mapped keep a consistent view.
+    """
+    os.makedirs(path, exist_ok=True)
+    index_path = os.path.join(path, INDEX_FILE)
+    faiss.write_index(store.index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)
+
+    docstore_path = os.path.join(path, DOCSTORE_FILE)
+    tmp_path = docstore_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(
+            "CREATE TABLE documents (position INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+            "page_content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        rows = []
+        for position, doc_id in store.index_to_docstore_id.items():
+            doc = store.docstore.search(doc_id)
+            rows.append((position, doc_id, doc.page_content, json.dumps(doc.metadata)))
+        conn.executemany("INSERT INTO documents VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, docstore_path)
+
+    # Pickled docstores from older versions are no longer read
+    legacy_path = os.path.join(path, LEGACY_DOCSTORE_FILE)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+def load_store(path, embeddings, params, mmap=False):
+    """
+    Loads a store written by save_store. With mmap the index is mapped read-only (the
+    inverted lists for IVF; FAISS reads other types into memory) and documents are
+    read from SQLite on demand, so worker processes share pages and startup doesn't
+    unpickle the corpus. Without it everything is loaded into memory and can be modified.
+    """
+    index_path = os.path.join(path, INDEX_FILE)
+    docstore = SQLiteDocstore(os.path.join(path, DOCSTORE_FILE))
+    position_map = docstore.position_map()
+    if mmap:
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            logger.warning(f"Index can't be memory-mapped ({e}), reading into memory")
+            index = faiss.read_index(index_path)
+    else:
+        index = faiss.read_index(index_path)
+        docstore = InMemoryDocstore(docstore.documents())
+    apply_search_params(index, params)
+
+    if index.ntotal != len(position_map):
+        raise ValueError(f"Index holds {index.ntotal} vectors but docstore has {len(position_map)} documents")
+    return FAISS(embeddings, index, docstore, position_map)
+
+def reconstruct_vectors(index):
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+def search_latencies(index, queries, k):
+    timings = np.empty(len(queries))
+    results = np.empty((len(queries), k), dtype=np.int64)
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, ids = index.search(queries[i:i + 1], k)
+        timings[i] = time.perf_counter() - start
+        results[i] = ids[0]
+    return results, timings
+
+def recall_latency_report(vectors, queries, k=4, nprobes=(1, 4, 16, 64), ef_searches=(16, 32, 64, 128)):
+    """
+    Builds each index type with the parameters index_params picks for this corpus and
+    sweeps its search knob, reporting recall@k against exact search and single-query
+    latency (as the RAG retriever issues them).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    truth, _ = exact.search(queries, k)
+
+    rows = []
+    for index_type in ("flat", "ivf", "hnsw"):
+        params = index_params(len(vectors), index_type)
+        start = time.perf_counter()
+        index = build_index(vectors, params)
+        build_seconds = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+
+        if index_type == "ivf":
+            sweep = [("nprobe", value) for value in sorted(set(nprobes) | {params["nprobe"]}) if value <= params["nlist"]]
+        elif index_type == "hnsw":
+            sweep = [("ef_search", value) for value in sorted(set(ef_searches) | {params["ef_search"]})]
+        else:
+            sweep = [(None, None)]
+
+        for knob, value in sweep:
+            if knob == "nprobe":
+                faiss.extract_index_ivf(index).nprobe = value
+            elif knob == "ef_search":
+                index.hnsw.efSearch = value
+            found, timings = search_latencies(index, queries, k)
+            recall = np.mean([len(set(row) & set(expected)) / k for row, expected in zip(found, truth)])
+            rows.append({
+                "index": index_type,
+                "params": json.dumps({key: v for key, v in params.items() if key not in ("type", "n_vectors")}),
+                "search_setting": f"{knob}={value}" if knob else "",
+                "default": knob is None or value == params[knob],
+                f"recall_at_{k}": round(float(recall), 4),
+                "p50_ms": round(float(np.percentile(timings, 50)) * 1000, 3),
+                "p95_ms": round(float(np.percentile(timings, 95)) * 1000, 3),
+                "build_seconds": round(build_seconds, 2),
+                "size_mb": round(size_mb, 1),
+            })
+    return pd.DataFrame(rows)
@@ -0,0 +1,38 @@
+import sys
+import os
+import argparse
+import logging
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from ml_services.forecasting import backtest_forecasts
+
+settings = get_settings()
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare forecasting strategies on a holdout window.")
+    parser.add_argument("--horizon", type=int, default=settings.FORECAST_HORIZON_DAYS, help="Holdout length in days")
+    parser.add_argument("--source", choices=["snapshot", "postgres"], default=None,
+                        help="History source (default: TRAINING_SNAPSHOTS)")
+    args = parser.parse_args()
+    
+    snapshot = None if args.source is None else args.source == "snapshot"
+    report = backtest_forecasts(horizon=args.horizon, snapshot=snapshot)
+    if report is None:
+        logger.warning("No transactions found, nothing to backtest.")
+        return
+    
+    print(report.to_string(index=False))
+    
+    output_path = os.path.join(settings.LOGS_DIR, f"forecast_backtest_{datetime.utcnow():%Y%m%dT%H%M%S}.csv")
+    report.to_csv(output_path, index=False)
+    logger.info(f"Backtest report saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
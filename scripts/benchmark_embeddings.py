@@ -0,0 +1,58 @@
+import sys
+import os
+import time
+import argparse
+import logging
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from ml_services.embeddings import get_embeddings
+
+settings = get_settings()
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "dealer warranty policy incentive compliance return vehicle inventory lead margin "
+    "auction retail finance quarter region bonus claim inspection delivery service contract"
+).split()
+
+def synthetic_chunks(n_chunks, words_per_chunk, seed=42):
+    # Stand-in for a large corpus: chunks of roughly splitter size (~1000 chars)
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, words_per_chunk)) for _ in range(n_chunks)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure embedding throughput per backend.")
+    parser.add_argument("--backends", default="hashing,openai", help="Comma-separated: hashing, openai")
+    parser.add_argument("--chunks", type=int, default=2000, help="Chunks to embed per backend")
+    parser.add_argument("--words", type=int, default=150, help="Words per chunk")
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks, args.words)
+    # Unique prefix per run so repeated runs never hit a warm cache
+    chunks = [f"{time.time_ns()} {chunk}" for chunk in chunks]
+
+    print(f"Embedding {len(chunks)} chunks (~{args.words} words each)")
+    for backend in args.backends.split(","):
+        backend = backend.strip()
+        try:
+            embeddings = get_embeddings(backend)
+            start = time.perf_counter()
+            vectors = embeddings.embed_documents(chunks)
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            logger.error(f"{backend}: benchmark failed: {e}")
+            continue
+        print(
+            f"  {backend:<8} dim={len(vectors[0]):<5} {elapsed:8.2f}s  "
+            f"{len(chunks) / elapsed:10,.0f} chunks/sec"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import sys
+import os
+import time
+import argparse
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from database.engine import get_engine
+from database.schema import Base
+from database.migrations import declared_indexes
+
+settings = get_settings()
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Rows per scale factor 1 (~ the default generate_data.py volume)
+BASE_DEALERS = 20
+BASE_CARS = 50_000
+BASE_LEADS = 30_000
+
+# Set-based fill of a bench schema (3 years of history), sized by :dealers, :cars and :leads
+POPULATE_STATEMENTS = [
+    """
+    INSERT INTO dealers (dealer_id, name, country, city, avg_monthly_volume, churn_risk_score, joined_date)
+    SELECT g, 'Dealer ' || g, 'Germany', 'City ' || (g % 50), 5 + (g % 40), random(), now() - interval '4 years'
+    FROM generate_series(1, :dealers) g
+    """,
+    """
+    INSERT INTO inventory (car_id, dealer_id, make, model, year, acquisition_price, condition_score,
+                           location, ingredients_date, days_in_stock, status)
+    SELECT g, 1 + (g % :dealers), 'Make ' || (g % 7), 'Model', 2018 + (g % 7), 10000 + random() * 40000,
+           1 + (g % 10), 'City', now() - random() * interval '1095 days', 1 + (g % 180),
+           CASE WHEN random() < 0.8 THEN 'sold' WHEN random() < 0.5 THEN 'reserved' ELSE 'available' END
+    FROM generate_series(1, :cars) g
+    """,
+    """
+    INSERT INTO transactions (transaction_id, date, dealer_id, car_id, sale_price, margin, channel)
+    SELECT car_id, ingredients_date + days_in_stock * interval '1 day', dealer_id, car_id,
+           acquisition_price * 1.1, acquisition_price * 0.1, (ARRAY['auction', 'direct', 'wholesale'])[1 + car_id % 3]
+    FROM inventory
+    WHERE status = 'sold'
+    """,
+    """
+    INSERT INTO leads (lead_id, created_at, dealer_id, source, inquiry_text, response_time_minutes, converted, conversion_probability)
+    SELECT g, now() - random() * interval '1095 days', 1 + (g % :dealers), (ARRAY['website', 'referral', 'email'])[1 + g % 3],
+           'Inquiry', 5 + random() * 115, random() < 0.4, random()
+    FROM generate_series(1, :leads) g
+    """,
+    """
+    INSERT INTO kpi_snapshots (id, date, dealer_id, conversion_rate, avg_ticket_size, inventory_turnover, forecast_accuracy)
+    SELECT row_number() OVER (), day, d, random(), 20000 + random() * 20000, random() * 5, random()
+    FROM generate_series(1, :dealers) d
+    CROSS JOIN generate_series(now() - interval '1095 days', now(), interval '1 day') day
+    """,
+]
+
+# Access paths of the forecasting, lead, inventory and KPI services
+QUERIES = {
+    "dealer_daily_revenue": """
+        SELECT date_trunc('day', date) AS day, SUM(sale_price)
+        FROM transactions
+        WHERE dealer_id = :dealer_id AND date >= now() - interval '90 days'
+        GROUP BY 1
+    """,
+    "forecast_watermarks": """
+        SELECT dealer_id, MAX(date), MAX(transaction_id), COUNT(*)
+        FROM transactions
+        GROUP BY dealer_id
+    """,
+    "revenue_last_30_days": """
+        SELECT SUM(sale_price) FROM transactions WHERE date >= now() - interval '30 days'
+    """,
+    "dealer_recent_leads": """
+        SELECT COUNT(*), AVG(converted::int) FROM leads
+        WHERE dealer_id = :dealer_id AND created_at >= now() - interval '90 days'
+    """,
+    "leads_last_7_days": """
+        SELECT source, COUNT(*) FROM leads WHERE created_at >= now() - interval '7 days' GROUP BY source
+    """,
+    "dealer_available_stock": """
+        SELECT COUNT(*), SUM(acquisition_price), AVG(days_in_stock) FROM inventory
+        WHERE dealer_id = :dealer_id AND status = 'available'
+    """,
+    "dealer_kpi_history": """
+        SELECT date, conversion_rate, avg_ticket_size FROM kpi_snapshots
+        WHERE dealer_id = :dealer_id ORDER BY date DESC LIMIT 30
+    """,
+}
+
+def plan_scans(conn, sql, params):
+    """
+    Scan node types in the plan, e.g. Seq Scan vs Index Only Scan.
+    """
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    scans, stack = set(), [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if "Scan" in node["Node Type"]:
+            scans.add(node["Node Type"])
+        stack.extend(node.get("Plans", []))
+    return ", ".join(sorted(scans))
+
+def time_queries(conn, n_dealers, repeats, seed=0):
+    rng = np.random.default_rng(seed)
+    results = {}
+    for name, sql in QUERIES.items():
+        timings = []
+        for _ in range(repeats):
+            params = {"dealer_id": int(rng.integers(1, n_dealers + 1))} if ":dealer_id" in sql else {}
+            start = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        params = {"dealer_id": 1} if ":dealer_id" in sql else {}
+        results[name] = (float(np.median(timings)), plan_scans(conn, sql, params))
+    return results
+
+def benchmark_scale(engine, scale, repeats, keep):
+    schema = f"bench_sf{scale}"
+    dealers = BASE_DEALERS * scale
+    params = {"dealers": dealers, "cars": BASE_CARS * scale, "leads": BASE_LEADS * scale}
+    indexes = declared_indexes()
+    rows = []
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        conn.execute(text(f"SET search_path TO {schema}"))
+        Base.metadata.create_all(conn)
+        for index in indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        conn.commit()
+
+        start = time.perf_counter()
+        for statement in POPULATE_STATEMENTS:
+            conn.execute(text(statement), params)
+        conn.commit()
+        counts = {table: conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() for table in ("transactions", "leads", "inventory", "kpi_snapshots")}
+        logger.info(f"[{schema}] populated in {time.perf_counter() - start:.1f}s: {counts}")
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+
+        before = time_queries(conn, dealers, repeats)
+        start = time.perf_counter()
+        for index in indexes:
+            conn.execute(CreateIndex(index))
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+        logger.info(f"[{schema}] built {len(indexes)} indexes in {time.perf_counter() - start:.1f}s")
+        after = time_queries(conn, dealers, repeats)
+
+        if not keep:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        # The pooled connection outlives this block
+        conn.execute(text("RESET search_path"))
+        conn.commit()
+
+    for name in QUERIES:
+        before_ms, before_plan = before[name]
+        after_ms, after_plan = after[name]
+        rows.append({
+            "scale": scale,
+            "transactions": counts["transactions"],
+            "query": name,
+            "before_ms": round(before_ms, 2),
+            "after_ms": round(after_ms, 2),
+            "speedup": round(before_ms / after_ms, 1) if after_ms else None,
+            "plan_before": before_plan,
+            "plan_after": after_plan,
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the service query patterns with and without the schema's indexes.")
+    parser.add_argument("--scales", default="1,5,25", help="Comma-separated scale factors (1 = ~50k cars, 20 dealers)")
+    parser.add_argument("--repeats", type=int, default=20, help="Runs per query; the median is reported")
+    parser.add_argument("--keep", action="store_true", help="Keep the bench_sf* schemas afterwards")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    rows = []
+    for scale in [int(s) for s in args.scales.split(",")]:
+        rows.extend(benchmark_scale(engine, scale, args.repeats, args.keep))
+
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False))
+
+    output_path = os.path.join(settings.LOGS_DIR, f"index_benchmark_{datetime.utcnow():%Y%m%dT%H%M%S}.csv")
+    report.to_csv(output_path, index=False)
+    logger.info(f"Benchmark report saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import sys
+import os
+import time
+import argparse
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from ml_services.lead_scoring import LeadScorer, FEATURE_COLUMNS
+
+settings = get_settings()
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def latency_percentiles(fn, iterations):
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        timings[i] = time.perf_counter() - start
+    return np.percentile(timings, 50) * 1e6, np.percentile(timings, 99) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify and benchmark compiled lead scorer inference.")
+    parser.add_argument("--iterations", type=int, default=2000, help="Single-lead calls per path")
+    parser.add_argument("--batch-size", type=int, default=100_000, help="Rows for the batch benchmark")
+    args = parser.parse_args()
+    
+    scorer = LeadScorer()
+    scorer.load_model()
+    if not scorer.loaded or scorer.compiled is None:
+        logger.error("Compiled lead scorer unavailable. Train the model and enable LEAD_SCORER_COMPILED.")
+        return
+    
+    rng = np.random.default_rng(42)
+    n_sources = len(scorer.encoder.classes_)
+    codes = rng.integers(0, n_sources, args.batch_size)
+    response_times = rng.integers(0, 240, args.batch_size).astype(np.float64)
+    response_times[::10] += rng.random(len(response_times[::10])) # some non-integer rows
+    X = pd.DataFrame({FEATURE_COLUMNS[0]: codes, FEATURE_COLUMNS[1]: response_times})
+    
+    # Correctness: bit-for-bit against sklearn
+    sample = X.iloc[:10_000]
+    reference = scorer.model.predict_proba(sample)[:, 1]
+    compiled_ok = np.array_equal(scorer.compiled.predict_proba(sample)[:, 1], reference)
+    lookup_ok = scorer.lookup is None or np.array_equal(
+        scorer.lookup.predict(sample[FEATURE_COLUMNS[0]].to_numpy(), sample[FEATURE_COLUMNS[1]].to_numpy()), reference
+    )
+    print(f"Bit-for-bit match on {len(sample)} rows: compiled={compiled_ok} lookup={lookup_ok}")
+    
+    # Single-lead latency
+    sources = scorer.encoder.classes_[codes]
+    single_rows = [X.iloc[[i]] for i in range(args.iterations)]
+    paths = {
+        "sklearn predict_proba": lambda i: scorer.model.predict_proba(single_rows[i]),
+        "compiled traversal": lambda i: scorer.compiled.predict_proba([[codes[i], response_times[i]]]),
+        "LeadScorer.predict": lambda i: scorer.predict(sources[i], response_times[i]),
+    }
+    if scorer.lookup is not None:
+        paths["lookup table"] = lambda i: scorer.lookup.predict_one(codes[i], response_times[i])
+    
+    print(f"\nSingle-lead latency over {args.iterations} calls (microseconds):")
+    for name, fn in paths.items():
+        p50, p99 = latency_percentiles(fn, args.iterations)
+        print(f"  {name:<24} p50={p50:9.1f}  p99={p99:9.1f}")
+    
+    # Batch throughput
+    start = time.perf_counter()
+    scorer.predict_batch(sources, response_times)
+    elapsed = time.perf_counter() - start
+    print(f"\npredict_batch: {args.batch_size} leads in {elapsed * 1000:.1f}ms ({args.batch_size / elapsed:,.0f} leads/sec)")
+
+if __name__ == "__main__":
+    main()
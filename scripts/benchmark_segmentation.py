@@ -0,0 +1,80 @@
+import sys
+import os
+import time
+import argparse
+import tracemalloc
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from ml_services.segmentation import FEATURE_COLUMNS, DealerSegmentation, transform_features
+
+settings = get_settings()
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def synthetic_features(n, seed=42):
+    # Dealer archetypes with heavy-tailed volume, like the generated data
+    rng = np.random.default_rng(seed)
+    volume = rng.lognormal(mean=3, sigma=0.8, size=n)
+    return pd.DataFrame({
+        "dealer_id": np.arange(1, n + 1),
+        "recency_days": np.minimum(rng.exponential(20, n), settings.SEGMENT_WINDOW_DAYS),
+        "frequency": volume,
+        "monetary": volume * rng.normal(30000, 5000, n) * 12,
+        "margin_rate": rng.uniform(0.04, 0.15, n),
+        "conversion_rate": rng.beta(4, 6, n),
+    })
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Segmentation fit time and peak memory as the dealer count grows.")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="Comma-separated dealer counts")
+    parser.add_argument("--k", type=int, default=settings.SEGMENT_N_CLUSTERS)
+    parser.add_argument("--sweep", action="store_true", help="Also time the parallel k sweep")
+    args = parser.parse_args()
+
+    rows = []
+    for n in [int(s) for s in args.sizes.split(",")]:
+        df = synthetic_features(n)
+        segmentor = DealerSegmentation()
+        seconds, peak_mb = measure(lambda: segmentor.fit(df, args.k))
+        row = {"dealers": n, "minibatch_s": round(seconds, 3), "minibatch_peak_mb": round(peak_mb, 1)}
+
+        X = segmentor.scaler.transform(transform_features(df))
+        seconds, peak_mb = measure(lambda: KMeans(n_clusters=args.k, n_init=3, random_state=42).fit(X))
+        row.update({"kmeans_s": round(seconds, 3), "kmeans_peak_mb": round(peak_mb, 1)})
+
+        if args.sweep:
+            start = time.perf_counter()
+            _, best = segmentor.choose_k(df)
+            row.update({"sweep_s": round(time.perf_counter() - start, 3), "best_k": best})
+        rows.append(row)
+        logger.info(row)
+
+    report = pd.DataFrame(rows)
+    print(f"Features: {', '.join(FEATURE_COLUMNS)}")
+    print(report.to_string(index=False))
+
+    output_path = os.path.join(settings.LOGS_DIR, f"segmentation_benchmark_{datetime.utcnow():%Y%m%dT%H%M%S}.csv")
+    report.to_csv(output_path, index=False)
+    logger.info(f"Benchmark report saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import sys
+import os
+import argparse
+import logging
+from datetime import datetime
+
+import numpy as np
+import faiss
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from ml_services.vector_index import INDEX_FILE, reconstruct_vectors, recall_latency_report
+
+settings = get_settings()
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def synthetic_vectors(n, dim, n_clusters=200, seed=42):
+    # Clustered, normalized vectors; uniform noise would make every index look equally bad
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    vectors = centers[rng.integers(0, n_clusters, n)] + rng.normal(scale=0.3, size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency of Flat/IVF/HNSW indexes.")
+    parser.add_argument("--source", choices=["index", "synthetic"], default="index", help="Vectors of the saved RAG index or a synthetic corpus")
+    parser.add_argument("--n", type=int, default=100_000, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=768, help="Synthetic vector dimensions")
+    parser.add_argument("--queries", type=int, default=500, help="Queries to time")
+    parser.add_argument("--k", type=int, default=4, help="Neighbours per query (the retriever default)")
+    args = parser.parse_args()
+
+    if args.source == "index":
+        index_path = os.path.join(settings.DATA_DIR, "faiss_index", INDEX_FILE)
+        if not os.path.exists(index_path):
+            logger.error(f"No index at {index_path}. Run scripts/reindex_docs.py or use --source synthetic.")
+            return
+        vectors = reconstruct_vectors(faiss.read_index(index_path))
+    else:
+        vectors = synthetic_vectors(args.n, args.dim)
+
+    # Queries: perturbed corpus vectors, so each has true near neighbours
+    rng = np.random.default_rng(0)
+    sample = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = sample + rng.normal(scale=0.05 * float(np.std(vectors)), size=sample.shape).astype(np.float32)
+
+    print(f"Corpus: {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    report = recall_latency_report(vectors, queries, k=args.k)
+    print(report.to_string(index=False))
+
+    output_path = os.path.join(settings.LOGS_DIR, f"vector_index_report_{datetime.utcnow():%Y%m%dT%H%M%S}.csv")
+    report.to_csv(output_path, index=False)
+    logger.info(f"Report saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
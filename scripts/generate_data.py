@@ -1,6 +1,12 @@
+import io
+import time
 import random
+import argparse
+import multiprocessing
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from faker import Faker
-from sqlalchemy import create_engine
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timedelta
 import pandas as pd
@@ -13,10 +19,13 @@ import logging
 # Add parent directory to path to import schema
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import get_settings
+from database.engine import get_engine
 from database.schema import Base, Dealer, Employee, Inventory, Transaction, Lead, SizeEnum, RoleEnum, KPISnapshot
+from database.migrations import declared_indexes, migrate
+from database.table_versions import install_version_triggers
 
 settings = get_settings()
-engine = create_engine(settings.DATABASE_URL)
+engine = get_engine()
 Session = sessionmaker(bind=engine)
 session = Session()
 
@@ -200,13 +209,396 @@ def generate_inventory_and_transactions(dealers, employees, years=3):
     session.commit()
     logger.info("Data generation complete.")
 
-def init_db():
+# --- Bulk mode ---
+# Same distributions as the ORM generator above, sampled column-wise with NumPy and
+# streamed into Postgres with COPY in bounded chunks, so memory stays flat at any volume.
+
+BRANDS = ["Volkswagen", "BMW", "Mercedes-Benz", "Audi", "Ford", "Opel", "Skoda"]
+CHANNELS = np.array(["auction", "direct", "wholesale"])
+LEAD_SOURCES = np.array(["website", "referral", "email"])
+REGIONS = np.array(["North", "South", "East", "West"])
+N_SALES_REPS = 5
+
+# get_seasonality_factor's bands: uniform(low, high) by calendar month
+SEASONALITY_LOW = np.array([0.9, 0.9, 1.1, 1.1, 1.1, 0.9, 0.9, 0.7, 1.1, 1.1, 0.9, 0.7])
+SEASONALITY_HIGH = SEASONALITY_LOW + 0.2
+
+# Columns written per table, in COPY order
+BULK_COLUMNS = {
+    "dealers": ["dealer_id", "name", "country", "city", "size", "brands", "avg_monthly_volume", "churn_risk_score", "joined_date"],
+    "employees": ["rep_id", "name", "role", "region", "quota", "start_date"],
+    "inventory": ["car_id", "dealer_id", "make", "model", "year", "acquisition_price", "condition_score",
+                  "location", "ingredients_date", "days_in_stock", "status"],
+    "transactions": ["transaction_id", "date", "dealer_id", "car_id", "sale_price", "margin", "channel"],
+    "leads": ["lead_id", "created_at", "dealer_id", "source", "inquiry_text", "response_time_minutes",
+              "assigned_rep_id", "converted", "conversion_date", "conversion_probability"],
+}
+
+DAY = np.timedelta64(1, "D")
+
+def build_vocabularies(seed=None, size=2000):
+    """
+    Faker output drawn once up front; rows then index into these pools instead of
+    calling Faker per row.
+    """
+    vocab_fake = Faker('de_DE')
+    if seed is not None:
+        vocab_fake.seed_instance(seed)
+    return {
+        "companies": np.array([vocab_fake.company() for _ in range(size)], dtype=object),
+        "cities": np.array([vocab_fake.city() for _ in range(size // 4)], dtype=object),
+        "models": np.array([vocab_fake.word().capitalize() for _ in range(size // 4)], dtype=object),
+        "sentences": np.array([vocab_fake.sentence() for _ in range(size)], dtype=object),
+        "names": np.array([vocab_fake.name() for _ in range(size // 4)], dtype=object),
+    }
+
+def random_datetimes(rng, start, end, n):
+    """
+    n timestamps uniform in [start, end] at second resolution.
+    """
+    start = np.datetime64(start, "s")
+    span = int((np.datetime64(end, "s") - start) / np.timedelta64(1, "s"))
+    return start + rng.integers(0, span + 1, n).astype("timedelta64[s]")
+
+def sample_dealers(n, rng, vocab, now):
+    members = list(SizeEnum)
+    sizes = [members[i] for i in rng.integers(0, len(members), n)]
+    is_large = np.array([size == SizeEnum.LARGE for size in sizes])
+    n_brands = rng.integers(1, 4, n)
+    return pd.DataFrame({
+        "dealer_id": np.arange(1, n + 1),
+        "name": rng.choice(vocab["companies"], n),
+        "country": "Germany",
+        "city": rng.choice(vocab["cities"], n),
+        # SQLAlchemy's Enum stores member names
+        "size": [size.name for size in sizes],
+        "brands": [",".join(rng.choice(BRANDS, k, replace=False)) for k in n_brands],
+        "avg_monthly_volume": np.where(is_large, rng.integers(20, 151, n), rng.integers(5, 41, n)),
+        "churn_risk_score": rng.random(n),
+        "joined_date": random_datetimes(rng, now - timedelta(days=5 * 365), now - timedelta(days=2 * 365), n),
+    })
+
+def sample_employees(rng, vocab, now):
+    n = N_SALES_REPS
+    return pd.DataFrame({
+        "rep_id": np.arange(1, n + 1),
+        "name": rng.choice(vocab["names"], n),
+        "role": RoleEnum.SALES_REP.name,
+        "region": rng.choice(REGIONS, n),
+        "quota": rng.integers(500000, 1000001, n).astype(float),
+        "start_date": random_datetimes(rng, now - timedelta(days=4 * 365), now - timedelta(days=365), n),
+    })
+
+def monthly_targets(dealer, rng, start_date, end_date, scale):
+    """
+    Month start dates (30-day steps) and cars acquired in each, with seasonality and churn decay.
+    """
+    month_starts = pd.date_range(start_date, end_date, freq="30D", inclusive="left")
+    month = month_starts.month.to_numpy()
+    seasonality = rng.uniform(SEASONALITY_LOW[month - 1], SEASONALITY_HIGH[month - 1])
+    volume_trend = -0.5 if dealer.churn_risk_score > 0.7 else 0.1
+    months_passed = (month_starts.year.to_numpy() - start_date.year) * 12 + (month - start_date.month)
+    churn_factor = np.maximum(0.2, 1 + volume_trend * months_passed / 36)
+    targets = (dealer.avg_monthly_volume * scale * seasonality * churn_factor).astype(np.int64)
+    return month_starts.to_numpy().astype("datetime64[s]"), targets
+
+def sample_cars(dealer, rng, vocab, month_starts, end_date, ids):
+    """
+    Inventory rows for the given month start per car, plus the transactions of those sold.
+    """
+    n = len(month_starts)
+    acquired = month_starts + rng.integers(0, 28 * 86400 + 1, n).astype("timedelta64[s]")
+    acquired = acquired[acquired <= np.datetime64(end_date, "s")]
+    n = len(acquired)
+    car_ids = ids["car_id"] + np.arange(n)
+    ids["car_id"] += n
+
+    acquisition_price = rng.integers(10000, 50001, n).astype(float)
+    days_in_stock = rng.integers(1, 181, n)
+    selling_probability = 0.4 if dealer.churn_risk_score > 0.8 else 0.8
+    days_held = rng.integers(1, days_in_stock + 1)
+    sale_date = acquired + days_held * DAY
+    sold = (rng.random(n) < selling_probability) & (sale_date <= np.datetime64(end_date, "s"))
+
+    cars = pd.DataFrame({
+        "car_id": car_ids,
+        "dealer_id": dealer.dealer_id,
+        "make": rng.choice(dealer.brands.split(","), n),
+        "model": rng.choice(vocab["models"], n),
+        "year": rng.integers(2018, 2025, n),
+        "acquisition_price": acquisition_price,
+        "condition_score": rng.integers(1, 11, n),
+        "location": dealer.city,
+        "ingredients_date": acquired,
+        "days_in_stock": days_in_stock,
+        "status": np.where(sold, "sold", "available"),
+    })
+
+    m = int(sold.sum())
+    # Older cars (>90 days) get a smaller margin
+    margin_pct = rng.uniform(0.05, 0.15, m) * np.where(days_held[sold] > 90, 0.95, 1.0)
+    sale_price = acquisition_price[sold] * (1 + margin_pct)
+    transactions = pd.DataFrame({
+        "transaction_id": ids["transaction_id"] + np.arange(m),
+        "date": sale_date[sold],
+        "dealer_id": dealer.dealer_id,
+        "car_id": car_ids[sold],
+        "sale_price": sale_price,
+        "margin": sale_price - acquisition_price[sold],
+        "channel": rng.choice(CHANNELS, m),
+    })
+    ids["transaction_id"] += m
+    return cars, transactions
+
+def sample_leads(dealer, rng, vocab, n, start_date, end_date, rep_ids, ids):
+    created_at = random_datetimes(rng, start_date, end_date, n)
+    conversion_probability = rng.uniform(0.1, 0.9, n)
+    converted = conversion_probability > 0.6
+    conversion_date = np.where(
+        converted, created_at + rng.integers(1, 21, n) * DAY, np.datetime64("NaT", "s")
+    )
+    leads = pd.DataFrame({
+        "lead_id": ids["lead_id"] + np.arange(n),
+        "created_at": created_at,
+        "dealer_id": dealer.dealer_id,
+        "source": rng.choice(LEAD_SOURCES, n),
+        "inquiry_text": rng.choice(vocab["sentences"], n),
+        "response_time_minutes": rng.integers(5, 121, n).astype(float),
+        "assigned_rep_id": rng.choice(rep_ids, n),
+        "converted": converted,
+        "conversion_date": conversion_date,
+        "conversion_probability": conversion_probability,
+    })
+    ids["lead_id"] += n
+    return leads
+
+def lead_count(dealer, years, scale):
+    # Leads correlated with volume (~50% conversion)
+    return int(dealer.avg_monthly_volume * 12 * years * 0.5 * scale)
+
+def dealer_chunks(dealer, rng, vocab, start_date, end_date, years, scale, rep_ids, ids, chunk_rows):
+    """
+    Yields (table, DataFrame) chunks of about chunk_rows rows for one dealer, cars before
+    the transactions that reference them.
+    """
+    month_starts, targets = monthly_targets(dealer, rng, start_date, end_date, scale)
+    # Whole months per chunk; a single month larger than chunk_rows forms its own chunk
+    group = np.cumsum(targets) // max(chunk_rows, 1)
+    for g in np.unique(group):
+        months = group == g
+        cars, transactions = sample_cars(dealer, rng, vocab, np.repeat(month_starts[months], targets[months]), end_date, ids)
+        yield "inventory", cars
+        yield "transactions", transactions
+
+    total_leads = lead_count(dealer, years, scale)
+    for offset in range(0, total_leads, chunk_rows):
+        n = min(chunk_rows, total_leads - offset)
+        yield "leads", sample_leads(dealer, rng, vocab, n, start_date, end_date, rep_ids, ids)
+
+class CopyWriter:
+    """
+    Streams DataFrames into Postgres with COPY ... FROM STDIN (CSV), committing per chunk.
+    """
+    def __init__(self, engine):
+        self.connection = engine.raw_connection()
+        self.rows = {}
+        self.seconds = 0.0
+
+    def write(self, table, df):
+        if df.empty:
+            return
+        start = time.perf_counter()
+        buffer = io.StringIO()
+        # Empty unquoted fields (NaN/NaT) load as NULL
+        df[BULK_COLUMNS[table]].to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S")
+        buffer.seek(0)
+        cursor = self.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table} ({', '.join(BULK_COLUMNS[table])}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+        self.connection.commit()
+        self.rows[table] = self.rows.get(table, 0) + len(df)
+        self.seconds += time.perf_counter() - start
+
+    def reset_sequences(self):
+        # Ids were assigned client-side; move the serial sequences past them
+        cursor = self.connection.cursor()
+        try:
+            for table, columns in BULK_COLUMNS.items():
+                key = columns[0]
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', '{key}'), COALESCE(MAX({key}), 0) + 1, false) FROM {table}"
+                )
+        finally:
+            cursor.close()
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+def shard_seeds(seed, n_dealers):
+    """
+    Root SeedSequence and its spawned children: the first for the dealer and employee
+    tables, then one per dealer. A child depends only on the root entropy and its
+    index, so the data is the same for any number of workers.
+    """
+    root = np.random.SeedSequence(seed)
+    return root, root.spawn(n_dealers + 1)
+
+def allocate_ids(dealers, seeds, start_date, end_date, years, scale):
+    """
+    First ids of each dealer's block. A dealer never has more cars than the sum of its
+    monthly targets (replayed from its own seed), and transactions never outnumber cars,
+    so the two share one block; lead counts are exact. Unused ids leave gaps.
+    """
+    blocks, next_car, next_lead = [], 1, 1
+    for dealer, seq in zip(dealers, seeds):
+        _, targets = monthly_targets(dealer, np.random.default_rng(seq), start_date, end_date, scale)
+        blocks.append({"car_id": next_car, "transaction_id": next_car, "lead_id": next_lead})
+        next_car += int(targets.sum())
+        next_lead += lead_count(dealer, years, scale)
+    return blocks
+
+# Set once per worker process by init_shard_worker
+shard_context = {}
+
+def init_shard_worker(context):
+    shard_context.update(context)
+
+def generate_shard(dealer, seq, ids):
+    """
+    Samples and COPYs one dealer's cars, transactions and leads on this process's own
+    connection. Returns (rows per table, seconds in COPY).
+    """
+    ctx = shard_context
+    rng = np.random.default_rng(seq)
+    writer = CopyWriter(engine)
+    try:
+        for table, df in dealer_chunks(
+            dealer, rng, ctx["vocab"], ctx["start_date"], ctx["end_date"], ctx["years"],
+            ctx["scale"], ctx["rep_ids"], ids, ctx["chunk_rows"]
+        ):
+            writer.write(table, df)
+    finally:
+        writer.close()
+    return writer.rows, writer.seconds
+
+def generate_bulk(n_dealers=20, years=3, scale=1.0, chunk_rows=100_000, seed=None, workers=None, end_date=None):
+    """
+    Bulk-loads dealers, employees, inventory, transactions and leads, sharded by dealer
+    across a process pool, and returns per-table row counts with the overall throughput.
+    All dates are derived from end_date (default: today at midnight), so the output is
+    fully determined by seed and end_date.
+    """
+    workers = workers or os.cpu_count() or 1
+    end_date = end_date or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    root, seeds = shard_seeds(seed, n_dealers)
+    logger.info(f"Seed {root.entropy}, end date {end_date:%Y-%m-%d} (pass --seed and --end-date to reproduce), {workers} worker(s)")
+    rng = np.random.default_rng(seeds[0])
+    vocab = build_vocabularies(root.entropy)
+    start_date = end_date - timedelta(days=365 * years)
+
+    dealers = sample_dealers(n_dealers, rng, vocab, end_date)
+    employees = sample_employees(rng, vocab, end_date)
+    shards = [SimpleNamespace(**record) for record in dealers.to_dict("records")]
+    id_blocks = allocate_ids(shards, seeds[1:], start_date, end_date, years, scale)
+    context = {
+        "vocab": vocab, "start_date": start_date, "end_date": end_date, "years": years,
+        "scale": scale, "rep_ids": employees["rep_id"].to_numpy(), "chunk_rows": chunk_rows,
+    }
+
+    writer = CopyWriter(engine)
+    rows, copy_seconds = {}, 0.0
+    start = time.perf_counter()
+
+    def collect(i, result):
+        nonlocal copy_seconds
+        shard_rows, shard_seconds = result
+        for table, n in shard_rows.items():
+            rows[table] = rows.get(table, 0) + n
+        copy_seconds += shard_seconds
+        if i % max(1, n_dealers // 10) == 0 or i == n_dealers:
+            total = sum(rows.values())
+            logger.info(f"{i}/{n_dealers} dealers, {total:,} rows, {total / (time.perf_counter() - start):,.0f} rows/s")
+
+    try:
+        writer.write("dealers", dealers)
+        writer.write("employees", employees)
+        if workers == 1:
+            init_shard_worker(context)
+            for i, args in enumerate(zip(shards, seeds[1:], id_blocks), start=1):
+                collect(i, generate_shard(*args))
+        else:
+            # spawn: workers open their own connections instead of inheriting the parent's pool
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_shard_worker, initargs=(context,)
+            ) as executor:
+                futures = [executor.submit(generate_shard, *args) for args in zip(shards, seeds[1:], id_blocks)]
+                for i, future in enumerate(as_completed(futures), start=1):
+                    collect(i, future.result())
+        writer.reset_sequences()
+    finally:
+        writer.close()
+
+    for table, df in (("dealers", dealers), ("employees", employees)):
+        rows[table] = len(df)
+    copy_seconds += writer.seconds
+    elapsed = time.perf_counter() - start
+    total = sum(rows.values())
+    report = {
+        "rows": rows,
+        "total_rows": total,
+        "workers": workers,
+        "seed": root.entropy,
+        "seconds": round(elapsed, 2),
+        "copy_seconds": round(copy_seconds, 2),
+        "rows_per_second": round(total / elapsed) if elapsed else None,
+    }
+    logger.info(
+        f"Loaded {total:,} rows in {elapsed:.1f}s with {workers} worker(s) ({report['rows_per_second']:,} rows/s; "
+        f"{copy_seconds:.1f}s in COPY across workers): {rows}"
+    )
+    return report
+
+def init_db(with_indexes=True):
     Base.metadata.drop_all(engine) # Reset DB for clean generation
     Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        install_version_triggers(conn)
+    if not with_indexes:
+        # Loading into unindexed tables and building the indexes once afterwards is much faster
+        with engine.begin() as conn:
+            for index in declared_indexes():
+                conn.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
     logger.info("Database tables recreated.")
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Reset the database and fill it with synthetic dealer data.")
+    parser.add_argument("--bulk", action="store_true", help="Vectorized sampling streamed in with COPY (for large volumes)")
+    parser.add_argument("--dealers", type=int, default=20)
+    parser.add_argument("--years", type=int, default=3, help="Years of history")
+    parser.add_argument("--scale", type=float, default=1.0, help="Bulk mode: multiplier on per-dealer car and lead volume")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Bulk mode: rows per COPY chunk")
+    parser.add_argument("--seed", type=int, default=None, help="Bulk mode: random seed; output is identical for any --workers")
+    parser.add_argument("--workers", type=int, default=None, help="Bulk mode: generator processes (default: CPU count)")
+    parser.add_argument("--end-date", type=datetime.fromisoformat, default=None,
+                        help="Bulk mode: last day of history, YYYY-MM-DD (default: today)")
+    args = parser.parse_args()
+
+    if args.bulk:
+        init_db(with_indexes=False)
+        generate_bulk(args.dealers, args.years, args.scale, args.chunk_rows, args.seed, args.workers, args.end_date)
+        start = time.perf_counter()
+        migrate(engine, concurrently=False)
+        logger.info(f"Indexes built in {time.perf_counter() - start:.1f}s")
+        return
+
     init_db()
-    dealers = generate_dealers()
+    dealers = generate_dealers(args.dealers)
     employees = generate_employees(dealers)
-    generate_inventory_and_transactions(dealers, employees)
+    generate_inventory_and_transactions(dealers, employees, years=args.years)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import sys
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+
+settings = get_settings()
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Mixed traffic: (name, weight, request builder)
+TRAFFIC = [
+    ("score_lead", 60, lambda rng: ("POST", "/score_lead", {"source": rng.choice(["website", "referral", "email"]), "response_time_minutes": rng.randint(0, 120)})),
+    ("forecast", 25, lambda rng: ("GET", f"/forecast/{rng.randint(1, 20)}", None)),
+    ("segments", 10, lambda rng: ("GET", "/segments", None)),
+    ("agent_query", 5, lambda rng: ("POST", "/agent/query", {"question": rng.choice(["What is the return policy?", "How many dealers do we have?"])})),
+]
+
+async def worker(client, deadline, rng, samples):
+    names = [name for name, _, _ in TRAFFIC]
+    weights = [weight for _, weight, _ in TRAFFIC]
+    builders = {name: builder for name, _, builder in TRAFFIC}
+    
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, body = builders[name](rng)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        samples[name].append((time.perf_counter() - start, ok))
+
+def summarize(samples, elapsed):
+    report = {}
+    all_latencies = []
+    for name, rows in sorted(samples.items()):
+        latencies = np.array([latency for latency, _ in rows])
+        all_latencies.extend(latencies.tolist())
+        report[name] = {
+            "requests": len(rows),
+            "errors": sum(1 for _, ok in rows if not ok),
+            "rps": round(len(rows) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+            "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 1),
+        }
+    if all_latencies:
+        report["total"] = {
+            "requests": len(all_latencies),
+            "errors": sum(r["errors"] for r in report.values()),
+            "rps": round(len(all_latencies) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(all_latencies, 50)) * 1000, 1),
+            "p99_ms": round(float(np.percentile(all_latencies, 99)) * 1000, 1),
+        }
+    return report
+
+def print_report(label, report):
+    print(f"\n[{label}]")
+    print(f"  {'endpoint':<12} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, row in report.items():
+        print(f"  {name:<12} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8} {row['p50_ms']:>9} {row['p99_ms']:>9}")
+
+async def run(base_url, concurrency, duration, seed):
+    samples = defaultdict(list)
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, deadline, random.Random(seed + i), samples) for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+    return summarize(samples, elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-traffic load test for the API.")
+    parser.add_argument("--base-url", default=f"http://{settings.API_SERVER}:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60, help="Seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="run", help="Name for the saved report, e.g. before/after")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Print two saved reports side by side")
+    args = parser.parse_args()
+    
+    if args.compare:
+        for path in args.compare:
+            with open(path) as f:
+                print_report(os.path.basename(path), json.load(f))
+        return
+    
+    logger.info(f"Load testing {args.base_url} with {args.concurrency} clients for {args.duration}s...")
+    report = asyncio.run(run(args.base_url, args.concurrency, args.duration, args.seed))
+    print_report(args.label, report)
+    
+    output_path = os.path.join(settings.LOGS_DIR, f"load_test_{args.label}.json")
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Report saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
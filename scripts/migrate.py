@@ -0,0 +1,33 @@
+import sys
+import os
+import argparse
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.migrations import migrate
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply tables and indexes declared in database/schema.py to an existing database.")
+    parser.add_argument("--dry-run", action="store_true", help="Print what would be created without changing anything")
+    parser.add_argument("--no-concurrently", action="store_true", help="Plain CREATE INDEX (faster, but blocks writes while building)")
+    args = parser.parse_args()
+    
+    report = migrate(concurrently=not args.no_concurrently, dry_run=args.dry_run)
+    if not report:
+        logger.info("Database is up to date.")
+        return
+    
+    for entry in report:
+        if args.dry_run:
+            print(entry.get("sql") or f"CREATE TABLE {entry['name']}")
+        else:
+            seconds = f" ({entry['seconds']}s)" if entry["seconds"] is not None else ""
+            print(f"{entry['action']}: {entry['name']}{seconds}")
+
+if __name__ == "__main__":
+    main()
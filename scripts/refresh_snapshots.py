@@ -0,0 +1,26 @@
+import sys
+import os
+import argparse
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.snapshots import SNAPSHOT_TABLES, get_snapshot_store
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the local Arrow snapshots that training reads with Postgres.")
+    parser.add_argument("--tables", default=",".join(SNAPSHOT_TABLES), help="Comma-separated table names")
+    parser.add_argument("--full", action="store_true", help="Rewrite snapshots instead of appending new rows")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Rows per fetch and per Arrow record batch")
+    args = parser.parse_args()
+    
+    reports = get_snapshot_store().refresh(args.tables.split(","), full=args.full, chunk_rows=args.chunk_rows)
+    total = sum(report["rows"] for report in reports)
+    logger.info(f"Snapshot refresh complete: {total:,} rows written")
+
+if __name__ == "__main__":
+    main()
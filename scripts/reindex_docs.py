@@ -0,0 +1,29 @@
+import sys
+import os
+import argparse
+import json
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_services.rag_agent import InternalSalesAgent
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the RAG FAISS index with data/docs.")
+    parser.add_argument("--force", action="store_true", help="Rebuild the whole index (embeddings still come from the cache)")
+    args = parser.parse_args()
+    
+    agent = InternalSalesAgent(ingest=False)
+    report = agent.reindex(force=args.force)
+    if report is None:
+        logger.warning("No docs directory found, nothing to index.")
+        return
+    
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import sys
+import os
+import argparse
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from ml_services.forecasting import run_batch_forecast
+
+settings = get_settings()
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute 30-day forecasts for every dealer.")
+    parser.add_argument("--dealers", type=int, nargs="*", help="Only forecast these dealer ids")
+    parser.add_argument("--mode", choices=["global", "per_dealer"], default=settings.FORECAST_MODE,
+                        help="One global model over all dealers, or one model per dealer")
+    parser.add_argument("--strategy", choices=["recursive", "direct", "static"], default=settings.FORECAST_STRATEGY,
+                        help="Multi-step strategy; direct is only available in global mode")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only refresh dealers with new transactions since the last run")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="Per-dealer mode: continue saved boosters on the new days instead of refitting")
+    args = parser.parse_args()
+    
+    logger.info(f"Starting batch forecasting job ({args.mode}/{args.strategy})...")
+    manifest = run_batch_forecast(
+        dealer_ids=args.dealers or None,
+        mode=args.mode,
+        strategy=args.strategy,
+        incremental=args.incremental,
+        warm_start=args.warm_start
+    )
+    logger.info(f"Run {manifest['run_id']}: {manifest['summary']}, {manifest['rows_written']} rows written in {manifest['elapsed_seconds']}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import sys
+import os
+import argparse
+import logging
+from datetime import date
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_services.kpi_snapshots import run_kpi_snapshots
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute daily KPI snapshots per dealer for the days not yet stored.")
+    parser.add_argument("--full", action="store_true", help="Delete all snapshots and recompute from the start of the data")
+    parser.add_argument("--through", type=date.fromisoformat, help="Last day to compute (default: yesterday)")
+    args = parser.parse_args()
+    
+    report = run_kpi_snapshots(full=args.full, through=args.through)
+    logger.info(f"KPI job: {report['rows']} snapshots for {report['start']}..{report['through']} in {report['seconds']}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,23 @@
 import sys
 import os
-import pickle
+import time
+import argparse
+import resource
 import logging
 import pandas as pd
-from sqlalchemy import create_engine
+import sklearn
+from datetime import datetime
+from sqlalchemy import text
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import get_settings
-from ml_services.forecasting import train_forecast_model
-from ml_services.lead_scoring import LeadScorer
-from ml_services.segmentation import DealerSegmentation
+from ml_services.lead_scoring import LeadScorer, FEATURE_COLUMNS as LEAD_FEATURES
+from ml_services.segmentation import DealerSegmentation, FEATURE_COLUMNS as SEGMENT_FEATURES, LOG_COLUMNS
+from ml_services.model_registry import ModelRegistry
+from database.engine import get_engine
+from database.schema import Base
+from database.snapshots import get_snapshot_store, primary_key, use_snapshot
 
 settings = get_settings()
 
@@ -18,41 +25,77 @@ settings = get_settings()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def train_and_save_lead_scorer():
+def training_watermark(tables, snapshot=None):
+    """
+    Primary-key watermark and row count of each table the model was trained on,
+    from the snapshot manifest or read from Postgres right after training.
+    """
+    watermark = {}
+    manifest = get_snapshot_store().load_manifest()
+    for table_name in tables:
+        if use_snapshot(table_name, snapshot):
+            entry = manifest[table_name]
+            watermark[table_name] = {"source": "snapshot", "max_id": entry["watermark"], "rows": entry["rows"],
+                                     "as_of": entry["refreshed_at"]}
+            continue
+        key = primary_key(Base.metadata.tables[table_name])
+        with get_engine().connect() as conn:
+            max_id, rows = conn.execute(text(f"SELECT MAX({key}), COUNT(*) FROM {table_name}")).one()
+        watermark[table_name] = {"source": "postgres", "max_id": max_id, "rows": rows,
+                                 "as_of": datetime.utcnow().isoformat()}
+    return watermark
+
+def train_and_save_lead_scorer(snapshot=None):
     logger.info("Training Lead Scorer...")
     scorer = LeadScorer()
     try:
-        accuracy = scorer.train()
-        model_path = os.path.join(settings.MODELS_DIR, "lead_scorer.pkl")
-        
-        with open(model_path, 'wb') as f:
-            pickle.dump((scorer.model, scorer.encoder), f)
-            
-        logger.info(f"Lead Scorer saved to {model_path} (Accuracy: {accuracy})")
+        accuracy = scorer.train(snapshot)
+        if not hasattr(scorer.model, 'estimators_'):
+            return
+        # The compiled forest and lookup table were verified in train(), so serving loads them as is
+        version = ModelRegistry().publish(
+            "lead_scorer",
+            {"model": scorer.model, "encoder": scorer.encoder, "compiled": scorer.compiled, "lookup": scorer.lookup},
+            {
+                "metrics": {"accuracy": float(accuracy)},
+                "feature_schema": {"columns": LEAD_FEATURES, "sources": [str(source) for source in scorer.encoder.classes_]},
+                "training_data": training_watermark(["leads"], snapshot),
+                "sklearn_version": sklearn.__version__,
+            },
+        )
+        logger.info(f"Lead Scorer {version} registered (Accuracy: {accuracy})")
     except Exception as e:
         logger.error(f"Failed to train Lead Scorer: {e}")
 
-def train_and_save_segmentation():
+def train_and_save_segmentation(snapshot=None, n_clusters=None):
     logger.info("Training Dealer Segmentation...")
     segmentor = DealerSegmentation()
     try:
-        # For segmentation, "training" is fitting the KMeans. 
-        # In this POC, the run_segmentation method fits and predicts.
-        # We will modify it to return the fitted model if needed, or just save the Cluster Centers.
-        # For now, we'll save the fitted KMeans object if possible, but the current class structure
-        # might need adjustment. Let's instantiated and fit.
-        
-        df = segmentor.get_dealer_data()
+        df = segmentor.get_dealer_data(snapshot)
         if not df.empty:
-            X = df[['avg_monthly_volume', 'churn_risk_score']]
-            X_scaled = segmentor.scaler.fit_transform(X)
-            segmentor.kmeans.fit(X_scaled)
+            report = None
+            if not n_clusters:
+                report, n_clusters = segmentor.choose_k(df)
+                if report is not None:
+                    logger.info(f"k sweep (best k={n_clusters} by silhouette):\n{report.to_string(index=False)}")
+            segmentor.fit(df, n_clusters)
             
-            model_path = os.path.join(settings.MODELS_DIR, "segmentation.pkl")
-            with open(model_path, 'wb') as f:
-                pickle.dump((segmentor.kmeans, segmentor.scaler), f)
-                
-            logger.info(f"Segmentation model saved to {model_path}")
+            metrics = {"k": int(segmentor.kmeans.n_clusters), "inertia": float(segmentor.kmeans.inertia_), "dealers": len(df)}
+            if report is not None:
+                metrics["silhouette"] = float(report.loc[report["k"] == n_clusters, "silhouette"].iloc[0])
+                metrics["k_sweep"] = report.to_dict(orient="records")
+            version = ModelRegistry().publish(
+                "segmentation",
+                {"kmeans": segmentor.kmeans, "scaler": segmentor.scaler},
+                {
+                    "metrics": metrics,
+                    "feature_schema": {"columns": SEGMENT_FEATURES, "log_columns": LOG_COLUMNS,
+                                       "window_days": settings.SEGMENT_WINDOW_DAYS},
+                    "training_data": training_watermark(segmentor.source_tables, snapshot),
+                    "sklearn_version": sklearn.__version__,
+                },
+            )
+            logger.info(f"Segmentation model {version} registered")
         else:
             logger.warning("No dealer data for segmentation training.")
             
@@ -62,11 +105,32 @@ def train_and_save_segmentation():
 # Note: Forecasting is per-dealer and usually on-demand or batch. 
 # We don't save a single global model for forecasting in this architecture.
 
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def timed(name, fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    logger.info(f"{name}: {time.perf_counter() - start:.2f}s wall, peak RSS so far {peak_rss_mb():.0f} MB")
+
 def main():
+    parser = argparse.ArgumentParser(description="Train and persist the lead scoring and segmentation models.")
+    parser.add_argument("--source", choices=["snapshot", "postgres"], default=None,
+                        help="Training data source (default: TRAINING_SNAPSHOTS)")
+    parser.add_argument("--refresh-snapshots", action="store_true",
+                        help="Refresh the snapshots first; without it, training reads them as of the last refresh")
+    parser.add_argument("--segment-clusters", type=int, default=0, help="Segmentation k (0 = pick by silhouette sweep)")
+    args = parser.parse_args()
+    snapshot = None if args.source is None else args.source == "snapshot"
+    
     logger.info("Starting Model Training Pipeline...")
-    train_and_save_lead_scorer()
-    train_and_save_segmentation()
-    logger.info("Model Training Complete.")
+    start = time.perf_counter()
+    if args.refresh_snapshots:
+        timed("Snapshot refresh", get_snapshot_store().refresh)
+    timed("Lead Scorer", train_and_save_lead_scorer, snapshot)
+    timed("Segmentation", train_and_save_segmentation, snapshot, args.segment_clusters)
+    logger.info(f"Model Training Complete in {time.perf_counter() - start:.2f}s (peak RSS {peak_rss_mb():.0f} MB).")
 
 if __name__ == "__main__":
     main()
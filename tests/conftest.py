@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# Settings are read once per process, so set them before anything imports config.
+# Tests never reach OpenAI or Postgres; model files go to a scratch directory.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("MODELS_DIR", tempfile.mkdtemp(prefix="models-"))
+os.environ.setdefault("LOGS_DIR", tempfile.mkdtemp(prefix="logs-"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,116 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from ml_services import answer_cache as answer_cache_module
+from ml_services.answer_cache import AnswerCache, normalize_question
+
+TTLS = {"sql": 300, "rag": 86400}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(answer_cache_module.time, "monotonic", clock)
+    return clock
+
+class CountingEmbedder:
+    """Same vector for questions sharing a topic word, orthogonal otherwise."""
+    topics = ["revenue", "leads", "inventory"]
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, question):
+        self.calls += 1
+        return [float(topic in question.lower()) for topic in self.topics] + [0.1]
+
+def test_normalize_question():
+    assert normalize_question("  What's the REVENUE, this month?? ") == "what s the revenue this month"
+
+def test_exact_hit_after_put(clock):
+    cache = AnswerCache(max_size=10, ttl_by_route=TTLS)
+    assert cache.get("Top dealers?") is None
+    cache.put("Top dealers?", "Dealer 1", "sql", 1.5)
+    assert cache.get("top dealers") == "Dealer 1"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["saved_seconds"]) == (1, 1, 1.5)
+
+def test_entries_expire_per_route(clock):
+    cache = AnswerCache(max_size=10, ttl_by_route=TTLS)
+    cache.put("sql question", "a", "sql", 0.1)
+    cache.put("rag question", "b", "rag", 0.1)
+    clock.now += 301
+    assert cache.get("sql question") is None
+    assert cache.get("rag question") == "b"
+
+def test_routes_without_ttl_are_not_cached(clock):
+    cache = AnswerCache(max_size=10, ttl_by_route=TTLS)
+    cache.put("hello", "hi", "general", 0.1)
+    assert cache.get("hello") is None
+
+def test_reingestion_drops_rag_answers_only(clock):
+    cache = AnswerCache(max_size=10, ttl_by_route=TTLS)
+    cache.put("sql question", "a", "sql", 0.1)
+    cache.put("rag question", "b", "rag", 0.1)
+    cache.invalidate_knowledge_base()
+    assert cache.get("rag question") is None
+    assert cache.get("sql question") == "a"
+
+def test_lru_eviction(clock):
+    cache = AnswerCache(max_size=2, ttl_by_route=TTLS)
+    cache.put("one", 1, "sql", 0.1)
+    cache.put("two", 2, "sql", 0.1)
+    cache.get("one")
+    cache.put("three", 3, "sql", 0.1)
+    assert cache.get("two") is None
+    assert cache.get("one") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_semantic_hit_on_similar_question(clock):
+    embedder = CountingEmbedder()
+    cache = AnswerCache(max_size=10, ttl_by_route=TTLS, embed_fn=embedder, similarity_threshold=0.9)
+    cache.put("total revenue last month", "42", "sql", 0.1)
+    assert cache.get("how much revenue did we make last month") == "42"
+    assert cache.get("how many leads came in") is None
+    assert cache.stats()["semantic_hits"] == 1
+
+def test_semantic_miss_embeds_once(clock):
+    embedder = CountingEmbedder()
+    cache = AnswerCache(max_size=10, ttl_by_route=TTLS, embed_fn=embedder)
+    assert cache.get("total revenue") is None
+    cache.put("total revenue", "42", "sql", 0.1)
+    assert embedder.calls == 1
+    # Exact hits don't embed at all
+    assert cache.get("Total revenue?") == "42"
+    assert embedder.calls == 1
+
+def test_async_semantic_miss_embeds_once(clock):
+    embedder = CountingEmbedder()
+
+    async def aembed(question):
+        return embedder(question)
+
+    cache = AnswerCache(max_size=10, ttl_by_route=TTLS, embed_fn=embedder, aembed_fn=aembed)
+
+    async def scenario():
+        assert await cache.aget("total revenue") is None
+        await cache.aput("total revenue", "42", "sql", 0.1)
+        return await cache.aget("total revenue")
+
+    assert asyncio.run(scenario()) == "42"
+    assert embedder.calls == 1
+
+def test_put_without_get_still_embeds(clock):
+    embedder = CountingEmbedder()
+    cache = AnswerCache(max_size=10, ttl_by_route=TTLS, embed_fn=embedder)
+    cache.put("total revenue", "42", "sql", 0.1)
+    assert embedder.calls == 1
+    assert np.isclose(np.linalg.norm(cache._entries["total revenue"]["embedding"]), 1.0)
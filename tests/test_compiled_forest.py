@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from ml_services.compiled_forest import CompiledForest, ProbabilityLookup
+
+N_CODES = 4
+
+@pytest.fixture(scope="module")
+def forest():
+    # Lead-shaped data: (source code, response time in minutes) -> converted
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, N_CODES, 2000)
+    minutes = rng.integers(0, 600, 2000)
+    converted = rng.random(2000) < np.where(minutes < 60, 0.6, 0.2) + 0.05 * codes
+    X = pd.DataFrame({"source_encoded": codes, "response_time_minutes": minutes})
+    return RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, converted)
+
+def grid(low, high):
+    codes, minutes = np.meshgrid(np.arange(N_CODES), np.arange(low, high), indexing="ij")
+    return pd.DataFrame({"source_encoded": codes.reshape(-1), "response_time_minutes": minutes.reshape(-1)})
+
+def test_compiled_matches_predict_proba_bit_for_bit(forest):
+    X = grid(-10, 700)
+    compiled = CompiledForest(forest)
+    assert np.array_equal(compiled.predict_proba(X), forest.predict_proba(X))
+    assert compiled.verify(forest, X)
+
+def test_compiled_matches_on_fractional_values(forest):
+    X = pd.DataFrame({"source_encoded": [0, 1, 2, 3], "response_time_minutes": [0.5, 59.99, 60.01, 599.5]})
+    assert np.array_equal(CompiledForest(forest).predict_proba(X), forest.predict_proba(X))
+
+def test_lookup_matches_predict_proba(forest):
+    compiled = CompiledForest(forest)
+    lookup = ProbabilityLookup(compiled, n_codes=N_CODES)
+    X = grid(-50, 800)
+    expected = forest.predict_proba(X)[:, 1]
+    codes, minutes = X["source_encoded"].to_numpy(), X["response_time_minutes"].to_numpy(dtype=np.float64)
+
+    assert np.array_equal(lookup.predict(codes, minutes), expected)
+    assert lookup.predict_one(2, 45.0) == forest.predict_proba(pd.DataFrame(
+        {"source_encoded": [2], "response_time_minutes": [45.0]}))[0, 1]
+
+def test_lookup_falls_back_for_fractional_values(forest):
+    lookup = ProbabilityLookup(CompiledForest(forest), n_codes=N_CODES)
+    X = pd.DataFrame({"source_encoded": [1, 1, 3], "response_time_minutes": [10.0, 10.5, 1e6 + 0.5]})
+    predicted = lookup.predict(X["source_encoded"].to_numpy(), X["response_time_minutes"].to_numpy())
+    assert np.array_equal(predicted, forest.predict_proba(X)[:, 1])
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_services.forecasting import (
+    FEATURES, STATIC_FEATURES, build_revenue_panel, build_training_matrix, calendar_features,
+    create_features, fit_panel_forecast, fit_series_forecast
+)
+
+def daily_sales(dealer_id, n_days=120, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-01", periods=n_days, freq="D")
+    # Whole amounts and a sale on day one, so the float32 panel is exact and history starts at 0
+    sale_price = rng.integers(0, 50, n_days).astype(np.float64) * 1000
+    sale_price[0] = 25000
+    return pd.DataFrame({"dealer_id": dealer_id, "date": dates, "sale_price": sale_price})
+
+def test_training_matrix_matches_create_features():
+    df = daily_sales(1)
+    _, dates, panel, first_day = build_revenue_panel(df)
+    static = np.zeros((1, len(STATIC_FEATURES)), dtype=np.float32)
+    X, y = build_training_matrix(panel, first_day, calendar_features(dates), static)
+
+    expected = create_features(df).dropna()
+    np.testing.assert_array_equal(X[:, :len(FEATURES)], expected[FEATURES].to_numpy(dtype=np.float32))
+    np.testing.assert_array_equal(y, expected["sale_price"].to_numpy())
+
+@pytest.mark.parametrize("strategy", ["recursive", "static", "direct"])
+def test_panel_forecast_shape(strategy):
+    df = pd.concat([daily_sales(dealer_id, seed=dealer_id) for dealer_id in (1, 2, 3)])
+    _, dates, panel, first_day = build_revenue_panel(df)
+    static = np.ones((len(panel), len(STATIC_FEATURES)), dtype=np.float32)
+    predictions, future_dates, _ = fit_panel_forecast(panel, dates, first_day, static, 14, strategy)
+    assert predictions.shape == (3, 14)
+    assert len(future_dates) == 14
+
+@pytest.mark.parametrize("strategy", ["recursive", "static"])
+def test_series_forecast_shape(strategy):
+    result, _, status = fit_series_forecast(daily_sales(1)[["date", "sale_price"]], 14, strategy)
+    assert status == "Success"
+    assert result.shape == (14, 2)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_services.lead_scoring import LeadScorer, FEATURE_COLUMNS
+
+def training_data(n=1000):
+    rng = np.random.default_rng(0)
+    source = rng.choice(["website", "referral", "aggregation"], n)
+    minutes = rng.integers(0, 300, n).astype(np.float32)
+    converted = rng.random(n) < np.where(minutes < 30, 0.7, 0.2)
+    return pd.DataFrame({"source": pd.Categorical(source), "response_time_minutes": minutes, "converted": converted})
+
+@pytest.fixture
+def scorer(monkeypatch):
+    scorer = LeadScorer()
+    monkeypatch.setattr(scorer, "get_training_data", lambda snapshot=None: training_data())
+    scorer.train()
+    return scorer
+
+def test_predict_batch_without_model_returns_nan():
+    # No registered model and no legacy file in the test MODELS_DIR
+    scorer = LeadScorer()
+    probs = scorer.predict_batch(["website", "referral"], [10, 20])
+    assert not scorer.loaded
+    assert probs.shape == (2,) and np.isnan(probs).all()
+
+def test_predict_batch_matches_sklearn(scorer):
+    sources = ["website", "referral", "aggregation", "website"]
+    minutes = [5.0, 120.0, 299.0, 17.5]
+    X = pd.DataFrame({"source_encoded": scorer.encoder.transform(sources), "response_time_minutes": minutes})[FEATURE_COLUMNS]
+    np.testing.assert_array_equal(scorer.predict_batch(sources, minutes), scorer.model.predict_proba(X)[:, 1])
+
+def test_predict_batch_marks_unscorable_rows(scorer):
+    probs = scorer.predict_batch(["website", "fax", "referral", None], [10, 10, np.nan, 10])
+    assert not np.isnan(probs[0])
+    assert np.isnan(probs[1:]).all()
+
+def test_predict_batch_marks_non_string_sources(scorer):
+    # e.g. {"source": ["a"]} in a bulk request must fail only that row
+    probs = scorer.predict_batch(["website", ["a"], {"name": "website"}, 3], [10, 10, 10, 10])
+    assert not np.isnan(probs[0])
+    assert np.isnan(probs[1:]).all()
+
+def test_predict_batch_empty(scorer):
+    assert len(scorer.predict_batch([], [])) == 0
+
+def test_predict_matches_predict_batch(scorer):
+    assert scorer.predict("referral", 42) == scorer.predict_batch(["referral"], [42])[0]
@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pytest
+from xgboost import XGBRegressor
+
+from ml_services.model_registry import ModelRegistry, HotModel, CURRENT_FILE
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(root=str(tmp_path / "registry"))
+
+def test_load_without_versions(registry):
+    assert registry.current_version("lead_scorer") is None
+    assert registry.load("lead_scorer") == (None, None)
+    assert registry.versions("lead_scorer") == []
+
+def test_publish_promotes_and_loads_memory_mapped(registry):
+    weights = np.arange(1000, dtype=np.float64)
+    version = registry.publish("model", {"weights": weights, "classes": ["a", "b"]}, {"metrics": {"accuracy": 0.9}})
+
+    assert registry.current_version("model") == version
+    artifacts, metadata = registry.load("model")
+    assert isinstance(artifacts["weights"], np.memmap)
+    np.testing.assert_array_equal(artifacts["weights"], weights)
+    assert artifacts["classes"] == ["a", "b"]
+    assert metadata["version"] == version
+    assert metadata["metrics"] == {"accuracy": 0.9}
+
+def test_publish_leaves_no_temporary_directories(registry):
+    registry.publish("model", {"weights": np.zeros(3)})
+    assert [entry for entry in os.listdir(registry.model_dir("model")) if entry.startswith(".")] == []
+    assert not os.path.exists(os.path.join(registry.model_dir("model"), f"{CURRENT_FILE}.tmp"))
+
+def test_failed_publish_is_cleaned_up(registry):
+    class Unpicklable:
+        def __reduce__(self):
+            raise TypeError("not picklable")
+
+    with pytest.raises(TypeError):
+        registry.publish("model", {"bad": Unpicklable()})
+    assert os.listdir(registry.model_dir("model")) == []
+    assert registry.current_version("model") is None
+
+def test_publish_without_promote_keeps_current(registry):
+    first = registry.publish("model", {"weights": np.zeros(3)})
+    second = registry.publish("model", {"weights": np.ones(3)}, promote=False)
+
+    assert registry.current_version("model") == first
+    assert registry.versions("model") == [first, second]
+    artifacts, _ = registry.load("model", second)
+    np.testing.assert_array_equal(artifacts["weights"], np.ones(3))
+
+def test_promote_rolls_back_and_rejects_unknown_versions(registry):
+    first = registry.publish("model", {"weights": np.zeros(3)})
+    registry.publish("model", {"weights": np.ones(3)})
+
+    registry.promote("model", first)
+    assert registry.current_version("model") == first
+    with pytest.raises(ValueError):
+        registry.promote("model", "does-not-exist")
+    assert registry.current_version("model") == first
+
+def test_prune_keeps_newest_and_current(registry):
+    versions = [registry.publish("model", {"weights": np.full(3, i)}, promote=(i == 0)) for i in range(5)]
+
+    registry.prune("model", keep=2)
+    assert registry.versions("model") == [versions[0]] + versions[-2:]
+    assert registry.current_version("model") == versions[0]
+
+def test_xgboost_models_round_trip_as_ubj(registry):
+    X = np.random.default_rng(0).random((50, 3))
+    y = X @ np.array([1.0, 2.0, 3.0])
+    model = XGBRegressor(n_estimators=5, max_depth=2).fit(X, y)
+
+    version = registry.publish("forecast", {"model": model})
+    assert os.path.exists(os.path.join(registry.model_dir("forecast"), version, "model.ubj"))
+    artifacts, metadata = registry.load("forecast")
+    assert metadata["xgboost_artifacts"]["model"]["class"] == "XGBRegressor"
+    np.testing.assert_array_equal(artifacts["model"].predict(X), model.predict(X))
+
+class VersionedModel:
+    def __init__(self, registry):
+        self.model_version = registry.current_version("model") or "legacy"
+
+def test_hot_model_swaps_only_on_new_versions(registry):
+    hot = HotModel("model", lambda: VersionedModel(registry), registry)
+    swapped = []
+    hot.swap_listeners.append(swapped.append)
+
+    legacy = hot.get()
+    assert legacy.model_version == "legacy"
+    # Nothing registered counts as unchanged
+    assert not hot.refresh()
+
+    version = registry.publish("model", {"weights": np.zeros(3)})
+    assert hot.refresh()
+    assert hot.get().model_version == version
+    assert not hot.refresh()
+    assert hot.refresh(force=True)
+    assert [instance.model_version for instance in swapped] == ["legacy", version, version]
+    # Requests that took the old instance keep it
+    assert legacy.model_version == "legacy"
@@ -0,0 +1,117 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from database import snapshots as snapshots_module
+from database.schema import Base
+from database.snapshots import SnapshotStore
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in ("dealers", "transactions", "leads")])
+    return engine
+
+@pytest.fixture
+def store(tmp_path, engine, monkeypatch):
+    """Snapshot store on SQLite; table versions come from a map the tests bump on writes."""
+    versions = {"transactions": 0, "leads": 0}
+    store = SnapshotStore(root=str(tmp_path / "snapshots"))
+    monkeypatch.setattr(store, "table_version", lambda table_name, engine=None: [versions[table_name], "t"])
+    store.versions = versions
+    store.engine = engine
+    return store
+
+def write(store, table_name, sql, params=None):
+    with store.engine.begin() as conn:
+        conn.execute(text(sql), params or {})
+    store.versions[table_name] += 1
+
+def add_leads(store, ids, converted=False):
+    for lead_id in ids:
+        write(store, "leads", "INSERT INTO leads (lead_id, created_at, dealer_id, source, converted) "
+                              "VALUES (:id, :created_at, 1, 'website', :converted)",
+              {"id": lead_id, "created_at": datetime(2024, 1, 1), "converted": converted})
+
+def add_transactions(store, ids):
+    for transaction_id in ids:
+        write(store, "transactions", "INSERT INTO transactions (transaction_id, date, dealer_id, sale_price) "
+                                     "VALUES (:id, :date, 1, 100.0)",
+              {"id": transaction_id, "date": datetime(2024, 1, 1)})
+
+def test_transactions_are_appended(store):
+    add_transactions(store, [1, 2])
+    assert store.refresh_table("transactions", engine=store.engine)["mode"] == "full"
+    add_transactions(store, [3])
+    report = store.refresh_table("transactions", engine=store.engine)
+    assert (report["mode"], report["rows"]) == ("append", 1)
+
+    entry = store.load_manifest()["transactions"]
+    assert (len(entry["parts"]), entry["rows"], entry["watermark"]) == (2, 3, 3)
+    assert store.read("transactions")["transaction_id"].tolist() == [1, 2, 3]
+
+def test_recreated_table_is_rewritten(store):
+    add_transactions(store, [1, 2, 3])
+    store.refresh_table("transactions", engine=store.engine)
+    # drop_all/create_all: the table and its version counter start over
+    write(store, "transactions", "DELETE FROM transactions")
+    store.versions["transactions"] = 0
+    add_transactions(store, [1, 2])
+
+    report = store.refresh_table("transactions", engine=store.engine)
+    assert (report["mode"], report["rows"]) == ("full", 2)
+    assert store.read("transactions")["transaction_id"].tolist() == [1, 2]
+
+def test_truncated_table_is_rewritten(store):
+    add_transactions(store, [1, 2, 3])
+    store.refresh_table("transactions", engine=store.engine)
+    write(store, "transactions", "DELETE FROM transactions")
+    add_transactions(store, [1])
+
+    assert store.refresh_table("transactions", engine=store.engine)["mode"] == "full"
+    assert store.read("transactions")["transaction_id"].tolist() == [1]
+
+def test_deleted_rows_force_a_rewrite(store):
+    add_transactions(store, [1, 2, 3])
+    store.refresh_table("transactions", engine=store.engine)
+    write(store, "transactions", "DELETE FROM transactions WHERE transaction_id = 2")
+    add_transactions(store, [4])
+
+    assert store.refresh_table("transactions", engine=store.engine)["mode"] == "full"
+    assert store.read("transactions")["transaction_id"].tolist() == [1, 3, 4]
+
+def test_leads_updates_are_picked_up(store):
+    add_leads(store, [1, 2])
+    store.refresh_table("leads", engine=store.engine)
+    write(store, "leads", "UPDATE leads SET converted = 1 WHERE lead_id = 1")
+
+    assert store.refresh_table("leads", engine=store.engine)["mode"] == "full"
+    leads = store.read("leads", ["lead_id", "converted"])
+    assert leads["converted"].tolist() == [True, False]
+    assert len(store.load_manifest()["leads"]["parts"]) == 1
+
+def test_unchanged_tables_are_skipped(store):
+    add_leads(store, [1])
+    store.refresh_table("leads", engine=store.engine)
+    assert not store.is_stale("leads")
+    assert store.refresh_table("leads", engine=store.engine)["mode"] == "unchanged"
+
+def test_stale_after_write(store):
+    add_leads(store, [1])
+    assert store.is_stale("leads") # No snapshot yet
+    store.refresh_table("leads", engine=store.engine)
+    add_leads(store, [2])
+    assert store.is_stale("leads")
+
+def test_use_snapshot_warns_when_stale(store, monkeypatch, caplog):
+    monkeypatch.setattr(snapshots_module, "get_snapshot_store", lambda: store)
+    assert not snapshots_module.use_snapshot("leads", True) # Falls back to Postgres without a snapshot
+    add_leads(store, [1])
+    store.refresh_table("leads", engine=store.engine)
+    assert snapshots_module.use_snapshot("leads", True)
+    add_leads(store, [2])
+    assert snapshots_module.use_snapshot("leads", True)
+    assert "behind the database" in caplog.text
+    assert not snapshots_module.use_snapshot("leads", False)
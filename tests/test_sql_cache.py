@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from ml_services import sql_cache as sql_cache_module
+from ml_services.sql_cache import CachedSQLDatabase, normalize_select
+
+@pytest.fixture
+def versions(monkeypatch):
+    """Table versions as the trigger would report them; tests bump them to simulate writes."""
+    current = {"leads": (1, "t0"), "dealers": (1, "t0")}
+    monkeypatch.setattr(
+        sql_cache_module, "read_table_versions",
+        lambda conn, tables: {table: current[table] for table in tables if table in current}
+    )
+    return current
+
+@pytest.fixture
+def db(versions):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE leads (lead_id INTEGER PRIMARY KEY, source TEXT)"))
+        conn.execute(text("CREATE TABLE dealers (dealer_id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("CREATE TABLE notes (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO leads VALUES (1, 'website')"))
+    return CachedSQLDatabase(engine, max_size=2, version_check_seconds=0)
+
+def insert_lead(db, lead_id):
+    with db._engine.begin() as conn:
+        conn.execute(text("INSERT INTO leads VALUES (:id, 'referral')"), {"id": lead_id})
+
+def test_normalize_select():
+    normalized, tables = normalize_select("select COUNT(*) from Leads")
+    assert normalized == normalize_select("SELECT   count(*)\nFROM leads")[0]
+    assert tables == {"leads"}
+    assert normalize_select("WITH x AS (SELECT * FROM leads) SELECT * FROM x")[1] == {"leads"}
+    assert normalize_select("DELETE FROM leads") == (None, None)
+    assert normalize_select("SELECT 1; SELECT 2") == (None, None)
+
+@pytest.mark.parametrize("sql", [
+    "SELECT COUNT(*) FROM leads WHERE created_at >= now() - interval '7 days'",
+    "SELECT COUNT(*) FROM leads WHERE created_at >= CURRENT_DATE - 7",
+    "SELECT * FROM leads WHERE created_at > CURRENT_TIMESTAMP",
+    "SELECT * FROM leads WHERE created_at > LOCALTIMESTAMP",
+    "SELECT * FROM leads WHERE created_at > clock_timestamp()",
+    "SELECT * FROM leads WHERE created_at > 'now'::timestamp",
+    "SELECT * FROM leads ORDER BY random() LIMIT 5",
+    "WITH recent AS (SELECT * FROM leads WHERE created_at > now()) SELECT COUNT(*) FROM recent",
+])
+def test_volatile_queries_are_not_cacheable(sql):
+    assert normalize_select(sql) == (None, None)
+
+def test_repeated_query_is_served_from_cache(db):
+    first = db.run("SELECT COUNT(*) FROM leads")
+    insert_lead(db, 2) # Not visible: the version didn't move
+    assert db.run("select count(*) from leads") == first
+    stats = db.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+def test_version_change_invalidates(db, versions):
+    first = db.run("SELECT COUNT(*) FROM leads")
+    insert_lead(db, 2)
+    versions["leads"] = (2, "t1")
+    assert db.run("SELECT COUNT(*) FROM leads") != first
+    assert db.cache_stats()["misses"] == 2
+
+def test_unrelated_table_change_keeps_entry(db, versions):
+    db.run("SELECT COUNT(*) FROM leads")
+    versions["dealers"] = (2, "t1")
+    db.run("SELECT COUNT(*) FROM leads")
+    assert db.cache_stats()["hits"] == 1
+
+def test_unversioned_tables_are_not_cached(db):
+    db.run("SELECT COUNT(*) FROM notes")
+    db.run("SELECT COUNT(*) FROM notes")
+    stats = db.cache_stats()
+    assert (stats["uncacheable"], stats["hits"], stats["size"]) == (2, 0, 0)
+
+def test_versions_are_rechecked_only_after_the_window(db, versions):
+    db.version_check_seconds = 3600
+    first = db.run("SELECT COUNT(*) FROM leads")
+    insert_lead(db, 2)
+    versions["leads"] = (2, "t1")
+    # Inside the window the cached version is trusted
+    assert db.run("SELECT COUNT(*) FROM leads") == first
+    db.version_check_seconds = 0
+    assert db.run("SELECT COUNT(*) FROM leads") != first
+
+def test_lru_eviction(db):
+    db.run("SELECT 1 FROM leads")
+    db.run("SELECT 2 FROM leads")
+    db.run("SELECT 3 FROM leads")
+    stats = db.cache_stats()
+    assert (stats["size"], stats["evictions"]) == (2, 1)
@@ -0,0 +1,40 @@
+import pytest
+
+from ml_services.sql_guard import guard_sql, SQLGuardError
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM leads", "SELECT * FROM leads LIMIT 100"),
+    ("select dealer_id from leads limit 10", "SELECT dealer_id FROM leads LIMIT 10"),
+    ("SELECT * FROM leads LIMIT 10 OFFSET 5", "SELECT * FROM leads LIMIT 10 OFFSET 5"),
+    ("SELECT * FROM leads LIMIT 5000", "SELECT * FROM leads LIMIT 100"),
+    ("SELECT * FROM leads LIMIT ALL", "SELECT * FROM leads LIMIT 100"),
+    ("SELECT * FROM leads FETCH FIRST 5000 ROWS ONLY", "SELECT * FROM leads LIMIT 100"),
+    ("SELECT 1 UNION SELECT 2", "SELECT 1 UNION SELECT 2 LIMIT 100"),
+])
+def test_limit_is_added_or_clamped(sql, expected):
+    assert guard_sql(sql, max_rows=100) == expected
+
+def test_limit_below_max_rows_is_kept():
+    assert guard_sql("SELECT * FROM leads LIMIT 20", max_rows=50) == "SELECT * FROM leads LIMIT 20"
+    assert guard_sql("SELECT * FROM leads LIMIT 80", max_rows=50) == "SELECT * FROM leads LIMIT 50"
+
+@pytest.mark.parametrize("sql, reason", [
+    ("", "Exactly one statement"),
+    ("SELECT 1; SELECT 2", "Exactly one statement"),
+    ("SELECT 1; DROP TABLE leads", "Exactly one statement"),
+    ("DELETE FROM leads", "Only SELECT"),
+    ("UPDATE leads SET converted = true", "Only SELECT"),
+    ("INSERT INTO leads (lead_id) VALUES (1)", "Only SELECT"),
+    ("DROP TABLE leads", "Only SELECT"),
+    ("WITH d AS (DELETE FROM leads RETURNING *) SELECT * FROM d", "Data-modifying"),
+    ("SELECT * INTO backup FROM leads", "SELECT INTO"),
+    ("SELECT * FROM leads FOR UPDATE", "Row locking"),
+    ("SELECT pg_sleep(10)", "pg_sleep"),
+    ("SELECT PG_SLEEP(10)", "PG_SLEEP"),
+    ("SELECT set_config('statement_timeout', '0', false)", "set_config"),
+    ("SELECT * FROM pg_authid", "pg_authid"),
+    ("SELECT * FROM pg_catalog.pg_shadow", "pg_shadow"),
+])
+def test_rejected(sql, reason):
+    with pytest.raises(SQLGuardError, match=reason):
+        guard_sql(sql)